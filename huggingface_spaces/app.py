@@ -6,10 +6,20 @@ Gradio Interface
 import gradio as gr
 import torch
 import logging
+import os
 import json
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
 from transformers import MBartForConditionalGeneration, MBartTokenizer
 from transformers import MT5ForConditionalGeneration, MT5Tokenizer
+from transformers import LogitsProcessor, LogitsProcessorList
+from transformers.modeling_outputs import BaseModelOutput
 import random
+import re
+from decimal import Decimal
 
 # Logging ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,11 +33,365 @@ mt5_tokenizer = None
 device = None
 label_map = ['Yanlış', 'Kısmen Doğru', 'Çok Benzer', 'Tam Doğru']
 
-# Model hassasiyet ayarları
+# Model hassasiyet ayarları (varsayılanlar - istek bazında Settings ile değiştirilir)
 SIMILARITY_THRESHOLD = 0.7  # Benzerlik eşiği (0.0-1.0)
 STRICT_MODE = True  # Katı mod - daha az tolerans
 CONFIDENCE_THRESHOLD = 0.6  # Güven eşiği
 
+@dataclass(frozen=True)
+class Settings:
+    """
+    İstek bazında değerlendirme ayarları.
+    Değiştirilemez; tüm boru hattına parametre olarak geçer, eşzamanlı istekler birbirinin ayarını ezmez.
+    """
+    strict_mode: bool = STRICT_MODE
+    similarity_threshold: float = SIMILARITY_THRESHOLD
+    confidence_threshold: float = CONFIDENCE_THRESHOLD
+
+DEFAULT_SETTINGS = Settings()
+
+# Aynı anda çalışabilecek istek sayısı - modeller salt okunur kullanılır, ayarlar istek bazında
+CONCURRENCY_LIMIT = int(os.environ.get("CONCURRENCY_LIMIT", "4"))
+
+# Çıkarım backend'i - "torch": tam hassasiyet, "bf16": bfloat16 ağırlıklar (yarım bellek, CPU'da da çalışır),
+# "int8": dinamik INT8 kuantizasyon (CPU),
+# "onnx": python/export_models.py ile üretilmiş ONNX modelleri (ONNX_MODEL_DIR/mbart, ONNX_MODEL_DIR/mt5)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR", "onnx")
+
+# Decoder offload - tanımlıysa decoder katmanları bu klasöre yazılır ve her forward'da diskten okunur
+# (torch/bf16 backend'leri, accelerate gerekir); RAM'de sadece encoder ve embedding'ler kalır
+OFFLOAD_DIR = os.environ.get("OFFLOAD_DIR")
+
+# Model başına bellekteki ağırlık boyutu (MB) - yüklemeden sonra doldurulur
+model_memory = {}
+
+# Consensus modu - "both": her cevap iki modelden geçer,
+# "cascade": önce mBART çalışır, güveni CONFIDENCE_THRESHOLD altındaysa MT5'e aktarılır
+# (score modunda etiket olasılığı, generate modunda üretimin ortalama token olasılığı; katı modun
+# ışın aramasında en iyi ışının uzunlukla normalize skoru - sequences_scores)
+CONSENSUS_MODE = os.environ.get("CONSENSUS_MODE", "both")
+
+# Çıkarım modu - "generate": serbest üretim + parse_output, "score": dört etiketin olasılığı (tek forward pass)
+INFERENCE_MODE = os.environ.get("INFERENCE_MODE", "generate")
+
+# Toplu değerlendirme - /predict_batch
+MODEL_BATCH_SIZE = int(os.environ.get("MODEL_BATCH_SIZE", "16"))  # Tek generate() çağrısındaki en fazla cevap
+MAX_BATCH_SESSIONS = int(os.environ.get("MAX_BATCH_SESSIONS", "8"))  # Gradio'nun birleştireceği en fazla istek
+QUEUE_MAX_SIZE = int(os.environ.get("QUEUE_MAX_SIZE", "64"))  # Kuyrukta bekleyebilecek en fazla istek
+
+# Sonuç önbelleği ayarları
+CACHE_MAX_ENTRIES = 2048  # En fazla kayıt
+CACHE_TTL_SECONDS = 3600  # Kayıt ömrü (saniye)
+
+def normalize_turkish(text: str) -> str:
+    """Türkçe'ye uygun normalizasyon: I/ı - İ/i dönüşümü, noktalama ve boşluk temizliği"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFC', str(text))
+    text = text.replace('I', 'ı').replace('İ', 'i').lower()
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+    return ' '.join(text.split())
+
+QUOTE_CHARS = '"`“”„«»'
+TRAILING_PUNCTUATION = '.!?…'
+
+def normalize_answer(text: str) -> str:
+    """Anlamı koruyan normalizasyon: harf, boşluk, tırnak ve cümle sonu farkları; işaret/ayraçlar korunur ("5" / "-5")"""
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFC', str(text))
+    text = text.replace('I', 'ı').replace('İ', 'i').lower()
+    text = ''.join(ch for ch in text if ch not in QUOTE_CHARS)
+    return ' '.join(text.split()).rstrip(TRAILING_PUNCTUATION).rstrip()
+
+class ResultCache:
+    """Thread-safe LRU önbellek - TTL ve hit/miss sayaçları ile"""
+    
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+# Normalize (soru, cevap, doğru cevap, katı mod) -> model etiketleri + consensus
+result_cache = ResultCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+# Sözcüksel ön değerlendirme - Türkçe karakterlerin ASCII karşılıkları ("cin" / "çin")
+TRANSLITERATION = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+REJECT_THRESHOLD = 0.2  # Bu benzerliğin altındaki kısa cevaplar doğrudan yanlış
+MIN_FUZZY_LENGTH = 4  # Yazım hatası toleransı için en az cevap uzunluğu
+MIN_SIMILARITY_THRESHOLD = 0.8  # Yazım hatası eşiği bunun altına indirilemez ("slovakya" / "slovenya" ~0.75)
+NUMBER_PATTERN = re.compile(r'^[+-]?\d+(?:[.,]\d+)*$')  # "-5", "1.000", "3,5", "1.234,5"
+MATH_SYMBOLS = set('+-−±*/×÷=<>%^')  # Sayı dışı cevaplarda anlam taşıyan işaretler ("x-1" / "x+1")
+
+def fold_turkish(text: str) -> str:
+    """Normalize et ve Türkçe karakterleri ASCII karşılıklarına indir"""
+    return normalize_turkish(text).translate(TRANSLITERATION)
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein mesafesi"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def token_overlap(a: str, b: str) -> float:
+    """Kelime kümeleri arasındaki Jaccard benzerliği"""
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+def thousands_grouped(groups: list) -> bool:
+    return len(groups[0]) <= 3 and all(len(group) == 3 for group in groups[1:])
+
+def number_values(text: str) -> set:
+    """Sayısal cevabın olası değerleri ("1.000" -> bin ya da 1,0), sayı değilse None"""
+    text = normalize_answer(text).replace(' ', '').replace('−', '-')
+    if not NUMBER_PATTERN.match(text):
+        return None
+    sign = -1 if text.startswith('-') else 1
+    digits = text.lstrip('+-')
+    separators = [ch for ch in digits if ch in '.,']
+    groups = re.split('[.,]', digits)
+    if not separators:
+        return {sign * Decimal(digits)}
+    values = set()
+    if len(set(separators)) == 1 and thousands_grouped(groups):
+        values.add(sign * Decimal(''.join(groups)))
+    if separators.count(separators[-1]) == 1 and thousands_grouped(groups[:-1]):
+        values.add(sign * Decimal(''.join(groups[:-1]) + '.' + groups[-1]))
+    return values or None
+
+def has_signs(text: str) -> bool:
+    return any(ch.isdigit() or ch in MATH_SYMBOLS for ch in text)
+
+def answer_key(text: str) -> str:
+    """Soru bankası anahtarı - sözel cevaplar fold_turkish, rakam/işaret içerenler normalize_answer ile ("-7" "7" değildir)"""
+    text = str(text or '')
+    return normalize_answer(text) if has_signs(text) else fold_turkish(text)
+
+# Soru bankası - quizData.ts'den dışa aktarılan kabul edilen cevaplar (python/answer_index.py ile üretilir)
+QUESTION_BANK_PATH = os.environ.get(
+    "QUESTION_BANK_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "question_bank.json")
+)
+QUESTION_BANK_RELOAD_SECONDS = 5.0
+
+class AnswerIndex:
+    """Soru id'si -> normalize edilmiş kabul edilen cevaplar; dosya değişince yeniden yüklenir"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.questions = {}
+        self.mtime = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+        self.reload()
+    
+    def reload(self):
+        if not os.path.exists(self.path):
+            return
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        questions = {}
+        for item in data.get('questions', []) if isinstance(data, dict) else data:
+            options = item.get('options', [])
+            correct = [i for i in item.get('correctAnswer', range(len(options))) if 0 <= i < len(options)]
+            accepted = {}
+            for i in correct:
+                accepted.setdefault(answer_key(options[i]), options[i])
+            questions[str(item['id'])] = {
+                "question": item.get('question', ''),
+                "topic": item.get('topic', ''),
+                "accepted": accepted,
+                "correct_answer": options[correct[0]] if correct else ''
+            }
+        self.questions = questions
+        self.mtime = mtime
+        logger.info(f"📚 Soru bankası yüklendi: {len(questions)} soru")
+    
+    def get(self, question_id) -> dict:
+        """Soru kaydı ya da None - gerekirse dosyayı yeniden yükler"""
+        now = time.monotonic()
+        if now - self.last_check >= QUESTION_BANK_RELOAD_SECONDS:
+            with self.lock:
+                self.last_check = now
+                try:
+                    if os.path.exists(self.path) and os.path.getmtime(self.path) != self.mtime:
+                        self.reload()
+                except Exception as e:
+                    logger.warning(f"⚠️ Soru bankası yeniden yüklenemedi: {e}")
+        if question_id in (None, ""):
+            return None
+        key = str(question_id).strip()
+        if key.endswith('.0'):  # gr.Number değerleri float gelir
+            key = key[:-2]
+        return self.questions.get(key)
+
+def lexical_grade(student_answer: str, correct_answer: str, similarity_threshold: float) -> dict:
+    """Açık durumlarda modelleri çalıştırmadan karar ver - belirsizse None"""
+    student = fold_turkish(student_answer)
+    correct = fold_turkish(correct_answer)
+    if not correct:
+        return None
+    
+    distance = edit_distance(student, correct)
+    similarity = 1 - distance / max(len(student), len(correct))
+    overlap = token_overlap(student, correct)
+    
+    if not student:
+        return {"label": "Yanlış", "confidence": 0.99, "method": "empty"}
+    # İşaret ve ayraçlar anlam taşır: "5" / "-5", "3,5" / "35" birebir eşleşmez
+    if normalize_answer(student_answer) == normalize_answer(correct_answer):
+        return {"label": "Tam Doğru", "confidence": 0.99, "method": "exact"}
+    # Sayılar değere göre; ayraç belirsizliği ("1000" / "1.000") modellere bırakılır
+    student_values, correct_values = number_values(student_answer), number_values(correct_answer)
+    if student_values is not None and correct_values is not None:
+        if student_values == correct_values and len(correct_values) == 1:
+            return {"label": "Tam Doğru", "confidence": 0.97, "method": "numeric"}
+        if student_values.isdisjoint(correct_values):
+            return {"label": "Yanlış", "confidence": 0.95, "method": "numeric"}
+        return None
+    # Aşağıdaki karşılaştırmalar noktalamayı siler - rakam/işaret içeren cevaplar modellere
+    if has_signs(normalize_answer(student_answer)) or has_signs(normalize_answer(correct_answer)):
+        return None
+    if student == correct:
+        return {"label": "Tam Doğru", "confidence": 0.97, "method": "transliteration"}
+    # Yazım hatası (1-2 düzenleme) tam puan almaz; eşik kaydırıcıyla düşürülse de 0.8 altına inmez
+    if (len(correct) >= MIN_FUZZY_LENGTH and len(student.split()) == len(correct.split())
+            and distance <= (1 if len(correct) <= 8 else 2)
+            and similarity >= max(similarity_threshold, MIN_SIMILARITY_THRESHOLD)):
+        return {"label": "Çok Benzer", "confidence": round(similarity, 4), "method": "edit_distance"}
+    if (max(similarity, overlap) <= REJECT_THRESHOLD
+            and student not in correct and correct not in student):
+        return {"label": "Yanlış", "confidence": 0.9, "method": "no_overlap"}
+    return None
+
+def decoder_offload_map(model_cls, config) -> dict:
+    """accelerate device_map'i: decoder katman listesi diskte, geri kalan her şey CPU'da"""
+    from accelerate import init_empty_weights
+    with init_empty_weights():
+        model = model_cls(config)
+    
+    decoder = model.get_decoder()
+    decoder_name = next(name for name, module in model.named_modules() if module is decoder)
+    layers_name = next(name for name, module in decoder.named_children() if isinstance(module, torch.nn.ModuleList))
+    target = f"{decoder_name}.{layers_name}"
+    
+    # Anahtarlar çakışmamalı: hedefe giden yoldaki diğer modüller ve doğrudan tensörler ayrı ayrı CPU'ya
+    device_map = {}
+    def split(module, prefix):
+        for name, _ in list(module.named_parameters(recurse=False)) + list(module.named_buffers(recurse=False)):
+            device_map[prefix + name] = "cpu"
+        for name, child in module.named_children():
+            full_name = prefix + name
+            if full_name == target:
+                device_map[full_name] = "disk"
+            elif target.startswith(full_name + "."):
+                split(child, full_name + ".")
+            else:
+                device_map[full_name] = "cpu"
+    split(model, "")
+    return device_map
+
+def load_weights(name: str, model_cls, path: str, config):
+    """Ağırlıkları backend'e göre yükle - bf16 veri tipi, düşük RAM tepesi ve opsiyonel decoder offload"""
+    kwargs = {
+        "config": config,
+        "ignore_mismatched_sizes": True,
+        "torch_dtype": torch.bfloat16 if INFERENCE_BACKEND == "bf16" else torch.float32,
+        "low_cpu_mem_usage": True  # Model boş tensörlerle kurulur, RAM tepesi ~1x model boyutu
+    }
+    if OFFLOAD_DIR and INFERENCE_BACKEND in ("torch", "bf16"):
+        kwargs["device_map"] = decoder_offload_map(model_cls, config)
+        kwargs["offload_folder"] = os.path.join(OFFLOAD_DIR, name)
+        kwargs["offload_state_dict"] = True
+    return prepare_model(model_cls.from_pretrained(path, **kwargs))
+
+def memory_mb(model) -> float:
+    """Modelin bellekte tuttuğu ağırlık + buffer boyutu (MB) - diske aktarılmış tensörler sayılmaz"""
+    if not isinstance(model, torch.nn.Module):
+        return None
+    def tensor_bytes(value):
+        if isinstance(value, torch.Tensor):
+            return 0 if value.device.type == "meta" else value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):  # Dinamik INT8 Linear paketlenmiş ağırlıkları
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+    seen = set()
+    total = 0
+    for value in model.state_dict(keep_vars=True).values():
+        key = value.data_ptr() if isinstance(value, torch.Tensor) and not value.is_quantized else id(value)
+        if key not in seen:  # Paylaşılan (tied) ağırlıklar bir kez sayılır
+            seen.add(key)
+            total += tensor_bytes(value)
+    return round(total / (1024 * 1024), 1)
+
+def process_rss_mb() -> float:
+    """Sürecin şu anki RSS değeri (MB) - Linux dışında None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def prepare_model(model):
+    """PyTorch modelini cihaza taşı; int8 backend'de Linear katmanları dinamik kuantize et"""
+    # device_map ile yüklenen (offload edilmiş) modelleri accelerate yerleştirir, taşınmamalı
+    if getattr(model, "hf_device_map", None) is None:
+        model.to(device)
+    model.eval()
+    if INFERENCE_BACKEND == "int8" and device == "cpu":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def load_onnx(name: str, tokenizer_cls) -> tuple:
+    """Dışa aktarılmış ONNX modelini KV cache ile yükle - (tokenizer, model)"""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    model_dir = os.path.join(ONNX_MODEL_DIR, name)
+    provider = "CUDAExecutionProvider" if device == "cuda" else "CPUExecutionProvider"
+    return (tokenizer_cls.from_pretrained(model_dir),
+            ORTModelForSeq2SeqLM.from_pretrained(model_dir, use_cache=True, provider=provider))
+
 def load_models():
     """Modelleri başlangıçta yükle"""
     global mbart_model, mbart_tokenizer, mt5_model, mt5_tokenizer, device
@@ -37,28 +401,32 @@ def load_models():
     # Device belirleme
     device = "cuda" if torch.cuda.is_available() else "cpu"
     logger.info(f"🖥️  Cihaz: {device}")
+    logger.info(f"⚙️  Backend: {INFERENCE_BACKEND}")
+    
+    # Eşzamanlı istekler çekirdekleri paylaşır - toplam intra-op thread sayısı CPU sayısını aşmasın
+    if device == "cpu" and CONCURRENCY_LIMIT > 1:
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // CONCURRENCY_LIMIT))
+        logger.info(f"🧵 Intra-op thread sayısı: {torch.get_num_threads()}")
     
     # mBART modeli
     try:
         logger.info("📥 mBART modeli yükleniyor...")
-        from transformers import MBartConfig
-        
-        # Önce config'i yükle ve düzelt
-        config = MBartConfig.from_pretrained("Ozget/MetaMind_Nlp_MBART_2")
-        config.early_stopping = True
-        
-        # Tokenizer'ı yükle
-        mbart_tokenizer = MBartTokenizer.from_pretrained("Ozget/MetaMind_Nlp_MBART_2")
-        
-        # Modeli düzeltilmiş config ile yükle
-        mbart_model = MBartForConditionalGeneration.from_pretrained(
-            "Ozget/MetaMind_Nlp_MBART_2",
-            config=config,
-            ignore_mismatched_sizes=True
-        )
-        mbart_model.to(device)
-        mbart_model.eval()
-        logger.info("✅ mBART hazır!")
+        if INFERENCE_BACKEND == "onnx":
+            mbart_tokenizer, mbart_model = load_onnx("mbart", MBartTokenizer)
+        else:
+            from transformers import MBartConfig
+            
+            # Önce config'i yükle ve düzelt
+            config = MBartConfig.from_pretrained("Ozget/MetaMind_Nlp_MBART_2")
+            config.early_stopping = True
+            
+            # Tokenizer'ı yükle
+            mbart_tokenizer = MBartTokenizer.from_pretrained("Ozget/MetaMind_Nlp_MBART_2")
+            
+            # Modeli düzeltilmiş config ile yükle
+            mbart_model = load_weights("mbart", MBartForConditionalGeneration, "Ozget/MetaMind_Nlp_MBART_2", config)
+        model_memory["mbart"] = memory_mb(mbart_model)
+        logger.info(f"✅ mBART hazır! (bellekte {model_memory['mbart']} MB)")
     except Exception as e:
         logger.error(f"❌ mBART yüklenemedi: {e}")
         mbart_model = None
@@ -67,24 +435,22 @@ def load_models():
     # MT5 modeli
     try:
         logger.info("📥 MT5 modeli yükleniyor...")
-        from transformers import MT5Config
-        
-        # Önce config'i yükle ve düzelt
-        config = MT5Config.from_pretrained("Ozget/MetaMind_Nlp_MT5_2")
-        config.early_stopping = True
-        
-        # Tokenizer'ı yükle
-        mt5_tokenizer = MT5Tokenizer.from_pretrained("Ozget/MetaMind_Nlp_MT5_2")
-        
-        # Modeli düzeltilmiş config ile yükle
-        mt5_model = MT5ForConditionalGeneration.from_pretrained(
-            "Ozget/MetaMind_Nlp_MT5_2",
-            config=config,
-            ignore_mismatched_sizes=True
-        )
-        mt5_model.to(device)
-        mt5_model.eval()
-        logger.info("✅ MT5 hazır!")
+        if INFERENCE_BACKEND == "onnx":
+            mt5_tokenizer, mt5_model = load_onnx("mt5", MT5Tokenizer)
+        else:
+            from transformers import MT5Config
+            
+            # Önce config'i yükle ve düzelt
+            config = MT5Config.from_pretrained("Ozget/MetaMind_Nlp_MT5_2")
+            config.early_stopping = True
+            
+            # Tokenizer'ı yükle
+            mt5_tokenizer = MT5Tokenizer.from_pretrained("Ozget/MetaMind_Nlp_MT5_2")
+            
+            # Modeli düzeltilmiş config ile yükle
+            mt5_model = load_weights("mt5", MT5ForConditionalGeneration, "Ozget/MetaMind_Nlp_MT5_2", config)
+        model_memory["mt5"] = memory_mb(mt5_model)
+        logger.info(f"✅ MT5 hazır! (bellekte {model_memory['mt5']} MB)")
     except Exception as e:
         logger.error(f"❌ MT5 yüklenemedi: {e}")
         mt5_model = None
@@ -93,14 +459,14 @@ def load_models():
     if not mbart_model and not mt5_model:
         raise Exception("❌ Hiçbir model yüklenemedi!")
     
-    logger.info("🎉 Tüm modeller hazır!")
+    logger.info(f"🎉 Tüm modeller hazır! (süreç RSS: {process_rss_mb()} MB)")
 
 def get_label_code(label: str) -> int:
     """Label'ı sayısal koda çevir"""
     label_codes = {'Yanlış': 0, 'Kısmen Doğru': 1, 'Çok Benzer': 2, 'Tam Doğru': 3}
     return label_codes.get(label, 0)
 
-def parse_output(output: str) -> tuple:
+def parse_output(output: str, settings: Settings = DEFAULT_SETTINGS) -> tuple:
     """Model çıktısını parse et - Katı mod"""
     try:
         label = "Yanlış"  # Varsayılan olarak yanlış
@@ -110,7 +476,7 @@ def parse_output(output: str) -> tuple:
         clean_output = output.lower().strip()
         
         # Katı mod: Sadece açık etiketler kabul edilir
-        if STRICT_MODE:
+        if settings.strict_mode:
             # Tam eşleşme aranır
             if "tam doğru" in clean_output or "tamdogru" in clean_output:
                 label = "Tam Doğru"
@@ -148,26 +514,126 @@ def parse_output(output: str) -> tuple:
         logger.error(f"Parse hatası: {e}")
         return "Yanlış", output
 
-def predict_mbart(question: str, student_answer: str, correct_answer: str) -> dict:
-    """mBART ile tahmin"""
+def score_labels(model, tokenizer, inputs) -> list:
+    """
+    Dört aday etiketi ("Etiket: <label>") decoder'a teacher forcing ile ver ve log-olasılıklarını karşılaştır.
+    Encoder batch için bir kez çalışır, tüm satırların adayları tek forward pass'te skorlanır.
+    Her satır için {label: olasılık} döner.
+    """
+    candidates = [tokenizer(f"Etiket: {label}", add_special_tokens=False)['input_ids'] for label in label_map]
+    
+    # generate() ile aynı decoder başlangıcı
+    prefix = [model.config.decoder_start_token_id]
+    forced_bos = getattr(model.generation_config, 'forced_bos_token_id', None)
+    if forced_bos is not None:
+        prefix.append(forced_bos)
+    
+    sequences = [prefix + candidate for candidate in candidates]
+    width = max(len(sequence) for sequence in sequences) - 1
+    pad_id = model.config.pad_token_id if model.config.pad_token_id is not None else 0
+    decoder_input_ids = torch.full((len(candidates), width), pad_id, dtype=torch.long)
+    target_ids = torch.zeros((len(candidates), width), dtype=torch.long)
+    target_mask = torch.zeros((len(candidates), width))
+    for c, sequence in enumerate(sequences):
+        decoder_input_ids[c, :len(sequence) - 1] = torch.tensor(sequence[:-1])
+        target_ids[c, :len(sequence) - 1] = torch.tensor(sequence[1:])
+        target_mask[c, len(prefix) - 1:len(sequence) - 1] = 1
+    
+    # Satır başına aday sayısı kadar kopya: [satır0 adayları, satır1 adayları, ...]
+    batch_size = inputs['input_ids'].shape[0]
+    with torch.no_grad():
+        encoder_outputs = model.get_encoder()(input_ids=inputs['input_ids'], attention_mask=inputs['attention_mask'])
+        outputs = model(
+            encoder_outputs=BaseModelOutput(
+                last_hidden_state=encoder_outputs.last_hidden_state.repeat_interleave(len(candidates), dim=0)
+            ),
+            attention_mask=inputs['attention_mask'].repeat_interleave(len(candidates), dim=0),
+            decoder_input_ids=decoder_input_ids.repeat(batch_size, 1).to(device)
+        )
+        log_probs = torch.log_softmax(outputs.logits.float(), dim=-1)
+        token_log_probs = log_probs.gather(-1, target_ids.repeat(batch_size, 1).to(device).unsqueeze(-1)).squeeze(-1)
+        sequence_scores = (token_log_probs * target_mask.repeat(batch_size, 1).to(device)).sum(-1)
+        probs = torch.softmax(sequence_scores.view(batch_size, len(candidates)), dim=-1).cpu().tolist()
+    
+    return [{label: round(p, 4) for label, p in zip(label_map, row)} for row in probs]
+
+def score_result(model_name: str, label_probs: dict) -> dict:
+    """Etiket olasılıklarından sonuç - güven en olası etiketin olasılığı"""
+    label = max(label_probs, key=label_probs.get)
+    return {"model": model_name, "label": label, "label_code": get_label_code(label),
+            "feedback": "", "confidence": round(label_probs[label] * 100, 1), "label_probs": label_probs}
+
+class SequenceLogProb(LogitsProcessor):
+    """
+    generate() sırasında seçilen token'ların log-olasılığını biriktirir - output_scores'un aksine sadece son adımın
+    dağılımını tutar. finish(sequences) satır başına ortalama token olasılığını (0-1) döndürür; ışın araması desteklenmez.
+    """
+    def __init__(self, pad_token_id: int, eos_token_id: int):
+        self.pad_token_id, self.eos_token_id = pad_token_id, eos_token_id
+        self.log_probs = self.total = self.count = self.done = None
+    
+    def add(self, tokens):
+        if self.log_probs is None:
+            return
+        chosen = self.log_probs.gather(1, tokens[:, None]).squeeze(1)
+        counted = ~self.done & (tokens != self.pad_token_id)
+        self.total += torch.where(counted, chosen, torch.zeros_like(chosen))
+        self.count += counted
+        self.done |= tokens == self.eos_token_id
+    
+    def __call__(self, input_ids, scores):
+        if self.total is None:
+            self.total = torch.zeros(input_ids.shape[0], device=scores.device)
+            self.count = torch.zeros(input_ids.shape[0], dtype=torch.long, device=scores.device)
+            self.done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=scores.device)
+        else:
+            self.add(input_ids[:, -1])
+        self.log_probs = torch.log_softmax(scores.float(), dim=-1)
+        return scores
+    
+    def finish(self, sequences) -> list:
+        if self.total is None:
+            return [None] * sequences.shape[0]
+        self.add(sequences[:, -1])
+        probs = torch.exp(self.total / self.count.clamp(min=1)).tolist()
+        return [round(prob, 4) if count else None for prob, count in zip(probs, self.count.tolist())]
+
+def beam_sequence_probs(outputs) -> list:
+    """Işın aramasında en iyi ışının uzunlukla normalize log-olasılığı (sequences_scores) -> ortalama token olasılığı (0-1)"""
+    return [round(prob, 4) for prob in torch.exp(outputs.sequences_scores.float()).tolist()]
+
+def tokenize_batch(tokenizer, input_texts: list):
+    """Prompt'ları batch'in en uzun prompt'una kadar pad'le"""
+    return tokenizer(
+        input_texts, max_length=256, padding='longest',
+        truncation=True, return_tensors='pt'
+    ).to(device)
+
+def predict_batch_mbart(items: list, settings: Settings = DEFAULT_SETTINGS) -> list:
+    """mBART ile toplu tahmin - (soru, öğrenci cevabı, doğru cevap) listesi tek generate() çağrısında"""
     if not mbart_model:
-        return None
+        return [None] * len(items)
     
     try:
-        prompts = [
-            f"Soru: {question} Öğrenci: {student_answer} Doğru: {correct_answer}",
-            f"Quiz: {question}\nCevap: {student_answer}\nHedef: {correct_answer}",
+        input_texts = [
+            random.choice([
+                f"Soru: {question} Öğrenci: {student_answer} Doğru: {correct_answer}",
+                f"Quiz: {question}\nCevap: {student_answer}\nHedef: {correct_answer}",
+            ])
+            for question, student_answer, correct_answer in items
         ]
-        input_text = random.choice(prompts)
+        inputs = tokenize_batch(mbart_tokenizer, input_texts)
         
-        inputs = mbart_tokenizer(
-            input_text, max_length=256, padding='max_length', 
-            truncation=True, return_tensors='pt'
-        ).to(device)
+        if INFERENCE_MODE == "score":
+            return [score_result("mBART", probs) for probs in score_labels(mbart_model, mbart_tokenizer, inputs)]
         
+        # Kademeli modda MT5'e aktarma kararı için üretimin olasılığı tutulur
+        cascade = CONSENSUS_MODE == "cascade"
+        recorder = None
+        sequence_probs = [None] * len(items)
         with torch.no_grad():
             # Katı mod parametreleri
-            if STRICT_MODE:
+            if settings.strict_mode:
                 outputs = mbart_model.generate(
                     input_ids=inputs['input_ids'],
                     attention_mask=inputs['attention_mask'],
@@ -176,12 +642,21 @@ def predict_mbart(question: str, student_answer: str, correct_answer: str) -> di
                     num_beams=4,  # Beam search
                     early_stopping=True,
                     repetition_penalty=1.5,  # Daha yüksek tekrar cezası
-                    no_repeat_ngram_size=2
+                    no_repeat_ngram_size=2,
+                    # sequences_scores sadece output_scores ile döner
+                    return_dict_in_generate=cascade,
+                    output_scores=cascade
                 )
+                if cascade:
+                    sequence_probs = beam_sequence_probs(outputs)
+                    outputs = outputs.sequences
             else:
+                if cascade:
+                    recorder = SequenceLogProb(mbart_tokenizer.pad_token_id, mbart_tokenizer.eos_token_id)
                 outputs = mbart_model.generate(
                     input_ids=inputs['input_ids'],
                     attention_mask=inputs['attention_mask'],
+                    logits_processor=LogitsProcessorList([recorder] if recorder is not None else []),
                     max_length=256, 
                     do_sample=True, 
                     temperature=0.8,
@@ -192,35 +667,40 @@ def predict_mbart(question: str, student_answer: str, correct_answer: str) -> di
                     early_stopping=True
                 )
         
-        prediction = mbart_tokenizer.decode(outputs[0], skip_special_tokens=True)
-        label, feedback = parse_output(prediction)
-        
-        return {"model": "mBART", "label": label, "label_code": get_label_code(label), 
-                "feedback": feedback, "confidence": 85}
+        results = []
+        if recorder is not None:
+            sequence_probs = recorder.finish(outputs)
+        for prediction, sequence_prob in zip(mbart_tokenizer.batch_decode(outputs, skip_special_tokens=True), sequence_probs):
+            label, feedback = parse_output(prediction, settings)
+            results.append({"model": "mBART", "label": label, "label_code": get_label_code(label), 
+                            "feedback": feedback, "confidence": 85, "raw_output": prediction,
+                            "sequence_prob": sequence_prob})
+        return results
     except Exception as e:
         logger.error(f"mBART hatası: {e}")
-        return None
+        return [None] * len(items)
 
-def predict_mt5(question: str, student_answer: str, correct_answer: str) -> dict:
-    """MT5 ile tahmin"""
+def predict_batch_mt5(items: list, settings: Settings = DEFAULT_SETTINGS) -> list:
+    """MT5 ile toplu tahmin - (soru, öğrenci cevabı, doğru cevap) listesi tek generate() çağrısında"""
     if not mt5_model:
-        return None
+        return [None] * len(items)
     
     try:
-        prompts = [
-            f"Soru: {question}\nCevap: {student_answer}\nDoğru: {correct_answer}\nDeğerlendir:",
-            f"Quiz Analizi: '{question}' - '{student_answer}' vs '{correct_answer}'",
+        input_texts = [
+            random.choice([
+                f"Soru: {question}\nCevap: {student_answer}\nDoğru: {correct_answer}\nDeğerlendir:",
+                f"Quiz Analizi: '{question}' - '{student_answer}' vs '{correct_answer}'",
+            ])
+            for question, student_answer, correct_answer in items
         ]
-        input_text = random.choice(prompts)
+        inputs = tokenize_batch(mt5_tokenizer, input_texts)
         
-        inputs = mt5_tokenizer(
-            input_text, max_length=256, padding='max_length',
-            truncation=True, return_tensors='pt'
-        ).to(device)
+        if INFERENCE_MODE == "score":
+            return [score_result("MT5", probs) for probs in score_labels(mt5_model, mt5_tokenizer, inputs)]
         
         with torch.no_grad():
             # Katı mod parametreleri
-            if STRICT_MODE:
+            if settings.strict_mode:
                 outputs = mt5_model.generate(
                     input_ids=inputs['input_ids'],
                     attention_mask=inputs['attention_mask'],
@@ -245,14 +725,39 @@ def predict_mt5(question: str, student_answer: str, correct_answer: str) -> dict
                     early_stopping=True
                 )
         
-        prediction = mt5_tokenizer.decode(outputs[0], skip_special_tokens=True)
-        label, feedback = parse_output(prediction)
-        
-        return {"model": "MT5", "label": label, "label_code": get_label_code(label),
-                "feedback": feedback, "confidence": 82}
+        results = []
+        for prediction in mt5_tokenizer.batch_decode(outputs, skip_special_tokens=True):
+            label, feedback = parse_output(prediction, settings)
+            results.append({"model": "MT5", "label": label, "label_code": get_label_code(label),
+                            "feedback": feedback, "confidence": 82, "raw_output": prediction})
+        return results
     except Exception as e:
         logger.error(f"MT5 hatası: {e}")
-        return None
+        return [None] * len(items)
+
+def predict_mbart(question: str, student_answer: str, correct_answer: str,
+                  settings: Settings = DEFAULT_SETTINGS) -> dict:
+    """mBART ile tahmin"""
+    return predict_batch_mbart([(question, student_answer, correct_answer)], settings)[0]
+
+def predict_mt5(question: str, student_answer: str, correct_answer: str,
+                settings: Settings = DEFAULT_SETTINGS) -> dict:
+    """MT5 ile tahmin"""
+    return predict_batch_mt5([(question, student_answer, correct_answer)], settings)[0]
+
+def is_confident(result: dict, settings: Settings = DEFAULT_SETTINGS) -> bool:
+    """Kademeli mod için: tek modelin kararı ikinci modele gerek bırakmayacak kadar net mi?"""
+    if not result:
+        return False
+    if result.get('label_probs'):
+        return max(result['label_probs'].values()) >= settings.confidence_threshold
+    # Üretim modunda sabit "confidence" (85) değil üretimin ortalama token olasılığı (örnekleme) ya da
+    # ışın skoru (katı mod); etiket de açıkça yazılmış olmalı
+    output = result.get('raw_output', '')
+    if "Etiket:" not in output or result.get('sequence_prob') is None:
+        return False
+    label_part = output.split("Geri Bildirim:")[0].lower()
+    return result['label'].lower() in label_part and result['sequence_prob'] >= settings.confidence_threshold
 
 def create_feedback(label: str, student_answer: str, correct_answer: str, 
                     confidence: int, topic: str) -> str:
@@ -289,7 +794,7 @@ def create_feedback(label: str, student_answer: str, correct_answer: str,
     
     return random.choice(messages.get(label, messages["Yanlış"]))
 
-def get_consensus(mbart_result: dict, mt5_result: dict) -> dict:
+def get_consensus(mbart_result: dict, mt5_result: dict, settings: Settings = DEFAULT_SETTINGS) -> dict:
     """İki modelin consensus sonucu - Katı mod"""
     scores = {'Tam Doğru': 3, 'Çok Benzer': 2, 'Kısmen Doğru': 1, 'Yanlış': 0}
     
@@ -300,8 +805,15 @@ def get_consensus(mbart_result: dict, mt5_result: dict) -> dict:
     if not mt5_result:
         return {"label": mbart_result['label'], "confidence": mbart_result['confidence'] / 100}
     
+    # Skor modu: gerçek etiket olasılıklarının ortalaması
+    if mbart_result.get('label_probs') and mt5_result.get('label_probs'):
+        avg_probs = {label: (mbart_result['label_probs'][label] + mt5_result['label_probs'][label]) / 2
+                     for label in label_map}
+        final_label = max(avg_probs, key=avg_probs.get)
+        return {"label": final_label, "confidence": avg_probs[final_label]}
+    
     # Katı mod: Sadece aynı etiketlerde consensus
-    if STRICT_MODE:
+    if settings.strict_mode:
         if mbart_result['label'] == mt5_result['label']:
             # Aynı etiket - güven skorunu artır
             confidence = min(95, (mbart_result['confidence'] + mt5_result['confidence']) / 2 + 10)
@@ -333,56 +845,211 @@ def get_consensus(mbart_result: dict, mt5_result: dict) -> dict:
         confidence = (mbart_result['confidence'] + mt5_result['confidence']) / 200
         return {"label": final_label, "confidence": confidence}
 
+def error_result(message: str) -> dict:
+    return {"label": "❌ Hata", "feedback": message, "confidence": 0.0, "details": {}}
+
+def grade_items(items: list, settings: Settings = DEFAULT_SETTINGS) -> list:
+    """
+    Cevap listesini değerlendir - sonuçlar aynı sırayla döner.
+    Soru bankası, sözcüksel karar ve önbellekten dönmeyen cevaplar MODEL_BATCH_SIZE'lık gruplar
+    halinde modellere gider; her grup model başına tek generate() çağrısıdır.
+    Her öğe: question, student_answer, correct_answer, confidence, topic, question_id
+    Her sonuç: {"label", "feedback", "confidence" (0-100), "details"}
+    """
+    results = [None] * len(items)
+    requests = [None] * len(items)
+    pending = {}  # önbellek anahtarı -> cevap indeksleri
+    
+    for i, item in enumerate(items):
+        try:
+            question = item.get('question') or ""
+            student_answer = item.get('student_answer') or ""
+            correct_answer = item.get('correct_answer') or ""
+            topic = item.get('topic') or ""
+            
+            # Soru bankası - question_id varsa eksik alanları doldur
+            bank_question = answer_index.get(item.get('question_id'))
+            if bank_question:
+                question = question or bank_question['question']
+                correct_answer = correct_answer or bank_question['correct_answer']
+                topic = topic or bank_question['topic']
+            
+            # Validasyon
+            if not question or not student_answer or not correct_answer:
+                results[i] = error_result("Lütfen tüm alanları doldurun!")
+                continue
+            
+            requests[i] = (question, student_answer, correct_answer, item.get('confidence', 50), topic)
+            
+            # Kabul edilen varyantlar modelsiz değerlendirilir, sonra sözcüksel ön değerlendirme
+            matched = bank_question['accepted'].get(answer_key(student_answer)) if bank_question else None
+            if matched is not None:
+                decision = {"label": "Tam Doğru", "confidence": 1.0, "method": "question_bank"}
+            else:
+                decision = lexical_grade(student_answer, correct_answer, settings.similarity_threshold)
+            if decision:
+                logger.info(f"⚡ Sözcüksel karar ({decision['method']}): {decision['label']}")
+                results[i] = {
+                    "label": decision['label'],
+                    "feedback": create_feedback(decision['label'], student_answer, correct_answer, requests[i][3], topic),
+                    "confidence": round(decision['confidence'] * 100, 1),
+                    "details": {
+                        "Path": "answer_index" if matched is not None else "lexical",
+                        "Method": decision['method'],
+                        "Consensus": decision['label'],
+                        "Device": device
+                    }
+                }
+                continue
+            
+            # Önbellek - aynı normalize üçlü için modeller tekrar çalışmaz
+            cache_key = (normalize_answer(question), normalize_answer(student_answer),
+                         normalize_answer(correct_answer), settings.strict_mode)
+            cached = result_cache.get(cache_key)
+            if cached:
+                logger.info(f"⚡ Önbellekten: {cached[2]['label']}")
+                results[i] = model_result(requests[i], *cached, cache="hit")
+            else:
+                pending.setdefault(cache_key, []).append(i)
+        except Exception as e:
+            logger.error(f"❌ Analiz hatası: {e}")
+            results[i] = error_result(f"Bir hata oluştu: {str(e)}")
+    
+    keys = list(pending)
+    for start in range(0, len(keys), MODEL_BATCH_SIZE):
+        chunk = keys[start:start + MODEL_BATCH_SIZE]
+        try:
+            batch = [requests[pending[key][0]][:3] for key in chunk]
+            logger.info(f"📝 Toplu analiz: {len(batch)} cevap")
+            
+            # Tahminler
+            mbart_results = predict_batch_mbart(batch, settings)
+            mt5_results = [None] * len(batch)
+            if CONSENSUS_MODE == "cascade":
+                # Kararı net olan cevaplar için MT5 çalıştırılmaz
+                escalate = [j for j, result in enumerate(mbart_results) if not is_confident(result, settings)]
+                paths = ["cascade:escalated" if j in escalate else "cascade:mbart" for j in range(len(batch))]
+            else:
+                escalate = list(range(len(batch)))
+                paths = ["consensus"] * len(batch)
+            if escalate:
+                for j, result in zip(escalate, predict_batch_mt5([batch[j] for j in escalate], settings)):
+                    mt5_results[j] = result
+            
+            for key, mbart_result, mt5_result, path in zip(chunk, mbart_results, mt5_results, paths):
+                # Consensus
+                consensus = get_consensus(mbart_result, mt5_result, settings)
+                if mbart_result or mt5_result:
+                    result_cache.put(key, (mbart_result, mt5_result, consensus, path))
+                for i in pending[key]:
+                    results[i] = model_result(requests[i], mbart_result, mt5_result, consensus, path, cache="miss")
+                logger.info(f"✅ Sonuç: {consensus['label']}")
+        except Exception as e:
+            logger.error(f"❌ Analiz hatası: {e}")
+            for key in chunk:
+                for i in pending[key]:
+                    results[i] = error_result(f"Bir hata oluştu: {str(e)}")
+    
+    return results
+
+def model_result(request: tuple, mbart_result: dict, mt5_result: dict, consensus: dict, path: str, cache: str) -> dict:
+    """Model (ya da önbellek) sonucundan yanıt oluştur"""
+    question, student_answer, correct_answer, confidence, topic = request
+    
+    # Feedback
+    feedback = create_feedback(
+        consensus['label'], student_answer, correct_answer, 
+        confidence, topic
+    )
+    
+    # Detaylar
+    details = {
+        "mBART": mbart_result['label'] if mbart_result else "N/A",
+        "MT5": mt5_result['label'] if mt5_result else ("Atlandı" if path == "cascade:mbart" else "N/A"),
+        "Consensus": consensus['label'],
+        "Path": path,
+        "Device": device,
+        "Backend": INFERENCE_BACKEND,
+        "MemoryMB": model_memory,
+        "Cache": cache,
+        "CacheStats": result_cache.stats()
+    }
+    
+    return {
+        "label": consensus['label'],
+        "feedback": feedback,
+        "confidence": round(consensus['confidence'] * 100, 1),
+        "details": details
+    }
+
 def analyze_answer(question: str, student_answer: str, correct_answer: str, 
                    confidence: int = 50, topic: str = "", strict_mode: bool = STRICT_MODE, 
-                   similarity_threshold: float = SIMILARITY_THRESHOLD) -> tuple:
+                   similarity_threshold: float = SIMILARITY_THRESHOLD, question_id: str = "") -> tuple:
     """Ana analiz fonksiyonu"""
-    try:
-        # Validasyon
-        if not question or not student_answer or not correct_answer:
-            return "❌ Hata", "Lütfen tüm alanları doldurun!", "{}", 0.0
-        
-        logger.info(f"📝 Analiz başlıyor: {question[:30]}...")
-        logger.info(f"🔧 Ayarlar - Katı Mod: {strict_mode}, Benzerlik Eşiği: {similarity_threshold}")
-        
-        # Global ayarları güncelle
-        global STRICT_MODE, SIMILARITY_THRESHOLD
-        STRICT_MODE = strict_mode
-        SIMILARITY_THRESHOLD = similarity_threshold
-        
-        # Tahminler
-        mbart_result = predict_mbart(question, student_answer, correct_answer)
-        mt5_result = predict_mt5(question, student_answer, correct_answer)
-        
-        # Consensus
-        consensus = get_consensus(mbart_result, mt5_result)
-        
-        # Feedback
-        feedback = create_feedback(
-            consensus['label'], student_answer, correct_answer, 
-            confidence, topic
-        )
-        
-        # Detaylar
-        details = {
-            "mBART": mbart_result['label'] if mbart_result else "N/A",
-            "MT5": mt5_result['label'] if mt5_result else "N/A",
-            "Consensus": consensus['label'],
-            "Device": device
-        }
-        
-        logger.info(f"✅ Sonuç: {consensus['label']}")
-        
-        return (
-            consensus['label'],
-            feedback,
-            json.dumps(details, ensure_ascii=False, indent=2),
-            round(consensus['confidence'] * 100, 1)
+    settings = Settings(strict_mode=bool(strict_mode), similarity_threshold=float(similarity_threshold))
+    logger.info(f"📝 Analiz başlıyor: {(question or '')[:30]}...")
+    logger.info(f"🔧 Ayarlar - Katı Mod: {settings.strict_mode}, Benzerlik Eşiği: {settings.similarity_threshold}")
+    
+    result = grade_items([{
+        "question": question,
+        "student_answer": student_answer,
+        "correct_answer": correct_answer,
+        "confidence": confidence,
+        "topic": topic,
+        "question_id": question_id
+    }], settings)[0]
+    
+    details = json.dumps(result['details'], ensure_ascii=False, indent=2) if result['details'] else "{}"
+    return result['label'], result['feedback'], details, result['confidence']
+
+def parse_session(session) -> list:
+    """/predict_batch girdisi: cevap listesi ya da {"answers": [...]} (JSON metni de olabilir)"""
+    if isinstance(session, str):
+        session = json.loads(session) if session.strip() else []
+    if isinstance(session, dict):
+        session = session.get('answers', [])
+    if not isinstance(session, list) or not all(isinstance(item, dict) for item in session):
+        raise ValueError("Girdi cevap nesnelerinden oluşan bir liste olmalı")
+    return [
+        {**item, "confidence": item.get('confidence', item.get('student_confidence', 50))}
+        for item in session
+    ]
+
+def predict_batch(sessions: list, strict_modes: list, similarity_thresholds: list) -> list:
+    """
+    /predict_batch - bir quiz oturumunun tüm cevapları tek çağrıda, sonuçlar aynı sırayla döner.
+    Gradio batch=True ile çalışır: kuyrukta bekleyen eşzamanlı istekler listeler halinde gelir,
+    aynı ayarlara sahip oturumların cevapları tek model batch'inde birleştirilir.
+    """
+    outputs = [None] * len(sessions)
+    groups = {}  # Settings -> [(istek indeksi, cevaplar)]
+    
+    for s, (session, strict_mode, similarity_threshold) in enumerate(zip(sessions, strict_modes, similarity_thresholds)):
+        try:
+            answers = parse_session(session)
+        except (ValueError, json.JSONDecodeError) as e:
+            outputs[s] = [error_result(f"Geçersiz girdi: {e}")]
+            continue
+        settings = Settings(
+            strict_mode=STRICT_MODE if strict_mode is None else bool(strict_mode),
+            similarity_threshold=SIMILARITY_THRESHOLD if similarity_threshold is None else float(similarity_threshold)
         )
-        
-    except Exception as e:
-        logger.error(f"❌ Analiz hatası: {e}")
-        return "❌ Hata", f"Bir hata oluştu: {str(e)}", "{}", 0.0
+        groups.setdefault(settings, []).append((s, answers))
+    
+    for settings, members in groups.items():
+        flat = [answer for _, answers in members for answer in answers]
+        logger.info(f"📦 Toplu istek: {len(members)} oturum, {len(flat)} cevap (Katı Mod: {settings.strict_mode})")
+        results = grade_items(flat, settings)
+        offset = 0
+        for s, answers in members:
+            outputs[s] = results[offset:offset + len(answers)]
+            offset += len(answers)
+    
+    # batch=True: her çıktı bileşeni için bir liste
+    return [outputs]
+
+# Soru bankası indeksi
+answer_index = AnswerIndex(QUESTION_BANK_PATH)
 
 # Başlangıçta modelleri yükle
 logger.info("⏳ Modeller yükleniyor, lütfen bekleyin...")
@@ -427,6 +1094,11 @@ with gr.Blocks(
                 placeholder="Örn: Dünya Coğrafyası"
             )
             
+            question_id = gr.Textbox(
+                label="Soru ID (Opsiyonel)",
+                placeholder="Örn: 1 - soru bankasındaki kabul edilen cevaplar kullanılır"
+            )
+            
             # Model ayarları
             with gr.Row():
                 strict_mode = gr.Checkbox(
@@ -437,7 +1109,7 @@ with gr.Blocks(
                 similarity_threshold = gr.Slider(
                     label="Benzerlik Eşiği",
                     minimum=0.0, maximum=1.0, value=SIMILARITY_THRESHOLD, step=0.1,
-                    info="Yüksek değer = Daha katı benzerlik kontrolü"
+                    info="Yazım hatası toleransı - yüksek değer = daha katı (0.8 altı 0.8 sayılır)"
                 )
             
             analyze_btn = gr.Button("🔍 Analiz Et", variant="primary", size="lg")
@@ -484,10 +1156,31 @@ with gr.Blocks(
     # Event handler
     analyze_btn.click(
         fn=analyze_answer,
-        inputs=[question, student_answer, correct_answer, confidence_slider, topic, strict_mode, similarity_threshold],
+        inputs=[question, student_answer, correct_answer, confidence_slider, topic, strict_mode, similarity_threshold, question_id],
         outputs=[result_label, result_feedback, result_details, result_confidence],
         api_name="predict"  # API endpoint için
     )
+    
+    # Toplu API - bir quiz oturumunun tüm cevapları tek çağrıda (arayüzde görünmez)
+    with gr.Row(visible=False):
+        batch_answers = gr.JSON(label="Cevaplar")
+        batch_strict_mode = gr.Checkbox(value=STRICT_MODE)
+        batch_similarity_threshold = gr.Number(value=SIMILARITY_THRESHOLD)
+        batch_results = gr.JSON(label="Sonuçlar")
+        batch_btn = gr.Button()
+    
+    batch_btn.click(
+        fn=predict_batch,
+        inputs=[batch_answers, batch_strict_mode, batch_similarity_threshold],
+        outputs=[batch_results],
+        api_name="predict_batch",
+        batch=True,  # Kuyrukta bekleyen istekler tek çağrıda birleştirilir
+        max_batch_size=MAX_BATCH_SESSIONS
+    )
+
+# Kuyruk - birleştirme için istekler sırada bekler, kuyruk dolunca yeni istekler reddedilir.
+# Ayarlar istek bazında taşındığı için her olay CONCURRENCY_LIMIT kadar worker thread'de paralel çalışabilir.
+demo.queue(max_size=QUEUE_MAX_SIZE, default_concurrency_limit=CONCURRENCY_LIMIT)
 
 # Launch
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kabul edilen cevap indeksi
+Soru bankasındaki (quizData.ts ya da JSON) kabul edilen varyantları soru id'sine göre
+normalize edilmiş bir hash indeksinde tutar; indeksteki cevaplar modelsiz, O(1) değerlendirilir.
+
+JSON'a dışa aktarma:
+    python answer_index.py ../src/app/data/quizData.ts > question_bank.json
+"""
+
+import re
+import sys
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+
+from result_cache import normalize_answer
+from lexical_grader import fold_turkish, MATH_SYMBOLS
+
+logger = logging.getLogger(__name__)
+
+# Varsayılan soru bankası - Next.js tarafının kullandığı quiz verisi
+DEFAULT_QUESTION_BANK = Path(__file__).resolve().parent.parent / 'src' / 'app' / 'data' / 'quizData.ts'
+
+_TS_COMMENT = re.compile(r'/\*.*?\*/|^\s*//.*?$', re.DOTALL | re.MULTILINE)
+_TS_QUESTION = re.compile(
+    r'\{\s*id:\s*(\d+)\s*,\s*question:\s*("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')\s*,'
+    r'\s*options:\s*\[(.*?)\]\s*,\s*correctAnswer:\s*\[(.*?)\]\s*,'
+    r'\s*topic:\s*("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')',
+    re.DOTALL
+)
+_TS_STRING = re.compile(r'"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'')
+
+
+def answer_key(text: str) -> str:
+    """
+    İndeks anahtarı. Sözel cevaplar fold_turkish ile eşleşir ("Çin." / "cin");
+    rakam ya da matematik işareti içerenler normalize_answer ile - işaret ve ayraçlar korunur,
+    "-7" "7" ile, "3.5" "3,5" ya da "35" ile eşleşmez, bunlara sözcüksel/sayısal değerlendirme karar verir.
+    """
+    text = str(text or '')
+    if any(ch.isdigit() or ch in MATH_SYMBOLS for ch in text):
+        return normalize_answer(text)
+    return fold_turkish(text)
+
+
+def _ts_string(literal: str) -> str:
+    match = _TS_STRING.fullmatch(literal.strip())
+    return json.loads('"' + (match.group(1) if match.group(1) is not None else match.group(2)) + '"')
+
+
+def parse_quiz_data_ts(source: str) -> list:
+    """quizData.ts içindeki (yorum satırı olmayan) QuizQuestion nesnelerini oku"""
+    source = _TS_COMMENT.sub('', source)
+    questions = []
+    for match in _TS_QUESTION.finditer(source):
+        question_id, question, options, correct, topic = match.groups()
+        questions.append({
+            "id": int(question_id),
+            "question": _ts_string(question),
+            "options": [_ts_string(m.group(0)) for m in _TS_STRING.finditer(options)],
+            "correctAnswer": [int(i) for i in re.findall(r'\d+', correct)],
+            "topic": _ts_string(topic)
+        })
+    return questions
+
+
+def load_question_bank(path) -> list:
+    """Soru bankasını yükle - .ts (quizData.ts) ya da QuizQuestion listesi içeren .json"""
+    path = Path(path)
+    source = path.read_text(encoding='utf-8')
+    if path.suffix == '.ts':
+        return parse_quiz_data_ts(source)
+
+    data = json.loads(source)
+    return data['questions'] if isinstance(data, dict) else data
+
+
+class AnswerIndex:
+    """Soru id'si -> normalize edilmiş kabul edilen cevaplar; dosya değişince yeniden yüklenir"""
+
+    def __init__(self, path, reload_interval: float = 5.0):
+        self.path = Path(path)
+        self.reload_interval = reload_interval
+        self._questions = {}
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+        self.load()
+
+    def load(self):
+        """Dosyayı oku ve indeksi yeniden kur (eski indeks tek adımda değiştirilir)"""
+        mtime = self.path.stat().st_mtime
+        questions = {}
+        for item in load_question_bank(self.path):
+            options = item.get('options', [])
+            correct_indices = [i for i in item.get('correctAnswer', range(len(options))) if 0 <= i < len(options)]
+            accepted = {}
+            for index in correct_indices:
+                accepted.setdefault(answer_key(options[index]), options[index])
+            questions[str(item['id'])] = {
+                "question": item.get('question', ''),
+                "topic": item.get('topic'),
+                "accepted": accepted,
+                "correct_answer": options[correct_indices[0]] if correct_indices else ''
+            }
+
+        self._questions = questions
+        self._mtime = mtime
+        self.reloads += 1
+        logger.info(f"📚 Soru bankası yüklendi: {len(questions)} soru ({self.path.name})")
+
+    def maybe_reload(self):
+        """Dosya değiştiyse yeniden yükle - en fazla reload_interval saniyede bir kontrol edilir"""
+        now = time.monotonic()
+        if now - self._last_check < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.reload_interval:
+                return
+            self._last_check = now
+            try:
+                if self.path.stat().st_mtime != self._mtime:
+                    self.load()
+            except Exception as e:
+                logger.warning(f"⚠️ Soru bankası yeniden yüklenemedi: {e}")
+
+    def get_question(self, question_id) -> dict:
+        """Soru kaydı (soru metni, konu, kabul edilen cevaplar) ya da None"""
+        if question_id is None:
+            return None
+        self.maybe_reload()
+        return self._questions.get(str(question_id))
+
+    def lookup(self, question_id, student_answer: str) -> str:
+        """Cevap indekste varsa eşleşen kabul edilen varyantı döndür, yoksa None"""
+        question = self.get_question(question_id)
+        if question is None:
+            return None
+
+        matched = question['accepted'].get(answer_key(student_answer))
+        if matched is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return matched
+
+    def __len__(self):
+        return len(self._questions)
+
+    def stats(self) -> dict:
+        """İndeks istatistikleri"""
+        return {
+            "questions": len(self._questions),
+            "accepted_answers": sum(len(q['accepted']) for q in self._questions.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads
+        }
+
+
+if __name__ == "__main__":
+    # quizData.ts -> JSON (Hugging Face Space için question_bank.json üretir)
+    source_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_QUESTION_BANK
+    print(json.dumps(load_question_bank(source_path), ensure_ascii=False, indent=2))
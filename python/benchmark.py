@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Performans ölçümü - cevap değerlendirme ve duygu analizi hatları
+Ağ gerektirmez: küçük, rastgele başlatılmış mBART/MT5 modelleri ve sahte (stub) bir DeepFace
+geçici klasörde yerel config'lerden üretilir. Sonuçlar makine tarafından okunabilir JSON olarak yazılır.
+
+    python benchmark.py                                     # tüm senaryolar, küçük modeller
+    python benchmark.py --targets analyze --batch-sizes 1 8 --concurrency 1 4
+    python benchmark.py --model-dir models --mode score     # gerçek yerel modellerle
+    python benchmark.py --output sonuc.json
+
+Her senaryo için p50/p95/p99 gecikme (ms), saniyedeki öğe sayısı ve en yüksek RSS (MB) raporlanır.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import types
+import random
+import contextlib
+import tempfile
+import argparse
+import platform
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Küçük modellerin tokenizer'ı bu metinlerle eğitilir
+TOKENIZER_CORPUS = [
+    "Soru: Türkiye'nin başkenti neresidir? Öğrenci Cevabı: İzmir Hedef Cevap: Ankara",
+    "Quiz Analizi: Dünyanın en kalabalık ülkesi hangisidir? Cevap: Hindistan Doğru: Çin",
+    "Etiket: Tam Doğru Geri Bildirim: Harika, cevabın doğru.",
+    "Etiket: Kısmen Doğru Geri Bildirim: Eksik noktalar var.",
+    "Etiket: Çok Benzer Geri Bildirim: Neredeyse doğru.",
+    "Etiket: Yanlış Geri Bildirim: Konuyu tekrar çalış.",
+    "Değerlendirme: Mona Lisa'yı kim çizdi? Beklenen: Leonardo da Vinci",
+]
+
+QUESTIONS = [
+    ("Türkiye'nin başkenti neresidir?", "Ankara"),
+    ("Dünyanın en kalabalık ülkesi hangisidir?", "Çin"),
+    ("Mona Lisa tablosunu kim çizmiştir?", "Leonardo da Vinci"),
+    ("Güneş sistemindeki en büyük gezegen hangisidir?", "Jüpiter"),
+    ("Suyun kimyasal formülü nedir?", "H2O"),
+]
+
+STUDENT_ANSWERS = [
+    "İzmir", "Hindistan", "Michelangelo sanırım", "Satürn", "HO2", "bilmiyorum",
+    "ankara şehri olabilir", "çin halk cumhuriyeti", "da vinci", "jupiter gezegeni",
+]
+
+
+# --- Ölçüm yardımcıları ---
+
+def percentile(values: list, q: float) -> float:
+    """En yakın sıra yöntemiyle yüzdelik"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list, items: int, elapsed: float) -> dict:
+    """Gecikme listesi (saniye) -> rapor alanları"""
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        "items": items,
+        "latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 3),
+            "p95": round(percentile(latencies_ms, 95), 3),
+            "p99": round(percentile(latencies_ms, 99), 3),
+            "mean": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0
+        },
+        "items_per_second": round(items / elapsed, 3) if elapsed > 0 else 0.0,
+        "elapsed_s": round(elapsed, 3)
+    }
+
+
+def peak_rss_mb(pid: int = None) -> float:
+    """Sürecin şimdiye kadarki en yüksek RSS değeri (MB); pid verilirse /proc üzerinden okunur"""
+    if pid is not None:
+        try:
+            for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            return None
+        return None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS bayt döndürür
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def make_requests(count: int, seed: int) -> list:
+    """Tekrarlanabilir, önbelleğe takılmayan istekler"""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        question, correct = rng.choice(QUESTIONS)
+        requests.append({
+            "question": question,
+            "student_answer": f"{rng.choice(STUDENT_ANSWERS)} {i}",
+            "correct_answer": correct,
+            "student_confidence": rng.randint(0, 100),
+            "topic": None,
+            "question_id": None
+        })
+    return requests
+
+
+# --- Küçük modeller ve sahte DeepFace ---
+
+def build_tiny_models(root: Path, seed: int) -> Path:
+    """<root>/mbart ve <root>/mt5 altında rastgele başlatılmış küçük modeller üret (--model-dir düzeni)"""
+    import sentencepiece as spm
+    from transformers import MBartConfig, MBartForConditionalGeneration, MBartTokenizer
+    from transformers import MT5Config, MT5ForConditionalGeneration, T5Tokenizer
+
+    torch.manual_seed(seed)
+    root.mkdir(parents=True, exist_ok=True)
+
+    model_file = io.BytesIO()
+    spm.SentencePieceTrainer.train(
+        sentence_iterator=iter(TOKENIZER_CORPUS * 20), model_writer=model_file,
+        vocab_size=160, hard_vocab_limit=False, pad_id=0, unk_id=3, bos_id=-1, eos_id=1,
+        character_coverage=1.0, minloglevel=2
+    )
+    spm_path = root / "spm.model"
+    spm_path.write_bytes(model_file.getvalue())
+
+    tokenizer = MBartTokenizer(str(spm_path))
+    config = MBartConfig(
+        vocab_size=len(tokenizer), d_model=64, encoder_layers=2, decoder_layers=2,
+        encoder_attention_heads=4, decoder_attention_heads=4, encoder_ffn_dim=128, decoder_ffn_dim=128,
+        max_position_embeddings=300, pad_token_id=tokenizer.pad_token_id, eos_token_id=tokenizer.eos_token_id,
+        bos_token_id=tokenizer.bos_token_id, decoder_start_token_id=tokenizer.eos_token_id
+    )
+    MBartForConditionalGeneration(config).save_pretrained(root / "mbart")
+    tokenizer.save_pretrained(root / "mbart")
+
+    tokenizer = T5Tokenizer(str(spm_path), extra_ids=0, legacy=True)
+    config = MT5Config(
+        vocab_size=len(tokenizer), d_model=64, d_ff=128, num_layers=2, num_heads=4, d_kv=16,
+        decoder_start_token_id=tokenizer.pad_token_id, pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    )
+    MT5ForConditionalGeneration(config).save_pretrained(root / "mt5")
+    tokenizer.save_pretrained(root / "mt5")
+    return root
+
+
+EMOTIONS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+def install_stub_deepface(seed: int):
+    """
+    emotion_analyzer'ın import ettiği deepface modülünü sahtesiyle değiştir.
+    Sahte yüz tespiti resim baytlarını 48x48 yüz olarak döndürür; sahte Emotion modeli gri tonların
+    histogramını sabit rastgele bir projeksiyonla 7 duyguya eşler (batch halinde).
+    """
+    projection = np.random.default_rng(seed).normal(size=(16, len(EMOTIONS)))
+
+    class EmotionModel:
+        def __call__(self, batch, training=False):
+            pixels = np.asarray(batch).reshape(len(batch), -1)
+            histogram = np.stack([
+                np.bincount(np.minimum(row * 16, 15).astype(int), minlength=16) / row.size for row in pixels
+            ])
+            logits = histogram @ projection * 10
+            probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = probs / probs.sum(axis=1, keepdims=True)
+            return types.SimpleNamespace(numpy=lambda: probs)
+
+    class DeepFace:
+        @staticmethod
+        def build_model(name, task=None):
+            return types.SimpleNamespace(model=EmotionModel())
+
+        @staticmethod
+        def extract_faces(img_path, **kwargs):
+            if isinstance(img_path, np.ndarray):
+                face = img_path[:, :, ::-1] / 255
+            else:
+                data = np.frombuffer(Path(img_path).read_bytes(), dtype=np.uint8)
+                face = data[:48 * 48 * 3].reshape(48, 48, 3) / 255
+            area = {"x": 0, "y": 0, "w": face.shape[1], "h": face.shape[0]}
+            return [{"face": face, "facial_area": area, "confidence": 0}]
+
+    def resize_image(img, target_size):
+        return np.asarray(img, dtype=np.float32)[np.newaxis]
+
+    module = types.ModuleType("deepface")
+    module.DeepFace = DeepFace
+    modules = types.ModuleType("deepface.modules")
+    modules.preprocessing = types.SimpleNamespace(resize_image=resize_image)
+    module.modules = modules
+    sys.modules["deepface"] = module
+    sys.modules["deepface.modules"] = modules
+
+
+def make_images(root: Path, count: int, seed: int) -> list:
+    """Rastgele içerikli resim dosyaları (sahte model sadece baytları okur)"""
+    rng = np.random.default_rng(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = root / f"frame_{i}.jpg"
+        path.write_bytes(rng.integers(0, 256, size=48 * 48 * 3, dtype=np.uint8).tobytes())
+        paths.append(str(path))
+    return paths
+
+
+# --- Senaryolar ---
+
+def bench_analyze(inferencer, batch_size: int, concurrency: int, items: int, seed: int) -> dict:
+    """UnifiedInference.analyze_batch - batch_size istek/çağrı, concurrency eşzamanlı çağıran"""
+    requests = make_requests(items, seed)
+    batches = [requests[i:i + batch_size] for i in range(0, len(requests), batch_size)]
+
+    def run(batch):
+        started = time.perf_counter()
+        inferencer.analyze_batch(batch)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(run, batches))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "target": "analyze",
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        **summarize(latencies, items, elapsed),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def bench_stdin(model_dir: Path, args, batch_size: int, concurrency: int, items: int, seed: int) -> dict:
+    """
+    unified_inference.py stdin döngüsü - alt süreç olarak başlatılır.
+    En fazla concurrency istek aynı anda yolda olur; yanıtlar id ile eşleştirilir.
+    """
+    command = [
+        sys.executable, str(SCRIPT_DIR / "unified_inference.py"),
+        "--model-dir", str(model_dir), "--offline",
+        "--batch-size", str(batch_size), "--mode", args.mode, "--backend", args.backend,
+        "--cache-size", "0", "--no-fast-path", "--question-bank", ""
+    ]
+    process = subprocess.Popen(
+        command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, encoding="utf-8", bufsize=1
+    )
+
+    # Modellerin yüklenmesini bekle
+    for line in process.stdout:
+        status = json.loads(line).get("status")
+        if status == "models_loaded":
+            break
+        if status == "models_failed":
+            raise RuntimeError("Alt süreç modelleri yükleyemedi")
+
+    requests = make_requests(items, seed)
+    sent_at = {}
+    latencies = []
+    window = threading.Semaphore(concurrency)
+
+    def collect():
+        for line in process.stdout:
+            response = json.loads(line)
+            if "id" in response:
+                latencies.append(time.perf_counter() - sent_at.pop(response["id"]))
+                window.release()
+                if len(latencies) == items:
+                    return
+
+    collector = threading.Thread(target=collect, daemon=True)
+    collector.start()
+
+    started = time.perf_counter()
+    for i, request in enumerate(requests):
+        window.acquire()
+        sent_at[i] = time.perf_counter()
+        process.stdin.write(json.dumps({"id": i, **request}, ensure_ascii=False) + "\n")
+        process.stdin.flush()
+    collector.join()
+    elapsed = time.perf_counter() - started
+
+    rss = peak_rss_mb(process.pid)
+    process.stdin.close()
+    process.wait(timeout=30)
+
+    return {
+        "target": "stdin",
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        **summarize(latencies, items, elapsed),
+        "peak_rss_mb": rss
+    }
+
+
+def bench_emotion(image_paths: list, concurrency: int) -> dict:
+    """emotion_analyzer.analyze_image - sahte DeepFace ile"""
+    import emotion_analyzer
+
+    def run(path):
+        started = time.perf_counter()
+        result = emotion_analyzer.analyze_image(path)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(run, image_paths))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "target": "emotion",
+        "batch_size": 1,
+        "concurrency": concurrency,
+        **summarize(latencies, len(image_paths), elapsed),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MetaMind değerlendirme ve duygu analizi performans ölçümü")
+    parser.add_argument('--targets', nargs='+', choices=['analyze', 'stdin', 'emotion'],
+                        default=['analyze', 'stdin', 'emotion'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--items', type=int, default=32, help="Senaryo başına istek / resim sayısı")
+    parser.add_argument('--warmup', type=int, default=4, help="Ölçüm öncesi ısınma isteği sayısı")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model-dir', default=None,
+                        help="Küçük modeller yerine kullanılacak yerel model klasörü (<klasör>/mbart, <klasör>/mt5)")
+    parser.add_argument('--mode', choices=['generate', 'score'], default='generate')
+    parser.add_argument('--backend', choices=['torch', 'bf16', 'int8'], default='torch')
+    parser.add_argument('--threads', type=int, default=None, help="torch thread sayısı")
+    parser.add_argument('--output', default=None, help="JSON raporun yazılacağı dosya (varsayılan: stdout)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SCRIPT_DIR))
+    random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads()
+        },
+        "config": vars(args),
+        "results": []
+    }
+
+    # Ölçüm sırasında modellerin stdout'a yazdığı durum satırları stderr'e gider, rapor stdout'ta temiz kalır
+    with contextlib.redirect_stdout(sys.stderr):
+        with tempfile.TemporaryDirectory(prefix="metamind-bench-") as workdir:
+            workdir = Path(workdir)
+            model_dir = Path(args.model_dir) if args.model_dir else build_tiny_models(workdir / "models", args.seed)
+            report["config"]["model_dir"] = str(model_dir) if args.model_dir else "tiny"
+
+            if "analyze" in args.targets:
+                from unified_inference import UnifiedInference
+
+                inferencer = UnifiedInference(
+                    cache_size=0, lexical_fast_path=False, question_bank=None,
+                    inference_mode=args.mode, backend=args.backend,
+                    model_dir=str(model_dir), offline=True
+                )
+                inferencer.load_models()
+                inferencer.analyze_batch(make_requests(args.warmup, args.seed + 1))
+
+                for batch_size in args.batch_sizes:
+                    for concurrency in args.concurrency:
+                        report["results"].append(bench_analyze(inferencer, batch_size, concurrency, args.items, args.seed))
+
+            if "stdin" in args.targets:
+                for batch_size in args.batch_sizes:
+                    for concurrency in args.concurrency:
+                        report["results"].append(bench_stdin(model_dir, args, batch_size, concurrency, args.items, args.seed))
+
+            if "emotion" in args.targets:
+                install_stub_deepface(args.seed)
+                image_paths = make_images(workdir / "images", args.items, args.seed)
+                for concurrency in args.concurrency:
+                    report["results"].append(bench_emotion(image_paths, concurrency))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
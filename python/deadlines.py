@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+İstek süre sınırları (deadline)
+- "deadline_ms": isteğin alındığı andan itibaren bütçe (milisaniye)
+- "deadline":    mutlak Unix zamanı (saniye)
+İçeride time.monotonic() cinsinden tutulur; Linux'ta fork edilen işçiler de aynı saati görür.
+"""
+
+import math
+import time
+
+
+def _number(data: dict, field: str) -> float:
+    """Sonlu sayı alanı - sayı değilse (ör. "abc", NaN) alan adıyla ValueError"""
+    value = data[field]
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise ValueError(f"{field} bir sayı olmalı: {value!r}")
+    return number
+
+
+def parse_deadline(data: dict, received_at: float = None) -> float:
+    """İstek nesnesinden monotonic deadline; süre sınırı yoksa None, geçersiz değerde ValueError"""
+    if data.get('deadline_ms') is not None:
+        start = received_at if received_at is not None else time.monotonic()
+        return start + _number(data, 'deadline_ms') / 1000
+    if data.get('deadline') is not None:
+        return time.monotonic() + (_number(data, 'deadline') - time.time())
+    return None
+
+
+def is_expired(deadline: float, now: float = None) -> bool:
+    """Süre sınırı geçti mi (sınır yoksa hiçbir zaman)"""
+    return deadline is not None and (now if now is not None else time.monotonic()) >= deadline
+
+
+def latest_deadline(deadlines: list) -> float:
+    """Aynı işi bekleyen isteklerden en geç olanı - biri sınırsızsa iş de sınırsızdır"""
+    if not deadlines or any(deadline is None for deadline in deadlines):
+        return None
+    return max(deadlines)
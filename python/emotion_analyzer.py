@@ -1,164 +1,473 @@
 import sys
 import json
-import math
+import base64
+import binascii
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
 from deepface import DeepFace
+from deepface.modules import preprocessing
 import os
 
-# Model'i başlangıçta yükle
-print("Loading model...", file=sys.stderr, flush=True)
-try:
-    DeepFace.build_model("Emotion")
-    print("Model loaded successfully", file=sys.stderr, flush=True)
-except Exception as e:
-    print(f"Model load error: {e}", file=sys.stderr, flush=True)
+from metrics import REGISTRY, StageTimer, stage
+from deadlines import is_expired, parse_deadline
+from model_residency import ModelResidency
+from face_tracker import FaceTracker
+from emotion_cache import EmotionCache, content_key, perceptual_hash
+from emotion_confidence import (
+    EMOTION_LABELS, calculate_contextual_confidence, calculate_contextual_confidence_batch
+)
 
+# Prometheus'ta değerlendirme servisinin metrikleriyle karışmasın - döküm anında verilir,
+# süreç genelindeki REGISTRY'nin öneki değişmez (emotion_analyzer'ı import eden araçlar etkilenmez)
+METRICS_NAMESPACE = "metamind_emotion"
 
-def calculate_contextual_confidence(emotions):
+
+def build_emotion_model():
+    """Emotion modelini DeepFace'in model önbelleğine yükle (0.0.93+ task parametresi ister)"""
+    try:
+        return DeepFace.build_model("Emotion", task="facial_attribute")
+    except TypeError:
+        return DeepFace.build_model("Emotion")
+
+
+def release_emotion_model():
+    """Emotion modelini DeepFace'in modül düzeyindeki önbelleğinden çıkar ve Keras oturumunu temizle"""
+    from deepface.modules import modeling
+    cached = getattr(modeling, "cached_models", None)  # 0.0.93+: görev -> model adı -> model
+    if isinstance(cached, dict):
+        cached.get("facial_attribute", {}).pop("Emotion", None)
+    legacy = getattr(modeling, "model_obj", None)  # 0.0.92: model adı -> model
+    if isinstance(legacy, dict):
+        legacy.pop("Emotion", None)
+    try:
+        import tensorflow as tf
+        tf.keras.backend.clear_session()
+    except Exception:
+        pass
+
+
+# Emotion modeli residency yöneticisinde - varsayılan olarak başlangıçta yüklenir (--lazy-load ile ilk istekte).
+# Yükleme/boşaltma olayları id taşımayan JSON satırları olarak yazılır, istemci yanıtlarla karıştırmaz.
+residency = ModelResidency(
+    {"emotion": build_emotion_model},
+    on_event=lambda event: emit(event),
+    release=release_emotion_model
+)
+
+
+def decode_base64(data):
+    """base64 resim metnini (data URL öneki olabilir) ham resim baytlarına çöz"""
+    if not isinstance(data, str):
+        raise ValueError("image base64 bir metin olmalı")
+    if data.startswith("data:"):
+        data = data.partition(",")[2]
+    try:
+        return base64.b64decode(data, validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Geçersiz base64: {e}") from e
+
+
+def decode_bytes(raw):
+    """Ham resim baytlarını (JPEG/PNG) BGR numpy dizisine çöz - DeepFace'in okuduğu format"""
+    img = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Resim çözülemedi")
+    return img
+
+
+def decode_image(data):
     """
-    Bağlamsal Güven Skoru Hesaplama
+    base64 resim baytlarını (data URL öneki olabilir) bellekte BGR numpy dizisine çöz.
+    Geçici dosyaya yazıp yoldan okumaya gerek kalmaz.
     """
-    total = sum(emotions.values())
+    return decode_bytes(decode_base64(data))
+
+
+def face_input(face):
+    """
+    [0,1] aralığındaki BGR yüz kırpıntısını Emotion modelinin girdisine çevir - DeepFace.analyze ile aynı ön işleme:
+    224x224'e siyah kenarla oturtulur, griye çevrilip 48x48'e küçültülür.
+    """
+    content = preprocessing.resize_image(img=face, target_size=(224, 224))
+    gray = cv2.cvtColor(content[0], cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (48, 48))
+
+
+def detect_face(img):
+    """
+    Resimdeki ilk yüzü bul ve Emotion girdisine çevir - (48x48 girdi, yüz kutusu) döner.
+    Yüz bulunamazsa (enforce_detection=False) resmin tamamı kullanılır, kutu None olur.
+    """
+    faces = DeepFace.extract_faces(
+        img_path=img,
+        detector_backend='opencv',
+        enforce_detection=False,
+        align=True
+    )
+    for face in faces:
+        content = face["face"]
+        if content.shape[0] == 0 or content.shape[1] == 0:
+            continue
+        area = face["facial_area"]
+        box = (area["x"], area["y"], area["w"], area["h"]) if face.get("confidence") else None
+        # extract_faces RGB döndürür, model BGR bekler
+        return face_input(content[:, :, ::-1]), box
+    raise ValueError("Resimde yüz bulunamadı")
+
+
+def extract_face(img):
+    """Resimdeki ilk yüzü Emotion modelinin girdisine (48x48 gri, [0,1]) çevir"""
+    return detect_face(img)[0]
+
+
+# Tekrar önbelleği: aynı (ya da --dedup-distance ile neredeyse aynı) kare modeli tekrar çalıştırmaz
+# server_mode'da kurulur; None iken her resim analiz edilir
+dedup_cache = None
+
+
+def read_image_bytes(image, encoded):
+    """
+    Önbellek anahtarı için resmin ham baytları: base64 çözülür, yerel dosya okunur.
+    Yerel dosya olmayan yollar (URL, data URL) için None - bunlar önbelleğe girmeden DeepFace'e gider.
+    """
+    if encoded:
+        return decode_base64(image)
+    if isinstance(image, str) and os.path.isfile(image):
+        with open(image, "rb") as f:
+            return f.read()
+    return None
+
+
+def cached_result(result):
+    """Önbellekteki sonucun kopyası - yanıta eklenen alanlar kayda yazılmasın"""
+    return {**result, "cached": True}
+
+
+# Oturum modu: aynı session_id'nin karelerinde son yüz kutusu doğrulanıp yeniden kullanılır
+tracker = FaceTracker()
+
+
+def track_face(session_id, img):
+    """
+    Oturum modunda yüz - (48x48 girdi, tespit atlandı mı) döner.
+    Son kutu bu karede doğrulanırsa tespit atlanır ve kutu kırpılır (hizalama yapılmaz);
+    doğrulanamazsa tam tespit yapılır ve yeni kutu oturuma kaydedilir.
+    """
+    if isinstance(img, str):
+        path = img
+        img = cv2.imread(path)
+        if img is None:
+            raise ValueError(f"Confirm that {path} exists")
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     
-    if total == 0:
-        return {
-            'score': 50.0,
-            'certainty': 0.0,
-            'emotionalTone': 'belirsiz',
-            'explanation': 'Duygu tespiti yapılamadı',
-            'happy_total': 0,
-            'negative_total': 0,
-            'neutral_impact': 0,
-            'surprise_contribution': 0,
-            'valence': 0,
-            'entropy': 0
-        }
+    box = tracker.locate(session_id, gray)
+    if box is not None:
+        x, y, w, h = box
+        return face_input(img[y:y + h, x:x + w] / 255), True
     
-    # Entropy hesabı
-    entropy = 0
-    for prob in emotions.values():
-        p = prob / total
-        if p > 0:
-            entropy -= p * math.log2(p)
-    
-    max_entropy = math.log2(7)
-    certainty = (1 - entropy / max_entropy) * 100
-    
-    # Valence hesabı
-    happy = emotions.get('happy', 0)
-    negative = (emotions.get('sad', 0) +
-                emotions.get('fear', 0) +
-                emotions.get('angry', 0) +
-                emotions.get('disgust', 0))
-    
-    valence = happy - negative
-    
-    # Surprise ayarlaması
-    surprise = emotions.get('surprise', 0)
-    adjusted_valence = valence
-    surprise_contribution = 0
-    surprise_reason = 'Nötr Etki'
-    
-    if surprise > 0.3 * total:
-        if valence > 0:
-            surprise_contribution = surprise * 0.5
-            adjusted_valence += surprise_contribution
-            surprise_reason = 'Pozitif (Mutluluk Baskın)'
-        elif valence < 0:
-            surprise_contribution = -surprise * 0.3
-            adjusted_valence += surprise_contribution
-            surprise_reason = 'Negatif (Olumsuz Duygular Baskın)'
-    
-    # Neutral etkisi
-    neutral = emotions.get('neutral', 0)
-    neutral_penalty = 0
-    
-    if neutral > 0.7 * total:
-        neutral_penalty = (neutral / total - 0.7) * 0.5
-    
-    # Final skor
-    certainty_component = certainty / 100
-    emotion_component = (adjusted_valence / total + 1) / 2
-    
-    final_score = (certainty_component * 0.6 + emotion_component * 0.4) * 100
-    final_score = max(0, min(100, final_score - neutral_penalty * 100))
-    
-    # Duygusal ton
-    valence_normalized = adjusted_valence / total
-    if valence_normalized > 0.2:
-        emotional_tone = 'pozitif'
-    elif valence_normalized < -0.2:
-        emotional_tone = 'negatif'
+    crop, box = detect_face(img)
+    if box is not None:
+        tracker.update(session_id, gray, box)
     else:
-        emotional_tone = 'nötr'
-    
-    if final_score > 70:
-        explanation = f'Yüksek güven: Net {emotional_tone} duygusal durum'
-    elif final_score > 50:
-        explanation = f'Orta güven: {emotional_tone} ton, orta kesinlik'
-    elif final_score > 30:
-        explanation = f'Düşük güven: {"Karışık duygular" if certainty < 40 else "Negatif ton"}'
-    else:
-        explanation = 'Çok düşük güven: Belirsiz duygusal durum'
+        tracker.forget(session_id)
+    return crop, False
+
+
+def predict_emotions(client, crops):
+    """Tüm yüzleri Emotion modelinden tek forward pass'te geçir - yüz başına yüzdelik duygu dağılımı"""
+    batch = np.stack(crops)[..., np.newaxis]
+    predictions = client.model(batch, training=False).numpy()
+    return [
+        {label: float(100 * row[i] / row.sum()) for i, label in enumerate(EMOTION_LABELS)}
+        for row in predictions
+    ]
+
+
+def build_emotion_result(emotions, confidence_result=None):
+    """Duygu dağılımından yanıt: bağlamsal güven skoru, ayrıntılar ve yüzdeler"""
+    if confidence_result is None:
+        confidence_result = calculate_contextual_confidence(emotions)
+    
+    total = sum(emotions.values())
+    emotions_percent = {k: round(v / total * 100, 1) for k, v in emotions.items()}
     
     return {
-        'score': round(final_score, 2),
-        'certainty': round(certainty, 2),
-        'emotionalTone': emotional_tone,
-        'explanation': explanation,
-        'happy_total': round(happy, 2),
-        'negative_total': round(negative, 2),
-        'neutral_impact': round(neutral, 2),
-        'surprise_contribution': round(surprise_contribution, 2),
-        'surprise_reason': surprise_reason,
-        'valence': round(valence, 2),
-        'adjusted_valence': round(adjusted_valence, 2),
-        'entropy': round(entropy, 4),
-        'neutral_penalty': round(neutral_penalty, 4)
+        "confidence_score": round(confidence_result['score'], 1),
+        "details": confidence_result,
+        "emotions": emotions_percent
     }
 
 
-def analyze_image(img_path):
-    """Tek bir resmi analiz et"""
-    try:
-        result = DeepFace.analyze(
-            img_path=img_path,
-            actions=['emotion'],
-            enforce_detection=False,
-            detector_backend='opencv',
-            silent=True
-        )
+def analyze_images(images, encoded=False, session_id=None):
+    """
+    Resimleri toplu analiz et: her resimde yüz tespiti yapılır, tüm yüzler Emotion modelinden tek batch'te geçer.
+    images: resim yolları ya da encoded=True ile base64 resim baytları (bellekte çözülür).
+    session_id verilirse kareler sırayla o oturumun yüz takibinden geçer (bkz. track_face).
+    dedup_cache açıksa daha önce analiz edilmiş kareler modele gitmez, sonuç "cached": true ile döner
+    (oturum karelerinin kayıtları session_id'ye aittir, tam tespitle üretilenlerle karışmaz).
+    Sonuçlar resim sırasıyla döner; okunamayan/yüzsüz resim sadece kendi sonucunda hata taşır.
+    """
+    results = [None] * len(images)
+    crops = []
+    owners = []
+    tracked = {}
+    keys = {}
+    phashes = {}
+    # Takip edilen kutudan kırpılan yüz tam tespitle bulunandan farklı olabilir - kayıtlar moda göre ayrılır
+    scope = None if session_id is None else f"session:{session_id}"
+    
+    if encoded or dedup_cache is not None:
+        # base64 çözme / dosya okuma - önbellek anahtarı ham baytlardan hesaplanır
+        with stage("read"):
+            raws = [None] * len(images)
+            for i, image in enumerate(images):
+                try:
+                    raws[i] = read_image_bytes(image, encoded)
+                except Exception as e:
+                    results[i] = {"error": str(e)}
         
-        emotions = result[0]['emotion']
-        emotions_float = {k: float(v) for k, v in emotions.items()}
+        if dedup_cache is not None:
+            with stage("cache_lookup"):
+                for i, raw in enumerate(raws):
+                    if raw is None:
+                        continue
+                    keys[i] = content_key(raw)
+                    hit = dedup_cache.get(keys[i], scope)
+                    if hit is not None:
+                        results[i] = cached_result(hit)
         
-        confidence_result = calculate_contextual_confidence(emotions_float)
+        with stage("decode"):
+            decoded = list(images)
+            for i, raw in enumerate(raws):
+                if raw is None or results[i] is not None:
+                    continue
+                try:
+                    decoded[i] = decode_bytes(raw)
+                except Exception as e:
+                    results[i] = {"error": str(e)}
+            images = decoded
         
-        total = sum(emotions_float.values())
-        emotions_percent = {k: round(v / total * 100, 1) for k, v in emotions_float.items()}
+        if dedup_cache is not None and dedup_cache.near is not None:
+            with stage("near_lookup"):
+                for i in keys:
+                    if results[i] is not None:
+                        continue
+                    phashes[i] = perceptual_hash(images[i])
+                    hit = dedup_cache.get_near(phashes[i], scope)
+                    if hit is not None:
+                        results[i] = cached_result(hit)
+    
+    # Yüz tespiti (yol verildiyse resim okuma da bu aşamadadır)
+    with stage("detect"):
+        for i, img in enumerate(images):
+            if results[i] is not None:
+                continue
+            try:
+                if session_id is not None:
+                    crop, tracked[i] = track_face(session_id, img)
+                else:
+                    crop = extract_face(img)
+                crops.append(crop)
+                owners.append(i)
+            except Exception as e:
+                results[i] = {"error": str(e)}
+    
+    if crops:
+        # Analiz sürerken model boşta kalma nedeniyle atılmaz; atılmışsa burada yeniden yüklenir
+        with residency.acquire("emotion") as client:
+            try:
+                if client is None:
+                    raise RuntimeError("Emotion modeli yüklenemedi")
+                with stage("emotion"):
+                    predictions = predict_emotions(client, crops)
+            except Exception as e:
+                for i in owners:
+                    results[i] = {"error": str(e)}
+                return results
+        REGISTRY.observe("emotion_batch_size", len(crops), "Tek forward pass'teki yüz sayısı",
+                         buckets=(1, 2, 4, 8, 16, 32, 64))
         
+        with stage("confidence"):
+            confidences = calculate_contextual_confidence_batch(predictions)
+            for i, emotions, confidence_result in zip(owners, predictions, confidences):
+                results[i] = build_emotion_result(emotions, confidence_result)
+                if i in keys:
+                    # Kopya saklanır: face_tracked gibi istek bazlı alanlar kayda girmez
+                    dedup_cache.put(keys[i], dict(results[i]), phashes.get(i), scope)
+                if i in tracked:
+                    results[i]["face_tracked"] = tracked[i]
+    
+    return results
+
+
+def analyze_image(img_path):
+    """Tek bir resmi analiz et"""
+    return analyze_images([img_path])[0]
+
+
+# stdout'a yazan thread'ler satırları karıştırmasın
+_stdout_lock = threading.Lock()
+
+
+def emit(result):
+    """Tek JSON satırı yaz"""
+    with stage("serialize"):
+        line = json.dumps(result, ensure_ascii=False)
+    with _stdout_lock:
+        print(line, flush=True)
+
+
+def parse_request(line):
+    """
+    İstek satırını çöz: düz resim yolu ya da {"id", "path" | "paths" | "image" | "images", "timings", "deadline_ms", "command"}
+    JSON nesnesi. "image"/"images" base64 resim baytlarıdır (dosyaya yazılmadan bellekte çözülür).
+    "paths"/"images" listesi toplu istektir, yanıt {"results": [...]} olarak resim sırasıyla döner.
+    Opsiyonel "session_id" ile aynı oturumun karelerinde yüz tespiti mümkünse atlanır.
+    Süre sınırı satırın okunduğu andan itibaren sayılır.
+    """
+    if line.startswith('{'):
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("İstek bir JSON nesnesi olmalı")
+        data['deadline_at'] = parse_deadline(data)
+        return data
+    return {"path": line}
+
+
+def analyze_request(request, timings=False):
+    """Resmi (ya da "paths" ile resimleri) analiz et; id varsa yanıta geri ekle, timings açıksa aşama sürelerini ekle"""
+    # Thread havuzunda beklerken süresi dolan istek analiz edilmez
+    if is_expired(request.get('deadline_at')):
+        REGISTRY.inc("deadline_dropped_total", 1, "Çalıştırılmadan süresi dolan istekler")
+        result = {"error": "Deadline exceeded", "deadline_exceeded": True}
+        return {"id": request['id'], **result} if request.get('id') is not None else result
+    
+    started = time.perf_counter()
+    # Resim kaynağı: base64 bayt ya da dosya yolu, tek ya da liste
+    encoded = 'image' in request or 'images' in request
+    key = next((key for key in ('images', 'paths') if key in request), None)
+    batch = key is not None
+    if batch and not isinstance(request[key], list):
+        result = {"error": f"Invalid request: {key} bir liste olmalı"}
+        return {"id": request['id'], **result} if request.get('id') is not None else result
+    if batch:
+        images = request[key]
+    else:
+        images = [request['image'] if encoded else request.get('path', '')]
+    
+    with StageTimer() as timer:
+        results = analyze_images(images, encoded=encoded, session_id=request.get('session_id'))
+    
+    REGISTRY.observe("request_duration_seconds", time.perf_counter() - started, "İstek başına analiz süresi (saniye)")
+    REGISTRY.inc("requests_total", len(results), "Analiz edilen resimler")
+    errors = sum(1 for result in results if "error" in result)
+    if errors:
+        REGISTRY.inc("errors_total", errors, "Hata ile sonuçlanan analizler")
+    
+    result = {"results": results} if batch else results[0]
+    if timings or request.get('timings'):
+        result["timings"] = timer.as_dict()
+    if request.get('id') is not None:
+        result = {"id": request['id'], **result}
+    return result
+
+
+def load_model():
+    """Emotion modelini şimdi yükle (eski davranış: süreç başlarken)"""
+    print("Loading model...", file=sys.stderr, flush=True)
+    error = residency.preload(reason="startup")["emotion"]
+    if error is None:
+        print("Model loaded successfully", file=sys.stderr, flush=True)
+    else:
+        print(f"Model load error: {error}", file=sys.stderr, flush=True)
+
+
+def run_command(request):
+    """
+    Kontrol komutları:
+    {"command": "metrics"} Prometheus metin formatında ölçümler,
+    {"command": "preload"} planlı yoğunluk öncesi modeli yükle, {"command": "unload"} modeli hemen bırak,
+    {"command": "stats"} model durumu (yüklü mü, yükleme sayısı/süresi), yüz takibi (tespit atlama oranı)
+    ve tekrar önbelleği (isabet oranı)
+    """
+    command = request.get('command')
+    if command == 'metrics':
+        return {"metrics": REGISTRY.render_prometheus(METRICS_NAMESPACE)}
+    if command == 'preload':
+        return {"models": residency.preload()}
+    if command == 'unload':
+        return {"unloaded": residency.unload()}
+    if command == 'stats':
         return {
-            "confidence_score": round(confidence_result['score'], 1),
-            "details": confidence_result,
-            "emotions": emotions_percent
+            "models": residency.stats(),
+            "tracking": tracker.stats(),
+            "dedup": dedup_cache.stats() if dedup_cache is not None else None
         }
-    except Exception as e:
-        return {"error": str(e)}
+    return {"error": f"Unknown command: {command}"}
 
 
-def server_mode():
-    """Server modu: stdin'den resim yolu oku, stdout'a JSON yaz"""
+def server_mode(threads=1, timings=False, lazy=False, idle_unload=0, dedup_size=512, dedup_distance=None):
+    """
+    Server modu: stdin'den resim yolu oku, stdout'a JSON yaz.
+    id'li istekler thread havuzunda çalışır ve bittiği sırayla yanıtlanır;
+    id'siz istekler eskisi gibi sırayla işlenir.
+    "command" alanlı satırlar kontrol komutlarıdır (bkz. run_command).
+    lazy: model ilk istekte yüklenir, idle_unload: bu kadar saniye istek gelmezse model bellekten atılır.
+    dedup_size: tekrar önbelleği kapasitesi (0 = kapalı), dedup_distance: yakın tekrar için en fazla dHash farkı.
+    """
+    global dedup_cache
+    residency.idle_timeout = idle_unload
+    if dedup_size > 0:
+        dedup_cache = EmotionCache(dedup_size, dedup_distance)
+        REGISTRY.register_collector(dedup_cache.collect_metrics)
+    if not lazy:
+        load_model()
+    
+    pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="emotion") if threads > 1 else None
+    in_flight = [0]
+    in_flight_lock = threading.Lock()
+    
+    def done(future):
+        with in_flight_lock:
+            in_flight[0] -= 1
+            REGISTRY.set("queue_depth", in_flight[0], "Yanıtlanmayı bekleyen analizler")
+        emit(future.result())
+    
     # Hazır olduğunu bildir
     print("READY", flush=True)
     
-    # Sonsuz döngü: her satır bir resim yolu
+    # Sonsuz döngü: her satır bir resim yolu ya da JSON istek
     for line in sys.stdin:
-        img_path = line.strip()
+        line = line.strip()
         
-        if not img_path:
+        if not line:
             continue
         
-        result = analyze_image(img_path)
-        print(json.dumps(result, ensure_ascii=False), flush=True)
+        try:
+            request = parse_request(line)
+        except ValueError as e:
+            emit({"error": f"Invalid request: {e}"})
+            continue
+        
+        if request.get('command'):
+            response = run_command(request)
+            emit({"id": request['id'], **response} if request.get('id') is not None else response)
+            continue
+        
+        if pool is not None and request.get('id') is not None:
+            with in_flight_lock:
+                in_flight[0] += 1
+                REGISTRY.set("queue_depth", in_flight[0], "Yanıtlanmayı bekleyen analizler")
+            future = pool.submit(analyze_request, request, timings)
+            future.add_done_callback(done)
+        else:
+            emit(analyze_request(request, timings))
+    
+    if pool is not None:
+        pool.shutdown(wait=True)
 
 
 def single_mode():
@@ -168,6 +477,7 @@ def single_mode():
         sys.exit(1)
     
     img_path = sys.argv[1]
+    load_model()
     result = analyze_image(img_path)
     print(json.dumps(result, ensure_ascii=False))
 
@@ -175,6 +485,16 @@ def single_mode():
 if __name__ == "__main__":
     # --server flag var mı kontrol et
     if len(sys.argv) > 1 and sys.argv[1] == '--server':
-        server_mode()
+        # --threads N: id'li istekler için paralel analiz (varsayılan 1)
+        threads = int(sys.argv[sys.argv.index('--threads') + 1]) if '--threads' in sys.argv else 1
+        # --timings: her yanıta aşama sürelerini ekle (istek bazında "timings": true ile de açılır)
+        # --lazy-load: modeli ilk istekte yükle, --idle-unload N: N saniye istek gelmezse modeli bellekten at
+        idle_unload = float(sys.argv[sys.argv.index('--idle-unload') + 1]) if '--idle-unload' in sys.argv else 0
+        # --dedup-size N: tekrar önbelleği kapasitesi (varsayılan 512, 0 = kapalı)
+        # --dedup-distance D: dHash farkı D bite kadar olan kareleri de tekrar say (varsayılan: sadece aynı baytlar)
+        dedup_size = int(sys.argv[sys.argv.index('--dedup-size') + 1]) if '--dedup-size' in sys.argv else 512
+        dedup_distance = int(sys.argv[sys.argv.index('--dedup-distance') + 1]) if '--dedup-distance' in sys.argv else None
+        server_mode(threads, timings='--timings' in sys.argv, lazy='--lazy-load' in sys.argv, idle_unload=idle_unload,
+                    dedup_size=dedup_size, dedup_distance=dedup_distance)
     else:
         single_mode()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Duygu analizi tekrar önbelleği
+Otomatik çekim modu art arda neredeyse aynı kareler gönderir, hata/yeniden başlatma sonrası tekrar denemeler
+aynı baytları yeniden yollar; bunların her biri tam yüz tespiti + Emotion çıkarımı demektir.
+- exact: resim baytlarının içerik hash'i (BLAKE2b) -> sonuç; aynı bayt her zaman aynı sonucu verir
+- near:  opsiyonel algısal hash (64 bit dHash) -> sonuç; Hamming mesafesi max_distance'a kadar olan kareler
+         aynı sayılır (küçük sensör gürültüsü, JPEG farkları)
+İkisi de result_cache.ResultCache (LRU) üzerindedir. Kayıtlar scope ile ayrılır: aynı resim tam tespitle
+(scope=None) ve oturum takibiyle (scope=session_id, hizalamasız kutu kırpması) farklı sonuç verebilir.
+
+    key = content_key(raw)
+    result = cache.get(key, scope)                  # ya da çözülen resimle: cache.get_near(perceptual_hash(img), scope)
+    ...
+    cache.put(key, result, perceptual_hash(img), scope)
+"""
+
+import hashlib
+
+import cv2
+import numpy as np
+
+from result_cache import ResultCache
+
+
+def content_key(raw: bytes) -> str:
+    """Resim baytlarının içerik hash'i"""
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def perceptual_hash(img, hash_size: int = 8) -> int:
+    """
+    Fark hash'i (dHash): resim gri tonda (hash_size + 1) x hash_size'a küçültülür, her piksel sağ komşusuyla
+    karşılaştırılır. Parlaklık/sıkıştırma farklarına dayanıklı, hash_size * hash_size bitlik tamsayı döner.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class EmotionCache:
+    """Resim -> analiz sonucu; içerik hash'i ile tam, opsiyonel dHash ile yakın tekrar eşleşmesi"""
+
+    def __init__(self, max_entries: int = 512, max_distance: int = None):
+        """
+        max_distance: yakın tekrar için en fazla farklı dHash biti (None = sadece bayt bayt aynı resimler).
+        0 aynı dHash'i, 4-6 gibi değerler gözle ayırt edilemeyen kareleri eşler.
+        """
+        self.max_distance = max_distance
+        self.exact = ResultCache(max_entries)
+        self.near = ResultCache(max_entries) if max_distance is not None else None
+
+    def get(self, key: str, scope=None):
+        """İçerik hash'i ile aynı scope'taki sonuç (yoksa None)"""
+        return self.exact.get((scope, key))
+
+    def get_near(self, phash: int, scope=None):
+        """Aynı scope'ta algısal hash'i max_distance içinde olan son sonuç (yakın tekrar kapalıysa ya da yoksa None)"""
+        if self.near is None:
+            return None
+        if self.max_distance == 0:
+            return self.near.get((scope, phash))
+        return self.near.find(lambda key: key[0] == scope and hamming(key[1], phash) <= self.max_distance)
+
+    def put(self, key: str, result: dict, phash: int = None, scope=None):
+        """scope: sonucu üreten tespit modu (None = tam tespit, oturum modunda session_id)"""
+        self.exact.put((scope, key), result)
+        if self.near is not None and phash is not None:
+            self.near.put((scope, phash), result)
+
+    def clear(self):
+        self.exact.clear()
+        if self.near is not None:
+            self.near.clear()
+
+    def stats(self) -> dict:
+        """Tam/yakın isabetler ve toplam isabet oranı (her istek önce tam, ıskalarsa yakın eşleşmeye bakar)"""
+        exact = self.exact.stats()
+        near = self.near.stats() if self.near is not None else None
+        lookups = exact["hits"] + exact["misses"]
+        hits = exact["hits"] + (near["hits"] if near is not None else 0)
+        return {
+            "exact": exact,
+            "near": near,
+            "max_distance": self.max_distance,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    def collect_metrics(self) -> list:
+        """REGISTRY.register_collector için önbellek sayaçları"""
+        samples = []
+        for kind, stats in (("exact", self.exact.stats()), ("near", self.near.stats() if self.near is not None else None)):
+            if stats is None:
+                continue
+            samples += [
+                ("dedup_cache_hits_total", "counter", "Tekrar önbelleği isabetleri", stats["hits"], {"kind": kind}),
+                ("dedup_cache_misses_total", "counter", "Tekrar önbelleği ıskaları", stats["misses"], {"kind": kind}),
+                ("dedup_cache_evictions_total", "counter", "Önbellekten çıkarılan kayıtlar", stats["evictions"], {"kind": kind}),
+                ("dedup_cache_size", "gauge", "Önbellekteki kayıtlar", stats["size"], {"kind": kind}),
+            ]
+        return samples
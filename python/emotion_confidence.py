@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bağlamsal güven skoru - duygu dağılımından (angry ... neutral) 0-100 skor
+- calculate_contextual_confidence: tek kare (duygu sözlüğü), canlı analizde kullanılır
+- score_frames / calculate_contextual_confidence_batch: (N kare x 7 duygu) dizisi tek seferde, sonuçlar
+  skaler sürümle birebir aynı
+- session_aggregates / score_sessions: oturum bazında zaman serisi (kayan ortalama, EWMA, soru özetleri)
+
+Kayıtlı oturumları çevrimdışı yeniden skorlamak için:
+
+    python emotion_confidence.py frames.jsonl --window 5 --alpha 0.3 > sessions.json
+
+Her satır {"session_id", "question_id", "timestamp", "emotions": {...}} nesnesidir.
+"""
+
+import sys
+import json
+import math
+import argparse
+
+import numpy as np
+
+# DeepFace Emotion modelinin çıktı sırası - dizi sütunları bu sırayla
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+def calculate_contextual_confidence(emotions):
+    """
+    Bağlamsal Güven Skoru Hesaplama
+    """
+    total = sum(emotions.values())
+    
+    if total == 0:
+        return {
+            'score': 50.0,
+            'certainty': 0.0,
+            'emotionalTone': 'belirsiz',
+            'explanation': 'Duygu tespiti yapılamadı',
+            'happy_total': 0,
+            'negative_total': 0,
+            'neutral_impact': 0,
+            'surprise_contribution': 0,
+            'valence': 0,
+            'entropy': 0
+        }
+    
+    # Entropy hesabı
+    entropy = 0
+    for prob in emotions.values():
+        p = prob / total
+        if p > 0:
+            entropy -= p * math.log2(p)
+    
+    max_entropy = math.log2(7)
+    certainty = (1 - entropy / max_entropy) * 100
+    
+    # Valence hesabı
+    happy = emotions.get('happy', 0)
+    negative = (emotions.get('sad', 0) +
+                emotions.get('fear', 0) +
+                emotions.get('angry', 0) +
+                emotions.get('disgust', 0))
+    
+    valence = happy - negative
+    
+    # Surprise ayarlaması
+    surprise = emotions.get('surprise', 0)
+    adjusted_valence = valence
+    surprise_contribution = 0
+    surprise_reason = 'Nötr Etki'
+    
+    if surprise > 0.3 * total:
+        if valence > 0:
+            surprise_contribution = surprise * 0.5
+            adjusted_valence += surprise_contribution
+            surprise_reason = 'Pozitif (Mutluluk Baskın)'
+        elif valence < 0:
+            surprise_contribution = -surprise * 0.3
+            adjusted_valence += surprise_contribution
+            surprise_reason = 'Negatif (Olumsuz Duygular Baskın)'
+    
+    # Neutral etkisi
+    neutral = emotions.get('neutral', 0)
+    neutral_penalty = 0
+    
+    if neutral > 0.7 * total:
+        neutral_penalty = (neutral / total - 0.7) * 0.5
+    
+    # Final skor
+    certainty_component = certainty / 100
+    emotion_component = (adjusted_valence / total + 1) / 2
+    
+    final_score = (certainty_component * 0.6 + emotion_component * 0.4) * 100
+    final_score = max(0, min(100, final_score - neutral_penalty * 100))
+    
+    # Duygusal ton
+    valence_normalized = adjusted_valence / total
+    if valence_normalized > 0.2:
+        emotional_tone = 'pozitif'
+    elif valence_normalized < -0.2:
+        emotional_tone = 'negatif'
+    else:
+        emotional_tone = 'nötr'
+    
+    if final_score > 70:
+        explanation = f'Yüksek güven: Net {emotional_tone} duygusal durum'
+    elif final_score > 50:
+        explanation = f'Orta güven: {emotional_tone} ton, orta kesinlik'
+    elif final_score > 30:
+        explanation = f'Düşük güven: {"Karışık duygular" if certainty < 40 else "Negatif ton"}'
+    else:
+        explanation = 'Çok düşük güven: Belirsiz duygusal durum'
+    
+    return {
+        'score': round(final_score, 2),
+        'certainty': round(certainty, 2),
+        'emotionalTone': emotional_tone,
+        'explanation': explanation,
+        'happy_total': round(happy, 2),
+        'negative_total': round(negative, 2),
+        'neutral_impact': round(neutral, 2),
+        'surprise_contribution': round(surprise_contribution, 2),
+        'surprise_reason': surprise_reason,
+        'valence': round(valence, 2),
+        'adjusted_valence': round(adjusted_valence, 2),
+        'entropy': round(entropy, 4),
+        'neutral_penalty': round(neutral_penalty, 4)
+    }
+
+
+def _column(emotions, name):
+    return emotions[:, EMOTION_LABELS.index(name)]
+
+
+def score_frames(emotions):
+    """
+    calculate_contextual_confidence'ın vektörel hali - (N, 7) dizi, sütunlar EMOTION_LABELS sırasında.
+    Yuvarlanmamış ara değerleri sütun dizileri olarak döndürür (score, certainty, valence, ...).
+    Toplamlar skaler sürümle aynı sırada yapılır, böylece sonuçlar bit düzeyinde aynı kalır.
+    """
+    emotions = np.asarray(emotions, dtype=np.float64).reshape(-1, len(EMOTION_LABELS))
+    columns = [emotions[:, i] for i in range(len(EMOTION_LABELS))]
+    
+    total = np.zeros(len(emotions))
+    for column in columns:
+        total = total + column
+    empty = total == 0
+    safe_total = np.where(empty, 1.0, total)
+    
+    # Entropy hesabı
+    entropy = np.zeros(len(emotions))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for column in columns:
+            p = column / safe_total
+            entropy = entropy - np.where(p > 0, p * np.log2(np.where(p > 0, p, 1.0)), 0.0)
+    
+    max_entropy = math.log2(7)
+    certainty = (1 - entropy / max_entropy) * 100
+    
+    # Valence hesabı
+    happy = _column(emotions, 'happy')
+    negative = _column(emotions, 'sad') + _column(emotions, 'fear') + _column(emotions, 'angry') + _column(emotions, 'disgust')
+    valence = happy - negative
+    
+    # Surprise ayarlaması
+    surprise = _column(emotions, 'surprise')
+    strong_surprise = surprise > 0.3 * total
+    surprise_contribution = np.select(
+        [strong_surprise & (valence > 0), strong_surprise & (valence < 0)],
+        [surprise * 0.5, -surprise * 0.3],
+        0.0
+    )
+    adjusted_valence = valence + surprise_contribution
+    
+    # Neutral etkisi
+    neutral = _column(emotions, 'neutral')
+    penalized = neutral > 0.7 * total
+    neutral_penalty = np.where(penalized, (neutral / safe_total - 0.7) * 0.5, 0.0)
+    
+    # Final skor
+    certainty_component = certainty / 100
+    emotion_component = (adjusted_valence / safe_total + 1) / 2
+    final_score = (certainty_component * 0.6 + emotion_component * 0.4) * 100 - neutral_penalty * 100
+    # Skaler sürümde max(0, min(100, ...)) sınıra dayanınca tamsayı 0 / 100 döner
+    clamped = (final_score <= 0) | (final_score >= 100)
+    final_score = np.maximum(0, np.minimum(100, final_score))
+    
+    return {
+        "empty": empty,
+        "score": np.where(empty, 50.0, final_score),
+        "clamped": clamped,
+        "certainty": np.where(empty, 0.0, certainty),
+        "valence_normalized": adjusted_valence / safe_total,
+        "happy": happy,
+        "negative": negative,
+        "neutral": neutral,
+        "surprise": surprise,
+        "strong_surprise": strong_surprise,
+        "surprise_contribution": surprise_contribution,
+        "valence": valence,
+        "adjusted_valence": adjusted_valence,
+        "entropy": entropy,
+        "neutral_penalty": neutral_penalty,
+        "penalized": penalized,
+    }
+
+
+def _integral_mask(emotions):
+    """
+    (N, 7) - hangi girdilerin tamsayı olduğu. Skaler sürüm tamsayı girdide toplamları da tamsayı döndürür
+    (ör. happy_total 50, surprise_contribution 0); toplu sürüm aynı tipleri üretmek için buna bakar.
+    """
+    if len(emotions) and isinstance(emotions[0], dict):
+        return np.array(
+            [[isinstance(frame.get(label, 0), int) for label in EMOTION_LABELS] for frame in emotions], dtype=bool
+        ).reshape(-1, len(EMOTION_LABELS))
+    emotions = np.asarray(emotions)
+    return np.full(emotions.shape, np.issubdtype(emotions.dtype, np.integer), dtype=bool).reshape(-1, len(EMOTION_LABELS))
+
+
+def _typed(value, integral, digits):
+    """Skaler sürümdeki round(...) sonucu ile aynı tip: tamsayı girdiden int, aksi halde float"""
+    return int(value) if integral else round(float(value), digits)
+
+
+def calculate_contextual_confidence_batch(emotions):
+    """
+    Birden fazla kare için calculate_contextual_confidence - her satır için aynı sözlük (değerler ve tipler).
+    emotions: (N, 7) dizi ya da duygu sözlükleri listesi.
+    """
+    integral = _integral_mask(emotions)
+    if len(emotions) and isinstance(emotions[0], dict):
+        emotions = [[frame.get(label, 0) for label in EMOTION_LABELS] for frame in emotions]
+    scores = score_frames(emotions)
+    
+    def is_int(i, *names):
+        return all(integral[i, EMOTION_LABELS.index(name)] for name in names)
+    
+    results = []
+    for i in range(len(scores["score"])):
+        if scores["empty"][i]:
+            results.append(calculate_contextual_confidence({}))
+            continue
+        
+        valence_normalized = scores["valence_normalized"][i]
+        if valence_normalized > 0.2:
+            emotional_tone = 'pozitif'
+        elif valence_normalized < -0.2:
+            emotional_tone = 'negatif'
+        else:
+            emotional_tone = 'nötr'
+        
+        final_score = float(scores["score"][i])
+        certainty = float(scores["certainty"][i])
+        if final_score > 70:
+            explanation = f'Yüksek güven: Net {emotional_tone} duygusal durum'
+        elif final_score > 50:
+            explanation = f'Orta güven: {emotional_tone} ton, orta kesinlik'
+        elif final_score > 30:
+            explanation = f'Düşük güven: {"Karışık duygular" if certainty < 40 else "Negatif ton"}'
+        else:
+            explanation = 'Çok düşük güven: Belirsiz duygusal durum'
+        
+        if scores["strong_surprise"][i] and scores["valence"][i] > 0:
+            surprise_reason = 'Pozitif (Mutluluk Baskın)'
+        elif scores["strong_surprise"][i] and scores["valence"][i] < 0:
+            surprise_reason = 'Negatif (Olumsuz Duygular Baskın)'
+        else:
+            surprise_reason = 'Nötr Etki'
+        
+        # Uygulanmayan düzeltmeler skaler sürümde tamsayı 0 olarak kalır
+        surprise_applied = surprise_reason != 'Nötr Etki'
+        valence_int = is_int(i, 'happy', 'sad', 'fear', 'angry', 'disgust')
+        
+        results.append({
+            'score': _typed(final_score, scores["clamped"][i], 2),
+            'certainty': round(certainty, 2),
+            'emotionalTone': emotional_tone,
+            'explanation': explanation,
+            'happy_total': _typed(scores["happy"][i], is_int(i, 'happy'), 2),
+            'negative_total': _typed(scores["negative"][i], is_int(i, 'sad', 'fear', 'angry', 'disgust'), 2),
+            'neutral_impact': _typed(scores["neutral"][i], is_int(i, 'neutral'), 2),
+            'surprise_contribution': _typed(scores["surprise_contribution"][i], not surprise_applied, 2),
+            'surprise_reason': surprise_reason,
+            'valence': _typed(scores["valence"][i], valence_int, 2),
+            'adjusted_valence': _typed(scores["adjusted_valence"][i], valence_int and not surprise_applied, 2),
+            'entropy': round(float(scores["entropy"][i]), 4),
+            'neutral_penalty': _typed(scores["neutral_penalty"][i], not scores["penalized"][i], 4)
+        })
+    return results
+
+
+def rolling_mean(values, window):
+    """Son window değerin ortalaması - seri başında eldeki kadar değerle (min_periods=1)"""
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1:
+        raise ValueError("window en az 1 olmalı")
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(0, ends - window)
+    return (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
+
+def ewma(values, alpha):
+    """Üstel ağırlıklı hareketli ortalama: s[0] = x[0], s[t] = alpha * x[t] + (1 - alpha) * s[t-1]"""
+    values = np.asarray(values, dtype=np.float64)
+    if not 0 < alpha <= 1:
+        raise ValueError("alpha (0, 1] aralığında olmalı")
+    smoothed = np.empty_like(values)
+    level = values[0] if len(values) else 0.0
+    for i, value in enumerate(values):
+        level = alpha * value + (1 - alpha) * level
+        smoothed[i] = level
+    return smoothed
+
+
+def _summary(scores):
+    return {
+        "frames": int(len(scores)),
+        "mean": round(float(scores.mean()), 2),
+        "min": round(float(scores.min()), 2),
+        "max": round(float(scores.max()), 2),
+        "last": round(float(scores[-1]), 2)
+    }
+
+
+def session_aggregates(scores, question_ids=None, window=5, alpha=0.3):
+    """
+    Bir oturumun (zamana göre sıralı) kare skorlarından zaman serisi özetleri:
+    kayan ortalama, EWMA ile yumuşatılmış seri ve soru bazında kare sayısı / ortalama / min / max / son skor.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    result = {
+        "frames": int(len(scores)),
+        "rolling_mean": np.round(rolling_mean(scores, window), 2).tolist(),
+        "ewma": np.round(ewma(scores, alpha), 2).tolist(),
+        "summary": _summary(scores) if len(scores) else None,
+        "questions": {}
+    }
+    if question_ids is not None and len(scores):
+        question_ids = np.asarray(question_ids, dtype=object)
+        # Sorular oturumdaki ilk görülme sırasıyla
+        _, first = np.unique(question_ids.astype(str), return_index=True)
+        for question_id in question_ids[np.sort(first)]:
+            result["questions"][str(question_id)] = _summary(scores[question_ids == question_id])
+    return result
+
+
+def _timestamp_key(value):
+    """
+    Sıralama anahtarı - sayılar ve sayı gibi okunan metinler sayısal, diğer metinler (ISO 8601) metin olarak
+    karşılaştırılır; timestamp'i olmayan kare 0 sayılır. Karışık tipler TypeError vermez.
+    """
+    if value is None:
+        return (0, 0.0, "")
+    try:
+        return (0, float(value), "")
+    except (TypeError, ValueError):
+        return (1, 0.0, str(value))
+
+
+def score_sessions(frames, window=5, alpha=0.3):
+    """
+    Kayıtlı kareleri toplu skorla ve oturum bazında özetle.
+    frames: {"session_id", "question_id" (opsiyonel), "timestamp" (opsiyonel), "emotions": {...}} listesi.
+    Tüm kareler tek bir (N, 7) diziyle skorlanır; oturumlar timestamp'e göre sıralanır.
+    """
+    if not frames:
+        return {}
+    emotions = np.array(
+        [[frame["emotions"].get(label, 0) for label in EMOTION_LABELS] for frame in frames], dtype=np.float64
+    )
+    scores = score_frames(emotions)["score"]
+
+    sessions = {}
+    for i, frame in enumerate(frames):
+        sessions.setdefault(str(frame.get("session_id")), []).append(i)
+
+    result = {}
+    for session_id, indices in sessions.items():
+        indices = sorted(indices, key=lambda i: _timestamp_key(frames[i].get("timestamp")))
+        aggregates = session_aggregates(
+            scores[indices], [frames[i].get("question_id") for i in indices], window, alpha
+        )
+        aggregates["scores"] = [round(float(score), 2) for score in scores[indices]]
+        result[session_id] = aggregates
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kayıtlı duygu karelerini oturum bazında yeniden skorla")
+    parser.add_argument("frames", nargs="?", default="-", help="JSONL kare dosyası (- = stdin)")
+    parser.add_argument("--window", type=int, default=5, help="Kayan ortalama pencere boyutu (kare)")
+    parser.add_argument("--alpha", type=float, default=0.3, help="EWMA yumuşatma katsayısı (0-1]")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.frames == "-" else open(args.frames, encoding="utf-8")
+    with source:
+        frames = [json.loads(line) for line in source if line.strip()]
+
+    json.dump(score_sessions(frames, args.window, args.alpha), sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
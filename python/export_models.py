@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model dışa aktarma - mBART ve MT5 checkpoint'lerinden CPU backend artefaktları üretir
+ve torch çıktılarıyla eşdeğerlik kontrolü yapar.
+
+    python export_models.py --output models/onnx              # ONNX (KV cache'li encoder/decoder)
+    python export_models.py --output models/onnx --quantize   # + models/onnx-int8 (dinamik INT8 ONNX)
+    python export_models.py --output models/onnx --check-only # sadece eşdeğerlik kontrolü
+
+Çıktı, unified_inference.py --backend onnx --onnx-dir <klasör> ile kullanılır.
+"""
+
+import sys
+import copy
+import json
+import shutil
+import argparse
+import logging
+from pathlib import Path
+
+import torch
+from transformers import MBartForConditionalGeneration, MBartTokenizer
+from transformers import MT5ForConditionalGeneration, MT5Tokenizer
+
+from model_backends import import_ort_seq2seq, quantize_int8
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Model adı -> (varsayılan checkpoint, model sınıfı, tokenizer sınıfı)
+MODELS = {
+    "mbart": ("Ozget/MetaMind_Nlp_MBART_2", MBartForConditionalGeneration, MBartTokenizer),
+    "mt5": ("Ozget/MetaMind_Nlp_MT5_2", MT5ForConditionalGeneration, MT5Tokenizer),
+}
+
+# Eşdeğerlik kontrolü için örnek prompt'lar
+SAMPLE_PROMPTS = [
+    "Soru: Türkiye'nin başkenti neresidir? Öğrenci Cevabı: Ankara Hedef Cevap: Ankara",
+    "Soru: Dünyanın en kalabalık ülkesi hangisidir?\nCevap: hindistan\nDoğru: çin",
+    "Değerlendirme: 'Mona Lisa'yı kim çizdi?' sorusuna 'leonardo' cevabı. Beklenen: 'leonardo da vinci'",
+]
+
+
+def export_onnx(source: str, output_dir: Path, tokenizer_cls) -> Path:
+    """Checkpoint'i ONNX'e aktar (encoder + KV cache'li decoder) ve tokenizer'ı yanına kaydet"""
+    ORTModelForSeq2SeqLM = import_ort_seq2seq()
+
+    logger.info(f"📤 ONNX'e aktarılıyor: {source} -> {output_dir}")
+    model = ORTModelForSeq2SeqLM.from_pretrained(source, export=True, use_cache=True)
+    model.save_pretrained(output_dir)
+    tokenizer_cls.from_pretrained(source).save_pretrained(output_dir)
+    return output_dir
+
+
+def quantize_onnx(model_dir: Path, output_dir: Path) -> Path:
+    """ONNX dosyalarını dinamik INT8 kuantize et; dosya adları korunur, böylece aynı yükleyici kullanılır"""
+    try:
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    except ImportError as e:
+        raise ImportError("INT8 ONNX için 'optimum[onnxruntime]' gerekli") from e
+
+    logger.info(f"🗜️  INT8 kuantize ediliyor: {model_dir} -> {output_dir}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    for onnx_file in sorted(model_dir.glob("*.onnx")):
+        quantizer = ORTQuantizer.from_pretrained(model_dir, file_name=onnx_file.name)
+        quantizer.quantize(save_dir=output_dir, quantization_config=qconfig, file_suffix=None)
+
+    # Config ve tokenizer dosyaları aynen kopyalanır
+    for extra in model_dir.iterdir():
+        if extra.suffix != ".onnx" and extra.is_file() and not (output_dir / extra.name).exists():
+            shutil.copy2(extra, output_dir / extra.name)
+    return output_dir
+
+
+def check_equivalence(reference, candidate, tokenizer, prompts: list, max_new_tokens: int = 32) -> dict:
+    """
+    Aday backend'i torch referansıyla karşılaştır:
+    ilk decoder adımının logit farkı, top-1 token uyumu ve greedy decode çıktılarının birebir uyumu.
+    """
+    max_abs_diff = 0.0
+    top1_matches = 0
+    greedy_matches = 0
+    start = reference.config.decoder_start_token_id
+
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors='pt')
+        decoder_input_ids = torch.tensor([[start]])
+
+        with torch.no_grad():
+            reference_logits = reference(**inputs, decoder_input_ids=decoder_input_ids).logits
+            candidate_logits = candidate(**inputs, decoder_input_ids=decoder_input_ids).logits
+
+            reference_ids = reference.generate(**inputs, do_sample=False, num_beams=1, max_new_tokens=max_new_tokens)
+            candidate_ids = candidate.generate(**inputs, do_sample=False, num_beams=1, max_new_tokens=max_new_tokens)
+
+        max_abs_diff = max(max_abs_diff, (reference_logits - candidate_logits).abs().max().item())
+        top1_matches += int(reference_logits[0, -1].argmax() == candidate_logits[0, -1].argmax())
+        greedy_matches += int(
+            tokenizer.decode(reference_ids[0], skip_special_tokens=True)
+            == tokenizer.decode(candidate_ids[0], skip_special_tokens=True)
+        )
+
+    return {
+        "prompts": len(prompts),
+        "max_abs_logit_diff": round(max_abs_diff, 6),
+        "top1_match_rate": round(top1_matches / len(prompts), 4),
+        "greedy_match_rate": round(greedy_matches / len(prompts), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mBART/MT5 checkpoint'lerini ONNX / INT8'e aktar ve doğrula")
+    parser.add_argument('--output', required=True, help="ONNX çıktı klasörü (<output>/mbart, <output>/mt5)")
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+    parser.add_argument('--mbart', default=MODELS["mbart"][0], help="mBART checkpoint (hub id ya da yerel klasör)")
+    parser.add_argument('--mt5', default=MODELS["mt5"][0], help="MT5 checkpoint (hub id ya da yerel klasör)")
+    parser.add_argument('--quantize', action='store_true', help="Ek olarak <output>-int8 altına INT8 ONNX üret")
+    parser.add_argument('--check-only', action='store_true', help="Dışa aktarma yapma, mevcut çıktıları doğrula")
+    parser.add_argument('--tolerance', type=float, default=1e-3,
+                        help="fp32 ONNX için kabul edilen en büyük logit farkı")
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    int8_output = output.with_name(output.name + "-int8")
+    sources = {"mbart": args.mbart, "mt5": args.mt5}
+    ORTModelForSeq2SeqLM = import_ort_seq2seq()
+    report = {}
+    ok = True
+
+    for name in args.models:
+        _, model_cls, tokenizer_cls = MODELS[name]
+        source = sources[name]
+
+        if not args.check_only:
+            export_onnx(source, output / name, tokenizer_cls)
+            if args.quantize:
+                quantize_onnx(output / name, int8_output / name)
+
+        # Eşdeğerlik kontrolü - torch fp32 referans
+        tokenizer = tokenizer_cls.from_pretrained(source)
+        reference = model_cls.from_pretrained(source).eval()
+        report[name] = {
+            "onnx": check_equivalence(reference, ORTModelForSeq2SeqLM.from_pretrained(output / name), tokenizer, SAMPLE_PROMPTS),
+            "torch-int8": check_equivalence(reference, quantize_int8(copy.deepcopy(reference)), tokenizer, SAMPLE_PROMPTS)
+        }
+        if (int8_output / name).exists():
+            report[name]["onnx-int8"] = check_equivalence(
+                reference, ORTModelForSeq2SeqLM.from_pretrained(int8_output / name), tokenizer, SAMPLE_PROMPTS
+            )
+
+        # fp32 ONNX torch ile aynı olmalı; INT8 sonuçları bilgi amaçlı raporlanır
+        onnx_report = report[name]["onnx"]
+        if onnx_report["max_abs_logit_diff"] > args.tolerance or onnx_report["greedy_match_rate"] < 1.0:
+            logger.error(f"❌ {name}: ONNX çıktısı torch ile eşdeğer değil")
+            ok = False
+        else:
+            logger.info(f"✅ {name}: ONNX çıktısı torch ile eşdeğer")
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
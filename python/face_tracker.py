@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Oturum bazlı yüz takibi
+Aynı quiz oturumunun kareleri kameranın önünde aynı yerde oturan aynı öğrenciyi gösterir; her karede
+yüz tespitini baştan çalıştırmak yerine son kutu ucuz bir doğrulamayla yeniden kullanılır:
+son tespitteki yüz şablonu, önceki kutunun biraz genişletilmiş çevresinde (küçültülmüş gri görüntüde)
+cv2.matchTemplate ile aranır. Eşleşme yeterliyse kutu oraya kaydırılır ve tespit atlanır; yüz kaydıysa,
+kaybolduysa ya da redetect_every kare boyunca hep takip edildiyse tam tespite düşülür.
+
+    box = tracker.locate(session_id, gray)        # None: tam tespit gerekli
+    if box is None:
+        box = detect(...)
+        tracker.update(session_id, gray, box)
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from metrics import REGISTRY
+
+
+class _Track:
+    """Bir oturumun son yüz kutusu ve şablonu"""
+
+    def __init__(self, box: tuple, template, shape: tuple):
+        self.box = box
+        self.template = template
+        self.shape = shape
+        self.frames = 0  # Son tam tespitten beri takip edilen kare
+        self.updated = time.monotonic()
+
+
+class FaceTracker:
+    """session_id -> son yüz kutusu; LRU + TTL ile sınırlı"""
+
+    def __init__(self, max_sessions: int = 256, session_ttl: float = 1800, match_threshold: float = 0.7,
+                 search_margin: float = 0.25, template_size: int = 48, redetect_every: int = 10):
+        """
+        match_threshold: şablon eşleşmesi için en düşük normalize korelasyon (TM_CCOEFF_NORMED)
+        search_margin: kutunun her yönde kutu boyutunun bu oranı kadar genişletilmiş çevresinde aranır
+        template_size: eşleştirme bu boyuta (uzun kenar, piksel) küçültülmüş görüntüde yapılır
+        redetect_every: kayma birikmesin diye bu kadar takipten sonra tam tespit zorunlu (0 = hiç)
+        """
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.match_threshold = match_threshold
+        self.search_margin = search_margin
+        self.template_size = template_size
+        self.redetect_every = redetect_every
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.tracked = 0
+        self.detected = 0
+        self.lost = 0
+
+    def _scale(self, box: tuple) -> float:
+        return self.template_size / max(box[2], box[3])
+
+    def _template(self, gray, box: tuple):
+        x, y, w, h = box
+        scale = self._scale(box)
+        return cv2.resize(gray[y:y + h, x:x + w], (max(1, round(w * scale)), max(1, round(h * scale))))
+
+    def locate(self, session_id, gray):
+        """
+        Oturumun son kutusunu bu karede doğrula - (x, y, w, h) ya da tam tespit gerekiyorsa None.
+        gray: karenin gri tonlu hali (uint8).
+        """
+        now = time.monotonic()
+        with self._lock:
+            track = self._sessions.get(session_id)
+            if track is None:
+                return None
+            if now - track.updated > self.session_ttl or track.shape != gray.shape:
+                del self._sessions[session_id]
+                return None
+            if self.redetect_every and track.frames >= self.redetect_every:
+                return None
+            self._sessions.move_to_end(session_id)
+            box, template = track.box, track.template
+
+        # Arama bölgesi: kutu + kenar payı, şablonla aynı ölçekte küçültülür
+        x, y, w, h = box
+        margin_x, margin_y = int(w * self.search_margin), int(h * self.search_margin)
+        x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+        x1, y1 = min(gray.shape[1], x + w + margin_x), min(gray.shape[0], y + h + margin_y)
+        scale = self._scale(box)
+        region = cv2.resize(gray[y0:y1, x0:x1], (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale))))
+        if region.shape[0] < template.shape[0] or region.shape[1] < template.shape[1]:
+            return self._lose(session_id)
+
+        scores = cv2.matchTemplate(region, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (match_x, match_y) = cv2.minMaxLoc(scores)
+        if score < self.match_threshold:
+            return self._lose(session_id)
+
+        box = (
+            min(max(0, x0 + round(match_x / scale)), gray.shape[1] - w),
+            min(max(0, y0 + round(match_y / scale)), gray.shape[0] - h),
+            w,
+            h
+        )
+        with self._lock:
+            track = self._sessions.get(session_id)
+            if track is not None:
+                track.box = box
+                track.frames += 1
+                track.updated = now
+            self.tracked += 1
+        REGISTRY.inc("face_detection_skipped_total", 1, "Kutu yeniden kullanıldığı için atlanan yüz tespitleri")
+        return box
+
+    def _lose(self, session_id):
+        """Yüz kaydı/kayboldu - oturum tam tespite düşer"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self.lost += 1
+        REGISTRY.inc("face_track_lost_total", 1, "Doğrulanamayan (kayan/kaybolan) yüz kutuları")
+        return None
+
+    def update(self, session_id, gray, box: tuple):
+        """Tam tespit sonucunu oturuma kaydet - sonraki kareler bu kutuyu doğrular"""
+        x, y, w, h = (int(v) for v in box)
+        REGISTRY.inc("face_detections_total", 1, "Oturum modunda yapılan tam yüz tespitleri")
+        if w <= 0 or h <= 0:
+            self.forget(session_id)
+            return
+        track = _Track((x, y, w, h), self._template(gray, (x, y, w, h)), gray.shape)
+        with self._lock:
+            self.detected += 1
+            self._sessions[session_id] = track
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def forget(self, session_id):
+        """Oturumun kutusunu sil (ör. karede yüz bulunamadı)"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        """Takip edilen oturumlar ve tespitin ne sıklıkla atlandığı"""
+        with self._lock:
+            total = self.tracked + self.detected
+            return {
+                "sessions": len(self._sessions),
+                "tracked": self.tracked,
+                "detected": self.detected,
+                "lost": self.lost,
+                "skip_rate": round(self.tracked / total, 4) if total else 0.0
+            }
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP sunucusu - UnifiedInference için asyncio tabanlı hafif servis
+Keep-alive bağlantılar, sınırlı kabul kuyruğu (dolunca 429, kuyruktan büyük liste 413) ve mikro-batch'leyen
+tek bir çıkarım işçisi. Yanıtı beklerken bağlantısı kopan istemcilerin kuyruktaki istekleri modele gönderilmez.
+
+    python http_server.py --port 8765 --queue-size 64 --mode score
+
+Uç noktalar:
+    GET  /health   süreç ayakta mı
+    GET  /ready    modeller yüklendi mi (yüklenene kadar 503)
+    GET  /metrics  Prometheus metin formatında sayaçlar
+    POST /analyze  tek istek nesnesi ya da istek listesi (stdin protokolüyle aynı alanlar, deadline_ms dahil)
+    POST /preload  planlı yoğunluk öncesi modelleri yükle (--lazy-load / --idle-unload ile), gövde: {"models": [...]}
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import REGISTRY
+from unified_inference import add_inference_arguments, build_request, create_inferencer
+
+logger = logging.getLogger(__name__)
+
+# En büyük istek gövdesi (bayt)
+MAX_BODY_BYTES = 1024 * 1024
+
+# Yanıt beklenirken istemci bağlantısının kopup kopmadığına bakma aralığı (saniye)
+DISCONNECT_POLL_SECONDS = 0.2
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+class GradingServer:
+    """Kabul kuyruğu + batch'leyici; model çalışması tek thread'lik executor'da yapılır"""
+
+    def __init__(self, inferencer, queue_size: int = 64, batch_size: int = 8,
+                 batch_wait_ms: float = 20, keepalive_timeout: float = 15):
+        self.inferencer = inferencer
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = max(0.0, batch_wait_ms) / 1000
+        self.keepalive_timeout = keepalive_timeout
+
+        self.ready = False
+        self.queue = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="grader")
+
+    async def start(self, host: str, port: int):
+        """Sunucuyu başlat; modeller arka planda yüklenir, /ready o zamana kadar 503 döner"""
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info(f"🌐 HTTP sunucusu dinliyor: http://{host}:{port}")
+
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.inferencer.load_models)
+        self.ready = True
+        logger.info("✅ Sunucu istek kabul ediyor")
+
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.batcher())
+
+    async def batcher(self):
+        """Kuyruktan batch topla ve analyze_batch'i executor'da çalıştır"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(items) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Bağlantısı kopan istemcilerin istekleri atlanır
+            items = [(request, future) for request, future in items if not future.done()]
+            if not items:
+                continue
+
+            requests = [request for request, _ in items]
+            try:
+                results = await loop.run_in_executor(self.executor, self.inferencer.analyze_batch, requests)
+            except Exception as e:
+                logger.error(f"❌ Batch hatası: {e}")
+                REGISTRY.inc("errors_total", len(items), "Hata ile sonuçlanan istekler")
+                results = [{"success": False, "error": str(e)} for _ in items]
+
+            REGISTRY.observe("batch_size", len(items), "Batch başına istek", buckets=(1, 2, 4, 8, 16, 32, 64))
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def analyze(self, body: bytes) -> tuple:
+        """POST /analyze - (durum kodu, yanıt, ek başlıklar)"""
+        if not self.ready:
+            return 503, {"success": False, "error": "Modeller henüz yüklenmedi"}, {"Retry-After": "5"}
+
+        try:
+            data = json.loads(body or b"null")
+        except json.JSONDecodeError as e:
+            return 400, {"success": False, "error": f"Invalid JSON: {e}"}, {}
+
+        items = data if isinstance(data, list) else [data]
+        if not items or not all(isinstance(item, dict) for item in items):
+            return 400, {"success": False, "error": "İstek bir JSON nesnesi ya da nesne listesi olmalı"}, {}
+
+        # Kuyruğun tamamından büyük liste hiçbir zaman kabul edilemez - tekrar denemenin anlamı yok
+        if len(items) > self.queue_size:
+            return 413, {"success": False, "error": f"Tek istekte en fazla {self.queue_size} öğe gönderilebilir"}, {}
+
+        # Tüm öğeler kuyruğa girmeden doğrulanır - geçersiz bir öğe yüzünden öncekiler boşuna çalışmasın
+        received_at = time.monotonic()
+        requests = []
+        for index, item in enumerate(items):
+            try:
+                requests.append(build_request(item, received_at))
+            except (TypeError, ValueError) as e:
+                error = f"{index + 1}. öğe: {e}" if isinstance(data, list) else str(e)
+                return 400, {"success": False, "error": error}, {}
+
+        # Kabul kontrolü - tüm istekler kuyruğa sığmıyorsa hiçbiri alınmaz
+        if self.queue.qsize() + len(items) > self.queue_size:
+            REGISTRY.inc("rejected_total", len(items), "Kuyruk dolu olduğu için reddedilen istekler")
+            return 429, {"success": False, "error": "Sunucu dolu, daha sonra tekrar deneyin"}, {"Retry-After": "1"}
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for request in requests:
+            future = loop.create_future()
+            self.queue.put_nowait((request, future))
+            futures.append(future)
+        REGISTRY.set("queue_depth", self.queue.qsize(), "Kabul kuyruğundaki istekler")
+
+        results = await asyncio.gather(*futures)
+        REGISTRY.observe("http_request_duration_seconds", time.perf_counter() - started,
+                         "Kabulden yanıta kadar geçen süre (saniye)")
+
+        # İstekteki opsiyonel id yanıta geri eklenir
+        results = [
+            {"id": item["id"], **result} if item.get("id") is not None else result
+            for item, result in zip(items, results)
+        ]
+        if not isinstance(data, list):
+            # Tek istek süre sınırı yüzünden çalıştırılmadıysa 504
+            return (504 if results[0].get("deadline_exceeded") and not results[0].get("success") else 200), results[0], {}
+        return 200, results, {}
+
+    async def preload(self, body: bytes) -> tuple:
+        """POST /preload - yükleme çıkarım thread'ini bloklamaz, yüklenen modeli bekleyen istekler onu kullanır"""
+        try:
+            data = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            return 400, {"success": False, "error": f"Invalid JSON: {e}"}, {}
+        models = data.get("models") if isinstance(data, dict) else None
+        if models is not None and not isinstance(models, list):
+            return 400, {"success": False, "error": "models bir liste olmalı"}, {}
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.inferencer.preload, models)
+        return 200, {"success": True, "models": result}, {}
+
+    def metrics(self) -> str:
+        """Prometheus metin formatı - süreç kaydı + sunucu göstergeleri"""
+        REGISTRY.set("ready", int(self.ready), "Modeller yüklendi mi")
+        REGISTRY.set("queue_depth", self.queue.qsize() if self.queue else 0, "Kabul kuyruğundaki istekler")
+        REGISTRY.set("queue_capacity", self.queue_size, "Kabul kuyruğu kapasitesi")
+        return REGISTRY.render_prometheus()
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple:
+        """(durum kodu, yanıt gövdesi, ek başlıklar)"""
+        if path == "/health":
+            return 200, {"status": "ok"}, {}
+        if path == "/ready":
+            return (200 if self.ready else 503), {"ready": self.ready}, {}
+        if path == "/metrics":
+            return 200, self.metrics(), {"Content-Type": "text/plain; version=0.0.4"}
+        if path == "/analyze":
+            if method != "POST":
+                return 405, {"success": False, "error": "POST kullanın"}, {"Allow": "POST"}
+            return await self.analyze(body)
+        if path == "/preload":
+            if method != "POST":
+                return 405, {"success": False, "error": "POST kullanın"}, {"Allow": "POST"}
+            return await self.preload(body)
+        return 404, {"success": False, "error": "Bulunamadı"}, {}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """HTTP/1.1 bağlantısı - keep-alive ile aynı bağlantıdan birden fazla istek"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.respond(writer, 400, {"success": False, "error": "Geçersiz istek satırı"}, {}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {"success": False, "error": "Geçersiz Content-Length"}, {}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, {"success": False, "error": "İstek gövdesi çok büyük"}, {}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                route = asyncio.ensure_future(self.route(method.upper(), target.split("?")[0], body))
+                if not await self.wait_connected(route, reader, writer):
+                    break
+                try:
+                    status, payload, extra_headers = route.result()
+                except Exception as e:
+                    # Beklenmeyen hata bağlantıyı yanıtsız düşürmesin
+                    logger.error(f"❌ İstek hatası: {e}")
+                    status, payload, extra_headers = 500, {"success": False, "error": str(e)}, {}
+                await self.respond(writer, status, payload, extra_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def wait_connected(self, task: asyncio.Future, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> bool:
+        """
+        Yanıtı beklerken bağlantıyı izle - istemci bağlantıyı kapatırsa görev iptal edilir ve False döner.
+        İptal kuyruktaki isteklerin future'larına da geçer; batcher bunları modele göndermez.
+        """
+        while not task.done():
+            await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if not task.done() and (reader.at_eof() or writer.is_closing()):
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                REGISTRY.inc("client_disconnects_total", 1, "Yanıt beklenirken bağlantısı kopan istekler")
+                return False
+        return True
+
+    async def respond(self, writer: asyncio.StreamWriter, status: int, payload, extra_headers: dict, keep_alive: bool):
+        """Yanıtı yaz - dict/list JSON olarak, str düz metin olarak gönderilir"""
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = "text/plain; charset=utf-8"
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+
+        headers = {
+            "Content-Type": content_type,
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        headers.update(extra_headers)
+
+        head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MetaMind unified inference HTTP sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--queue-size', type=int, default=64,
+                        help="Kabul kuyruğundaki en fazla istek; dolunca 429, bundan uzun liste isteği 413 döner")
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help="Bir analyze_batch çağrısında toplanacak en fazla istek")
+    parser.add_argument('--batch-wait-ms', type=float, default=20,
+                        help="İlk istekten sonra batch'i doldurmak için beklenecek en uzun süre (ms)")
+    parser.add_argument('--keepalive-timeout', type=float, default=15,
+                        help="Boşta kalan keep-alive bağlantısının kapatılma süresi (saniye)")
+    add_inference_arguments(parser)
+    args = parser.parse_args()
+
+    server = GradingServer(
+        create_inferencer(args),
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        keepalive_timeout=args.keepalive_timeout
+    )
+    try:
+        asyncio.run(server.start(args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info("👋 Sunucu kapatıldı")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sözcüksel ön değerlendirme
+Açık durumları ("4" / "4", "cin" / "çin", "istanbul" / "ankara") modelleri çalıştırmadan karara bağlar,
+belirsiz durumlar None döner ve neural consensus'a gider.
+İşaret ve ayraçlar anlam taşır ("5" / "-5", "3,5" / "35"): sayı ya da işaret içeren cevaplar sadece
+kesin olduğunda karara bağlanır, yazım hatası toleransı da tam puan değil "Çok Benzer" verir.
+"""
+
+import re
+from decimal import Decimal
+
+from result_cache import normalize_turkish, normalize_answer
+
+# Türkçe karakterlerin ASCII karşılıkları - "cin" / "çin", "jupiter" / "jüpiter"
+TRANSLITERATION = str.maketrans('çğıöşüâîû', 'cgiosuaiu')
+
+# Yanlış kararı için benzerlik üst sınırı
+REJECT_THRESHOLD = 0.2
+
+# Yazım hatası toleransı için doğru cevabın en az uzunluğu
+MIN_FUZZY_LENGTH = 4
+
+# Yazım hatası toleransı: benzerlik eşiği bunun altına indirilemez ("slovakya" / "slovenya" ~0.75)
+MIN_SIMILARITY_THRESHOLD = 0.8
+
+# İşaretli sayı, ondalık/binlik ayraçlı: "-5", "+3", "1.000", "3,5", "1.234,5"
+NUMBER_PATTERN = re.compile(r'^[+-]?\d+(?:[.,]\d+)*$')
+
+# Sayı dışındaki cevaplarda anlam taşıyan matematik işaretleri ("x-1" / "x+1")
+MATH_SYMBOLS = set('+-−±*/×÷=<>%^')
+
+
+def fold_turkish(text: str) -> str:
+    """Normalize et ve Türkçe karakterleri ASCII karşılıklarına indir"""
+    return normalize_turkish(text).translate(TRANSLITERATION)
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein mesafesi"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,  # silme
+                current[j - 1] + 1,  # ekleme
+                previous[j - 1] + (ca != cb)  # değiştirme
+            ))
+        previous = current
+    return previous[-1]
+
+
+def edit_similarity(a: str, b: str) -> float:
+    """1 - normalize edilmiş Levenshtein mesafesi (0.0-1.0)"""
+    if not a and not b:
+        return 1.0
+    return 1 - edit_distance(a, b) / max(len(a), len(b))
+
+
+def token_overlap(a: str, b: str) -> float:
+    """Kelime kümeleri arasındaki Jaccard benzerliği (0.0-1.0)"""
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+def _thousands_grouped(groups: list) -> bool:
+    """İlk grup 1-3, diğerleri tam 3 hane mi ("1", "234", "567")"""
+    return len(groups[0]) <= 3 and all(len(group) == 3 for group in groups[1:])
+
+
+def number_values(text: str) -> set:
+    """
+    Sayısal cevabın olası değerleri, sayı değilse None.
+    Ayraç iki türlü okunabiliyorsa ("1.000": bin ya da 1,0) iki değer de döner; okunamıyorsa ("1.2.3") None.
+    """
+    text = normalize_answer(text).replace(' ', '').replace('−', '-')
+    if not NUMBER_PATTERN.match(text):
+        return None
+
+    sign = -1 if text.startswith('-') else 1
+    digits = text.lstrip('+-')
+    separators = [ch for ch in digits if ch in '.,']
+    groups = re.split('[.,]', digits)
+    if not separators:
+        return {sign * Decimal(digits)}
+
+    values = set()
+    # Binlik ayraç: hep aynı ayraç, 3 haneli gruplar ("1.000.000")
+    if len(set(separators)) == 1 and _thousands_grouped(groups):
+        values.add(sign * Decimal(''.join(groups)))
+    # Ondalık ayraç: son ayraç tek ve öncesi (varsa) diğer ayraçla binlik gruplanmış ("1.234,5")
+    if separators.count(separators[-1]) == 1 and _thousands_grouped(groups[:-1]):
+        values.add(sign * Decimal(''.join(groups[:-1]) + '.' + groups[-1]))
+    return values or None
+
+
+def _has_signs(text: str) -> bool:
+    """Rakam ya da matematik işareti içeriyor mu - noktalamayı silen normalizasyonla karşılaştırılamaz"""
+    return any(ch.isdigit() or ch in MATH_SYMBOLS for ch in text)
+
+
+def max_typo_edits(length: int) -> int:
+    """Yazım hatası sayılacak en fazla düzenleme - kısa kelimede 1, uzun cevapta 2"""
+    return 1 if length <= 8 else 2
+
+
+def lexical_grade(student_answer: str, correct_answer: str, similarity_threshold: float = 0.8) -> dict:
+    """
+    Ucuz benzerlik skorlarıyla kesin karar ver.
+    Kesin karar varsa {"label", "confidence" (0-1), "method", "scores"} döner, belirsizse None.
+    """
+    student = fold_turkish(student_answer)
+    correct = fold_turkish(correct_answer)
+
+    if not correct:
+        return None
+
+    distance = edit_distance(student, correct)
+    similarity = 1 - distance / max(len(student), len(correct))
+    scores = {
+        "edit_similarity": round(similarity, 4),
+        "token_overlap": round(token_overlap(student, correct), 4)
+    }
+
+    def decision(label, confidence, method):
+        return {"label": label, "confidence": confidence, "method": method, "scores": scores}
+
+    if not student:
+        return decision("Yanlış", 0.99, "empty")
+
+    # Birebir eşleşme (büyük/küçük harf, boşluk, tırnak farkları yok sayılır; işaret ve ayraçlar korunur)
+    if normalize_answer(student_answer) == normalize_answer(correct_answer):
+        return decision("Tam Doğru", 0.99, "exact")
+
+    # Sayısal cevaplar değere göre: her okumada aynı değer doğru, hiçbir okumada ortak değer yoksa yanlış;
+    # ayraç belirsizliği ("1000" / "1.000") modellere bırakılır
+    student_values = number_values(student_answer)
+    correct_values = number_values(correct_answer)
+    if student_values is not None and correct_values is not None:
+        if student_values == correct_values and len(correct_values) == 1:
+            return decision("Tam Doğru", 0.97, "numeric")
+        if student_values.isdisjoint(correct_values):
+            return decision("Yanlış", 0.95, "numeric")
+        return None
+
+    # Aşağıdaki karşılaştırmalar noktalamayı siler - işaret/rakam içeren cevaplar ("-5 derece") modellere
+    if _has_signs(normalize_answer(student_answer)) or _has_signs(normalize_answer(correct_answer)):
+        return None
+
+    if student == correct:
+        return decision("Tam Doğru", 0.97, "transliteration")
+
+    # Küçük yazım hataları ("ankra" / "ankara") - tam puan değil, eşik düşürülse de farklı kelimeler geçmez
+    if (len(correct) >= MIN_FUZZY_LENGTH
+            and len(student.split()) == len(correct.split())
+            and distance <= max_typo_edits(len(correct))
+            and similarity >= max(similarity_threshold, MIN_SIMILARITY_THRESHOLD)):
+        return decision("Çok Benzer", scores["edit_similarity"], "edit_distance")
+
+    # Hiçbir ortak yanı olmayan kısa cevaplar ("istanbul" / "ankara")
+    if (max(scores["edit_similarity"], scores["token_overlap"]) <= REJECT_THRESHOLD
+            and student not in correct and correct not in student):
+        return decision("Yanlış", 0.9, "no_overlap")
+
+    return None
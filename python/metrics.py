@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ölçüm katmanı - aşama süreleri, sayaçlar ve histogramlar
+Her süreç tek bir REGISTRY tutar; içerik istenildiğinde Prometheus metin formatında dökülür.
+
+    with StageTimer() as timer:          # isteğe bağlı: bu istek için aşama sürelerini topla
+        with stage("tokenize"):
+            ...
+    timer.as_dict()                      # {"stages_ms": {"tokenize": 1.2}, "total_ms": 1.3}
+
+stage() her zaman REGISTRY'deki stage_duration_seconds histogramına yazar; aktif bir StageTimer
+varsa süre ona da eklenir. Zamanlayıcı contextvars ile taşınır, executor'a gönderilen işlerde
+contextvars.copy_context().run ile aktarılmalıdır.
+"""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Prometheus varsayılanlarına yakın, saniye cinsinden kova sınırları
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Son gözlemler üzerinden yüzdelik hesabı için pencere
+ROLLING_WINDOW = 1024
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in items)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(items, escaped)) + "}"
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Histogram:
+    """Kümülatif kovalar + toplam/sayı (Prometheus) ve son gözlemlerin kayan penceresi (yüzdelikler)"""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, window: int = ROLLING_WINDOW):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def summary(self) -> dict:
+        """Kayan penceredeki p50/p95/p99 (ms)"""
+        if not self.recent:
+            return {"count": self.count}
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "p50_ms": round(_percentile(recent, 50) * 1000, 3),
+            "p95_ms": round(_percentile(recent, 95) * 1000, 3),
+            "p99_ms": round(_percentile(recent, 99) * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe sayaç, gösterge ve histogram kaydı"""
+
+    def __init__(self, namespace: str = "metamind"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = {}  # isim -> {etiketler: değer}
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        if name not in self._types:
+            self._types[name] = kind
+            self._help[name] = help_text or name
+
+    def inc(self, name: str, value: float = 1, help_text: str = None, **labels):
+        """Sayaç artır"""
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, help_text: str = None, **labels):
+        """Gösterge değerini ayarla"""
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, help_text: str = None, buckets: tuple = DEFAULT_BUCKETS, **labels):
+        """Histograma gözlem ekle"""
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def register_collector(self, collector):
+        """
+        Döküm anında çağrılan kaynak - (isim, tür, açıklama, değer, etiketler) listesi döndürür.
+        Başka yerde tutulan sayaçlar (ör. önbellek istatistikleri) böyle eklenir.
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """JSON'a uygun özet - sayaçlar, göstergeler ve histogram yüzdelikleri"""
+        def flat(name, key):
+            return name + _format_labels(key)
+
+        with self._lock:
+            return {
+                "counters": {flat(n, k): v for n, s in self._counters.items() for k, v in s.items()},
+                "gauges": {flat(n, k): v for n, s in self._gauges.items() for k, v in s.items()},
+                "histograms": {flat(n, k): h.summary() for n, s in self._histograms.items() for k, h in s.items()},
+            }
+
+    def render_prometheus(self, namespace: str = None) -> str:
+        """
+        Prometheus metin formatı (0.0.4)
+        namespace: metrik adı öneki (varsayılan: kaydın kendi namespace'i). Aynı süreçteki
+        kaydı paylaşan servisler kendi önekini döküm anında verir, kayıt değiştirilmez.
+        """
+        lines = []
+        prefix = f"{namespace or self.namespace}_"
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {prefix}{name} {help_text}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        with self._lock:
+            for name, series in self._counters.items():
+                header(name, "counter", self._help[name])
+                lines.extend(f"{prefix}{name}{_format_labels(k)} {v}" for k, v in series.items())
+
+            for name, series in self._gauges.items():
+                header(name, "gauge", self._help[name])
+                lines.extend(f"{prefix}{name}{_format_labels(k)} {v}" for k, v in series.items())
+
+            for name, series in self._histograms.items():
+                header(name, "histogram", self._help[name])
+                for key, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f"{prefix}{name}_bucket{_format_labels(key, {'le': bound})} {count}")
+                    lines.append(f"{prefix}{name}_bucket{_format_labels(key, {'le': '+Inf'})} {histogram.count}")
+                    lines.append(f"{prefix}{name}_sum{_format_labels(key)} {round(histogram.total, 6)}")
+                    lines.append(f"{prefix}{name}_count{_format_labels(key)} {histogram.count}")
+
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            declared = set()
+            for name, kind, help_text, value, labels in collector():
+                if name not in declared:
+                    header(name, kind, help_text)
+                    declared.add(name)
+                lines.append(f"{prefix}{name}{_format_labels(_label_key(labels))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Süreç genelindeki kayıt
+REGISTRY = MetricsRegistry()
+
+_current_timer = ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """Bir istek (ya da batch) için aşama sürelerini toplar; with bloğu içinde aktif olur"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._started = None
+        self._elapsed = None
+        self._token = None
+
+    def add(self, name: str, seconds: float):
+        # Aynı aşama birden fazla çalışırsa (ör. uzunluk kovaları) süreler toplanır
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._token = _current_timer.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        self._elapsed = time.perf_counter() - self._started
+        _current_timer.reset(self._token)
+        return False
+
+    def as_dict(self) -> dict:
+        """{"stages_ms": {...}, "total_ms": ...}"""
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._started
+        with self._lock:
+            stages = {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        return {"stages_ms": stages, "total_ms": round(elapsed * 1000, 3)}
+
+
+@contextmanager
+def stage(name: str, registry: MetricsRegistry = REGISTRY):
+    """Aşama süresini histograma ve (varsa) aktif StageTimer'a yaz"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe("stage_duration_seconds", elapsed, "Aşama süreleri (saniye)", stage=name)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.add(name, elapsed)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model çıkarım backend'leri
+- torch: tam hassasiyetli PyTorch modeli (varsayılan)
+- bf16:  PyTorch modeli, ağırlıklar bfloat16 (fp32'nin yarısı kadar bellek, CPU'da da çalışır)
+- int8:  PyTorch modeli, Linear katmanları dinamik INT8 kuantize edilmiş (sadece CPU)
+- onnx:  export_models.py ile dışa aktarılmış ONNX encoder/decoder, KV cache ile ONNX Runtime üzerinde
+
+torch/bf16 backend'lerinde decoder katmanları opsiyonel olarak diske aktarılabilir (offload_dir):
+ağırlıklar her forward'da diskten (mmap) okunur, RAM'de sadece encoder ve embedding'ler kalır.
+"""
+
+import os
+import logging
+import warnings
+import threading
+
+import torch
+from transformers import AutoTokenizer
+from transformers.utils import is_accelerate_available
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "bf16", "int8", "onnx")
+
+# low_cpu_mem_usage yolunda accelerate, nn.Module'ü süreç genelinde yamalayarak boş (meta) model kurar;
+# iki model aynı anda yüklenirse yamalar birbirine karışır. from_pretrained boş modeli kurma ile ağırlıkları
+# yerine yazmayı tek çağrıda yaptığı için ikisi birden bu kilitle sıralanır; indirme ve dosyaların diskten
+# okunması kilitten önce, modeller arasında paralel yapılır (bkz. fetch_model_files).
+_empty_init_lock = threading.Lock()
+
+# from_pretrained'in okuduğu dosyalar - diğer çerçevelerin ağırlıkları (tf/flax/onnx) indirilmez
+WEIGHT_PATTERNS = ["*.json", "*.safetensors"]
+FALLBACK_WEIGHT_PATTERNS = ["*.json", "*.bin"]
+
+# Ağırlık dosyalarını sayfa önbelleğine okurken kullanılan tampon
+PREFETCH_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Backend -> ağırlıkların yükleneceği veri tipi
+TORCH_DTYPES = {"torch": torch.float32, "bf16": torch.bfloat16, "int8": torch.float32}
+
+
+def import_ort_seq2seq():
+    """ONNX Runtime seq2seq sınıfını yükle - optimum opsiyonel bağımlılıktır"""
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError(
+            "ONNX backend için 'optimum[onnxruntime]' gerekli: pip install 'optimum[onnxruntime]'"
+        ) from e
+    return ORTModelForSeq2SeqLM
+
+
+def quantize_int8(model):
+    """Linear katmanları dinamik INT8 kuantize et (ağırlıklar int8, aktivasyonlar çalışma anında)"""
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_tokenizer(path: str, slow_cls, local_files_only: bool = False):
+    """
+    Hızlı (Rust) tokenizer'ı yükle; dönüştürülemezse sentencepiece tabanlı yavaş sınıfa düş.
+    Yerel klasörde tokenizer.json yoksa dönüştürülen tokenizer oraya kaydedilir,
+    sonraki açılışlar sentencepiece dönüşümünü atlar.
+    """
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(path, use_fast=True, local_files_only=local_files_only)
+    except Exception as e:
+        logger.warning(f"⚠️ Hızlı tokenizer yüklenemedi, yavaş tokenizer kullanılıyor: {e}")
+        return slow_cls.from_pretrained(path, local_files_only=local_files_only)
+
+    if not tokenizer.is_fast:
+        return tokenizer
+
+    tokenizer_file = os.path.join(path, "tokenizer.json")
+    if os.path.isdir(path) and not os.path.exists(tokenizer_file):
+        try:
+            tokenizer.backend_tokenizer.save(tokenizer_file)
+            logger.info(f"💾 Hızlı tokenizer kaydedildi: {tokenizer_file}")
+        except OSError as e:
+            logger.warning(f"⚠️ tokenizer.json kaydedilemedi: {e}")
+    return tokenizer
+
+
+def decoder_offload_map(path: str, model_cls, local_files_only: bool = False) -> dict:
+    """
+    accelerate device_map'i: decoder katman listesi diskte, geri kalan her şey CPU'da.
+    Katman listesinin adı (mBART: model.decoder.layers, MT5: decoder.block) boş bir model
+    üzerinden bulunur; embedding'ler encoder ile paylaşıldığı için RAM'de kalır.
+    """
+    from accelerate import init_empty_weights
+    from transformers import AutoConfig
+
+    config = AutoConfig.from_pretrained(path, local_files_only=local_files_only)
+    with _empty_init_lock, init_empty_weights():
+        model = model_cls(config)
+
+    decoder = model.get_decoder()
+    decoder_name = next(name for name, module in model.named_modules() if module is decoder)
+    layers_name = next(
+        name for name, module in decoder.named_children() if isinstance(module, torch.nn.ModuleList)
+    )
+    target = f"{decoder_name}.{layers_name}"
+
+    # Anahtarlar çakışmamalı: hedefe giden yoldaki modüllerin diğer çocukları ve doğrudan tensörleri
+    # (ör. mBART final_logits_bias) ayrı ayrı CPU'ya yazılır
+    device_map = {}
+
+    def split(module, prefix):
+        for name, _ in list(module.named_parameters(recurse=False)) + list(module.named_buffers(recurse=False)):
+            device_map[prefix + name] = "cpu"
+        for name, child in module.named_children():
+            full_name = prefix + name
+            if full_name == target:
+                device_map[full_name] = "disk"
+            elif target.startswith(full_name + "."):
+                split(child, full_name + ".")
+            else:
+                device_map[full_name] = "cpu"
+
+    split(model, "")
+    return device_map
+
+
+def fetch_model_files(path: str, local_files_only: bool = False) -> str:
+    """
+    Hub'daki modelin config ve ağırlık dosyalarını yerel önbelleğe indir, ağırlık dosyalarını bir kez okuyup
+    işletim sisteminin sayfa önbelleğine al; yerel klasörün yolunu döndür (yerel klasör olduğu gibi döner).
+    _empty_init_lock dışında çağrılır: kilit altındaki from_pretrained dosyaları yerelden, sıcak önbellekten okur.
+    """
+    if not os.path.isdir(path):
+        from huggingface_hub import snapshot_download
+
+        local = snapshot_download(path, allow_patterns=WEIGHT_PATTERNS, local_files_only=local_files_only)
+        if not any(name.endswith(".safetensors") for name in os.listdir(local)):
+            local = snapshot_download(path, allow_patterns=FALLBACK_WEIGHT_PATTERNS, local_files_only=local_files_only)
+        path = local
+
+    buffer = bytearray(PREFETCH_CHUNK_BYTES)
+    for name in sorted(os.listdir(path)):
+        if name.endswith((".safetensors", ".bin")):
+            with open(os.path.join(path, name), "rb") as f:
+                while f.readinto(buffer):
+                    pass
+    return path
+
+
+def load_torch_model(path: str, model_cls, local_files_only: bool = False,
+                     dtype: torch.dtype = torch.float32, offload_dir: str = None):
+    """
+    PyTorch ağırlıklarını yükle - safetensors dosyası varsa mmap ile okunur.
+    accelerate kuruluysa model boş (meta) tensörlerle kurulur ve ağırlıklar doğrudan yerine yazılır,
+    böylece yükleme sırasında RAM tepesi ~2x yerine ~1x model boyutunda kalır.
+    offload_dir verilirse decoder katmanları oraya yazılır ve çalışma anında diskten okunur (accelerate gerekir).
+    """
+    # İndirme ve disk okuması kilitsiz - paralel yüklenen modeller burada örtüşür
+    path = fetch_model_files(path, local_files_only)
+
+    kwargs = {"local_files_only": local_files_only, "torch_dtype": dtype}
+    if is_accelerate_available():
+        kwargs["low_cpu_mem_usage"] = True
+
+    if offload_dir:
+        if not is_accelerate_available():
+            raise ImportError("Decoder offload için 'accelerate' gerekli: pip install accelerate")
+        os.makedirs(offload_dir, exist_ok=True)
+        kwargs["device_map"] = decoder_offload_map(path, model_cls, local_files_only)
+        kwargs["offload_folder"] = offload_dir
+        kwargs["offload_state_dict"] = True
+
+    if not kwargs.get("low_cpu_mem_usage"):
+        return model_cls.from_pretrained(path, **kwargs)
+    with _empty_init_lock, warnings.catch_warnings():
+        # Tensör (final_logits_bias) ve paylaşılan modül (MT5 decoder.embed_tokens) anahtarları için
+        # accelerate uyarısı beklenen bir durum
+        warnings.filterwarnings("ignore", message="The following device_map keys do not match any submodules")
+        return model_cls.from_pretrained(path, **kwargs)
+
+
+def load_onnx_model(model_dir: str, device: str, local_files_only: bool = False):
+    """Dışa aktarılmış ONNX modelini KV cache ile yükle"""
+    ORTModelForSeq2SeqLM = import_ort_seq2seq()
+    provider = "CUDAExecutionProvider" if device == "cuda" else "CPUExecutionProvider"
+    return ORTModelForSeq2SeqLM.from_pretrained(
+        model_dir, use_cache=True, provider=provider, local_files_only=local_files_only
+    )
+
+
+def prepare_torch_model(model, backend: str, device: str):
+    """Yüklenmiş PyTorch modelini backend'e göre hazırla"""
+    # device_map ile yüklenen (offload edilmiş) modelleri accelerate yerleştirir, taşınmamalı
+    if getattr(model, "hf_device_map", None) is None:
+        model.to(device)
+    model.eval()
+
+    if backend == "int8":
+        if device != "cpu":
+            raise ValueError("int8 backend sadece CPU'da çalışır")
+        model = quantize_int8(model)
+
+    return model
+
+
+def model_memory_mb(model) -> float:
+    """
+    Modelin bellekte tuttuğu ağırlık + buffer boyutu (MB).
+    Diske aktarılmış (meta) tensörler sayılmaz; ONNX modelleri için None.
+    """
+    if not isinstance(model, torch.nn.Module):
+        return None
+
+    def tensor_bytes(value):
+        if isinstance(value, torch.Tensor):
+            return 0 if value.device.type == "meta" else value.numel() * value.element_size()
+        if isinstance(value, (tuple, list)):
+            # Dinamik INT8 Linear: (_packed_params) -> (ağırlık, bias)
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+
+    seen = set()
+    total = 0
+    for value in model.state_dict(keep_vars=True).values():
+        key = value.data_ptr() if isinstance(value, torch.Tensor) and not value.is_quantized else id(value)
+        if key in seen:
+            continue  # Paylaşılan (tied) ağırlıklar bir kez sayılır
+        seen.add(key)
+        total += tensor_bytes(value)
+    return round(total / (1024 * 1024), 1)
+
+
+def process_rss_mb() -> float:
+    """Sürecin şu anki RSS değeri (MB) - Linux'ta /proc, diğer platformlarda None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
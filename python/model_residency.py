@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model bellek yöneticisi (residency)
+Trafik ders saatlerinde patlamalar halinde gelir; aradaki boş sürelerde modeller RAM'de beklemesin diye:
+- lazy:    model ilk kullanımda yüklenir
+- idle:    idle_timeout saniye kullanılmayan model bellekten atılır (0 = hiç atılmaz)
+- preload: planlı bir yoğunluktan önce ipucu ile (ör. {"command": "preload"}) önceden yüklenir
+- retry:   yüklenemeyen model kalıcı olarak devre dışı kalmaz; retry_backoff saniye sonra (her başarısız denemede
+           iki katına, en fazla max_retry_backoff'a kadar) ilk istekte yeniden denenir
+
+    residency = ModelResidency({"mbart": load_mbart}, idle_timeout=600, on_event=emit)
+    with residency.acquire("mbart") as model:   # kullanım sırasında model boşaltılmaz
+        ...
+
+Yükleme/boşaltma olayları on_event'e {"status": "model_loaded" | "model_unloaded", ...} olarak bildirilir
+ve model_loads_total, model_unloads_total, model_load_seconds metriklerine yazılır.
+"""
+
+import gc
+import time
+import ctypes
+import logging
+import threading
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def _trim_heap():
+    """glibc'nin serbest bıraktığı ama tuttuğu sayfaları işletim sistemine geri ver (sadece Linux/glibc)"""
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class _Slot:
+    """Tek bir modelin durumu - lock yükleme/boşaltmayı ve kullanım sayacını korur"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = None
+        self.error = None
+        self.failures = 0  # Art arda başarısız yükleme sayısı
+        self.retry_at = 0.0  # Bu monotonic zamandan önce yeniden denenmez
+        self.in_use = 0
+        self.last_used = 0.0
+        self.loads = 0
+        self.unloads = 0
+        self.last_load_ms = None
+
+
+class ModelResidency:
+    """İsimli modelleri loader fonksiyonlarıyla ihtiyaç anında yükleyen ve boşta kalınca bırakan yönetici"""
+
+    def __init__(self, loaders: dict, idle_timeout: float = 0, on_event=None, release=None,
+                 retry_backoff: float = 5.0, max_retry_backoff: float = 300.0):
+        """
+        loaders: isim -> argümansız yükleyici (yüklenen nesneyi döndürür, hata durumunda exception atar)
+        on_event: olay sözlüğünü alan fonksiyon (ör. stdout'a JSON satırı yazan emit)
+        release: model bırakıldıktan sonra çağrılır (ör. torch.cuda.empty_cache)
+        retry_backoff: başarısız yüklemeden sonra yeniden denemeden önce beklenecek süre (saniye),
+            art arda her hatada iki katına çıkar, en fazla max_retry_backoff
+        """
+        self.loaders = loaders
+        self.idle_timeout = idle_timeout
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.on_event = on_event
+        self.release = release
+        self._slots = {name: _Slot() for name in loaders}
+        self._reaper = None
+        self._reaper_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def _event(self, payload: dict):
+        if self.on_event is not None:
+            try:
+                self.on_event(payload)
+            except Exception as e:
+                logger.warning(f"⚠️ Residency olayı bildirilemedi: {e}")
+
+    def _load(self, name: str, slot: _Slot, reason: str):
+        """slot.lock tutulurken çağrılır - yükleyiciyi çalıştır, süreyi ve olayı kaydet"""
+        started = time.perf_counter()
+        try:
+            slot.value = self.loaders[name]()
+        except Exception as e:
+            slot.error = e
+            slot.failures += 1
+            backoff = min(self.retry_backoff * 2 ** (slot.failures - 1), self.max_retry_backoff)
+            slot.retry_at = time.monotonic() + backoff
+            REGISTRY.inc("model_load_failures_total", 1, "Başarısız model yüklemeleri", model=name)
+            self._event({"status": "model_load_failed", "model": name, "reason": reason, "error": str(e),
+                         "retry_in_s": round(backoff, 1)})
+            raise
+
+        elapsed = time.perf_counter() - started
+        slot.error = None
+        slot.failures = 0
+        slot.loads += 1
+        slot.last_used = time.monotonic()
+        slot.last_load_ms = round(elapsed * 1000, 1)
+        REGISTRY.inc("model_loads_total", 1, "Model yüklemeleri", model=name, reason=reason)
+        REGISTRY.observe("model_load_seconds", elapsed, "Model yükleme süresi (saniye)",
+                         buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300), model=name)
+        logger.info(f"📥 {name} belleğe alındı ({reason}, {elapsed:.1f}s)")
+        self._event({"status": "model_loaded", "model": name, "reason": reason, "load_ms": slot.last_load_ms})
+        self._ensure_reaper()
+
+    def _unload(self, name: str, slot: _Slot, reason: str):
+        """slot.lock tutulurken çağrılır - referansı bırak ve belleği geri ver"""
+        idle_s = round(time.monotonic() - slot.last_used, 1)
+        started = time.perf_counter()
+        slot.value = None
+        slot.unloads += 1
+        gc.collect()
+        if self.release is not None:
+            self.release()
+        _trim_heap()
+
+        REGISTRY.inc("model_unloads_total", 1, "Bellekten atılan modeller", model=name, reason=reason)
+        logger.info(f"📤 {name} bellekten atıldı ({reason}, {idle_s}s boşta)")
+        self._event({
+            "status": "model_unloaded",
+            "model": name,
+            "reason": reason,
+            "idle_s": idle_s,
+            "unload_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+
+    @contextmanager
+    def acquire(self, name: str):
+        """
+        Modeli kullanım için al - yüklü değilse yüklenir (aynı modeli bekleyen diğer thread'ler yüklemeyi bekler).
+        Blok boyunca model boşaltılmaz. Yüklenemeyen model bekleme süresi dolana kadar denenmez, None verilir;
+        süre dolduysa yeniden yüklenir.
+        """
+        slot = self._slots[name]
+        with slot.lock:
+            if slot.value is None and self._can_try(slot):
+                try:
+                    self._load(name, slot, "lazy" if slot.error is None else "retry")
+                except Exception as e:
+                    logger.warning(f"⚠️ {name} yüklenemedi: {e}")
+            slot.in_use += 1
+            value = slot.value
+        try:
+            yield value
+        finally:
+            with slot.lock:
+                slot.in_use -= 1
+                slot.last_used = time.monotonic()
+
+    @staticmethod
+    def _can_try(slot: _Slot) -> bool:
+        """Hiç denenmedi, son yükleme başarılıydı ya da hatadan sonraki bekleme süresi doldu"""
+        return slot.error is None or time.monotonic() >= slot.retry_at
+
+    def get(self, name: str):
+        """Yüklüyse modeli döndür, yükleme tetiklemez"""
+        return self._slots[name].value
+
+    def available(self, name: str) -> bool:
+        """Model kullanılabilir mi - yüklü, henüz denenmemiş ya da yeniden deneme zamanı gelmiş"""
+        slot = self._slots[name]
+        return slot.value is not None or self._can_try(slot)
+
+    def preload(self, names: list = None, reason: str = "preload") -> dict:
+        """
+        Modelleri şimdi yükle (yüklü olanların boşta süresi sıfırlanır) - isim -> hata mesajı ya da None.
+        Bekleme süresi beklenmez, yani preload başarısız modeli hemen yeniden dener.
+        """
+        errors = {}
+        for name in names or list(self.loaders):
+            if name not in self._slots:
+                errors[name] = "Bilinmeyen model"
+                continue
+            slot = self._slots[name]
+            with slot.lock:
+                slot.last_used = time.monotonic()
+                if slot.value is not None:
+                    errors[name] = None
+                    continue
+                try:
+                    self._load(name, slot, reason)
+                    errors[name] = None
+                except Exception as e:
+                    logger.warning(f"⚠️ {name} yüklenemedi: {e}")
+                    errors[name] = str(e)
+        return errors
+
+    def unload(self, names: list = None, reason: str = "manual") -> list:
+        """Kullanımda olmayan yüklü modelleri hemen bırak - bırakılan isimler döner"""
+        unloaded = []
+        for name in names or list(self.loaders):
+            slot = self._slots.get(name)
+            if slot is None:
+                continue
+            with slot.lock:
+                if slot.value is not None and slot.in_use == 0:
+                    self._unload(name, slot, reason)
+                    unloaded.append(name)
+        return unloaded
+
+    def unload_idle(self, now: float = None) -> list:
+        """idle_timeout'u geçen ve kullanımda olmayan modelleri bırak"""
+        if not self.idle_timeout:
+            return []
+        now = now if now is not None else time.monotonic()
+        idle = [
+            name for name, slot in self._slots.items()
+            if slot.value is not None and slot.in_use == 0 and now - slot.last_used >= self.idle_timeout
+        ]
+        unloaded = []
+        for name in idle:
+            slot = self._slots[name]
+            with slot.lock:
+                # Kilidi beklerken kullanılmış olabilir
+                if slot.value is not None and slot.in_use == 0 and now - slot.last_used >= self.idle_timeout:
+                    self._unload(name, slot, "idle")
+                    unloaded.append(name)
+        return unloaded
+
+    def _ensure_reaper(self):
+        """Boşta kalan modelleri bırakan arka plan thread'ini (ilk yüklemede) başlat"""
+        if not self.idle_timeout:
+            return
+        with self._reaper_lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            interval = min(max(self.idle_timeout / 4, 0.5), 60)
+
+            def reap():
+                while not self._stopped.wait(interval):
+                    self.unload_idle()
+
+            self._reaper = threading.Thread(target=reap, name="residency", daemon=True)
+            self._reaper.start()
+
+    def close(self):
+        """Arka plan thread'ini durdur"""
+        self._stopped.set()
+
+    def stats(self) -> dict:
+        """Model başına durum - yüklü mü, kullanımda mı, kaç kez yüklendi/bırakıldı, son yükleme süresi"""
+        now = time.monotonic()
+        return {
+            name: {
+                "loaded": slot.value is not None,
+                "in_use": slot.in_use,
+                "idle_s": round(now - slot.last_used, 1) if slot.value is not None else None,
+                "loads": slot.loads,
+                "unloads": slot.unloads,
+                "last_load_ms": slot.last_load_ms,
+                "error": str(slot.error) if slot.error is not None else None,
+                "retry_in_s": round(max(0.0, slot.retry_at - now), 1) if slot.error is not None else None,
+            }
+            for name, slot in self._slots.items()
+        }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sonuç önbelleği - LRU + TTL
+Aynı (soru, öğrenci cevabı, doğru cevap) üçlüsü için modelleri tekrar çalıştırmamak için
+"""
+
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_turkish(text: str) -> str:
+    """
+    Türkçe'ye uygun normalizasyon.
+    I/ı ve İ/i dönüşümü, noktalama temizliği ve boşluk sadeleştirme yapar:
+    "ANKARA", "Ankara " ve "ankara." aynı forma iner.
+    """
+    if not text:
+        return ""
+
+    text = unicodedata.normalize('NFC', str(text))
+    # str.lower() Türkçe'yi bilmez: 'I' -> 'i' ve 'İ' -> 'i̇' yapar
+    text = text.replace('I', 'ı').replace('İ', 'i').lower()
+    # Noktalama işaretlerini boşluğa çevir (+, = gibi semboller korunur)
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+
+    return ' '.join(text.split())
+
+
+# Cevabın anlamını değiştirmeyen işaretler: çift tırnaklar ve cümle sonu noktalaması
+QUOTE_CHARS = '"`“”„«»'
+TRAILING_PUNCTUATION = '.!?…'
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Anlamı koruyan normalizasyon - önbellek anahtarı ve birebir eşleşme için.
+    Sadece büyük/küçük harf (Türkçe I/ı, İ/i), boşluk, tırnak ve cümle sonu noktalaması sadeleşir;
+    işaret ve ayraçlar korunur: "5" / "-5", "1000" / "1.000", "3,5" / "35" farklı kalır.
+    """
+    if not text:
+        return ""
+
+    text = unicodedata.normalize('NFC', str(text))
+    text = text.replace('I', 'ı').replace('İ', 'i').lower()
+    text = ''.join(ch for ch in text if ch not in QUOTE_CHARS)
+    return ' '.join(text.split()).rstrip(TRAILING_PUNCTUATION).rstrip()
+
+
+def grading_key(question: str, student_answer: str, correct_answer: str) -> tuple:
+    """
+    Değerlendirme üçlüsü için önbellek anahtarı.
+    normalize_answer kullanılır: sadece işaret/ayraç farkı olan cevaplar ("5" / "-5") aynı kaydı paylaşmaz.
+    """
+    return (
+        normalize_answer(question),
+        normalize_answer(student_answer),
+        normalize_answer(correct_answer)
+    )
+
+
+class ResultCache:
+    """Thread-safe, boyutu sınırlı LRU önbellek; isteğe bağlı TTL ve hit/miss sayaçları ile"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (kayıt zamanı, değer)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Değeri döndür, yoksa ya da süresi dolduysa None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def find(self, match):
+        """
+        Anahtarı match(key) koşulunu sağlayan ilk geçerli kaydın değeri (en son kullanılandan eskiye doğru),
+        yoksa None. Tam eşleşme yerine yakınlık araması içindir; hit/miss get gibi sayılır.
+        """
+        with self._lock:
+            now = time.monotonic()
+            for key in reversed(self._entries):
+                stored_at, value = self._entries[key]
+                if self.ttl_seconds is not None and now - stored_at > self.ttl_seconds:
+                    continue
+                if match(key):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Değeri kaydet, kapasite aşılırsa en eski kullanılanı çıkar"""
+        if self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Tüm kayıtları sil (sayaçlar korunur)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Önbellek istatistikleri"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
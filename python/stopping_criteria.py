@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+generate() durdurma kriterleri ve skor kaydı
+- DeadlineCriteria: isteğin süre sınırı dolunca satırın çözümü kesilir
+- LabelCompleteCriteria: parse_output() etiketi çıkarabildiği ve geri bildirim cümlesi bittiği anda durur
+- SequenceLogProb: üretilen çıktının ortalama token olasılığı (kademeli modda cevap bazında güven)
+"""
+
+import time
+
+import torch
+from packaging import version
+from transformers import LogitsProcessor, StoppingCriteria, __version__ as TRANSFORMERS_VERSION
+
+from deadlines import is_expired
+
+# transformers >= 4.39 durdurma kriterlerinden satır bazında BoolTensor bekler;
+# eski sürümlerde tek bir bool döner ve batch ancak tüm satırlar bitince durur
+ROW_WISE_STOPPING = version.parse(TRANSFORMERS_VERSION) >= version.parse("4.39.0")
+
+
+def label_complete(text: str, label_map: list) -> bool:
+    """
+    parse_output() etiketi çıkarabiliyor ve "Geri Bildirim:" kısmı tamamlanmış mı?
+    Geri bildirim, boş olmayan ve cümle sonu noktalamasıyla biten bir metin olmalı.
+    """
+    if "Etiket:" not in text or "Geri Bildirim:" not in text:
+        return False
+
+    label_part, feedback = text.split("Geri Bildirim:", 1)
+    label_part = label_part.replace("Etiket:", "").lower()
+    if not any(label.lower() in label_part for label in label_map):
+        return False
+
+    feedback = feedback.strip()
+    return bool(feedback) and feedback[-1] in ".!?"
+
+
+def _stop(done: list, device):
+    if ROW_WISE_STOPPING:
+        return torch.tensor(done, dtype=torch.bool, device=device)
+    return all(done)
+
+
+class DeadlineCriteria(StoppingCriteria):
+    """Satırın süre sınırı dolunca çözmeyi bitir (None = sınırsız)"""
+
+    def __init__(self, deadlines: list):
+        self.deadlines = deadlines
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        now = time.monotonic()
+        return _stop([is_expired(deadline, now) for deadline in self.deadlines], input_ids.device)
+
+
+class LabelCompleteCriteria(StoppingCriteria):
+    """Etiket ve geri bildirim cümlesi tamamlanınca çözmeyi bitir - max_length'e kadar örneklemeye gerek yok"""
+
+    def __init__(self, tokenizer, label_map: list):
+        self.tokenizer = tokenizer
+        self.label_map = label_map
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs):
+        texts = self.tokenizer.batch_decode(input_ids, skip_special_tokens=True)
+        return _stop([label_complete(text, self.label_map) for text in texts], input_ids.device)
+
+
+class SequenceLogProb(LogitsProcessor):
+    """
+    generate() sırasında seçilen token'ların log-olasılığını biriktirir (sıcaklık/top-k/top-p öncesi dağılım).
+    output_scores=True her adımın (batch x vocab) skorlarını saklar - 250k'lık mBART sözlüğünde yüzlerce MB;
+    burada sadece son adımın dağılımı tutulur. Işın araması (num_beams > 1) desteklenmez.
+
+        recorder = SequenceLogProb(tokenizer.pad_token_id, tokenizer.eos_token_id)
+        outputs = model.generate(..., logits_processor=LogitsProcessorList([recorder]))
+        probs = recorder.finish(outputs)      # satır başına ortalama token olasılığı (0-1) ya da None
+    """
+
+    def __init__(self, pad_token_id: int, eos_token_id: int):
+        self.pad_token_id = pad_token_id
+        self.eos_token_id = eos_token_id
+        self._log_probs = None
+        self._total = None
+        self._count = None
+        self._done = None
+
+    def _add(self, tokens: torch.LongTensor):
+        """Bir önceki adımın dağılımından seçilen token'ın log-olasılığını ekle (eos'tan sonrası ve pad sayılmaz)"""
+        if self._log_probs is None:
+            return
+        chosen = self._log_probs.gather(1, tokens[:, None]).squeeze(1)
+        counted = ~self._done & (tokens != self.pad_token_id)
+        self._total += torch.where(counted, chosen, torch.zeros_like(chosen))
+        self._count += counted
+        self._done |= tokens == self.eos_token_id
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if self._total is None:
+            batch_size = input_ids.shape[0]
+            self._total = torch.zeros(batch_size, device=scores.device)
+            self._count = torch.zeros(batch_size, dtype=torch.long, device=scores.device)
+            self._done = torch.zeros(batch_size, dtype=torch.bool, device=scores.device)
+        else:
+            self._add(input_ids[:, -1])
+        self._log_probs = torch.log_softmax(scores.float(), dim=-1)
+        return scores
+
+    def finish(self, sequences: torch.LongTensor) -> list:
+        """Son adımın token'ını ekle ve satır başına exp(ortalama log-olasılık) döndür (token yoksa None)"""
+        if self._total is None:
+            return [None] * sequences.shape[0]
+        self._add(sequences[:, -1])
+        probs = torch.exp(self._total / self._count.clamp(min=1)).tolist()
+        return [prob if count else None for prob, count in zip(probs, self._count.tolist())]
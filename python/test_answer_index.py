@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+answer_index testleri - kabul edilen cevap indeksi işaret ve ayraçları korumalı
+Çalıştırma: python -m pytest -q
+"""
+
+import json
+
+import pytest
+
+from answer_index import AnswerIndex, answer_key
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "question_bank.json"
+    path.write_text(json.dumps([
+        {"id": 1, "question": "3 + 4 = ?", "options": ["7", "-7", "1"], "correctAnswer": [0], "topic": "Matematik"},
+        {"id": 2, "question": "Yarım kaç eder?", "options": ["3.5", "0.5"], "correctAnswer": [1], "topic": "Matematik"},
+        {"id": 3, "question": "En kalabalık ülke?", "options": ["Çin", "Hindistan"], "correctAnswer": [0, 1], "topic": "Coğrafya"},
+    ]), encoding="utf-8")
+    return AnswerIndex(path)
+
+
+def test_sign_is_part_of_the_key(index):
+    assert index.lookup(1, "7") == "7"
+    assert index.lookup(1, "-7") is None
+
+
+@pytest.mark.parametrize("answer", ["0,5", "0 5", "05"])
+def test_separators_are_not_folded(index, answer):
+    assert index.lookup(2, answer) is None
+
+
+def test_numeric_answer_ignores_case_whitespace_and_trailing_period(index):
+    assert index.lookup(2, " 0.5. ") == "0.5"
+
+
+@pytest.mark.parametrize("answer", ["cin", "ÇİN", "Çin.", "  çin  "])
+def test_verbal_answers_are_folded(index, answer):
+    assert index.lookup(3, answer) == "Çin"
+
+
+def test_unknown_question_and_counters(index):
+    assert index.lookup(99, "7") is None
+    index.lookup(1, "7")
+    index.lookup(1, "8")
+    stats = index.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_answer_key():
+    assert answer_key("-7") != answer_key("7")
+    assert answer_key("x+1") != answer_key("x-1")
+    assert answer_key("Jüpiter!") == answer_key("jupiter")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+deadlines testleri - süre sınırı ayrıştırma, geçersiz değerler ve birleştirme
+Çalıştırma: python -m pytest -q
+"""
+
+import time
+
+import pytest
+
+from deadlines import is_expired, latest_deadline, parse_deadline
+
+
+def test_no_deadline():
+    assert parse_deadline({}) is None
+    assert parse_deadline({"deadline_ms": None}) is None
+
+
+def test_relative_budget_from_receive_time():
+    assert parse_deadline({"deadline_ms": 1500}, received_at=10.0) == pytest.approx(11.5)
+    assert parse_deadline({"deadline_ms": "250"}, received_at=10.0) == pytest.approx(10.25)
+
+
+def test_absolute_unix_deadline():
+    deadline = parse_deadline({"deadline": time.time() + 2})
+    assert deadline - time.monotonic() == pytest.approx(2, abs=0.1)
+
+
+@pytest.mark.parametrize("value", ["abc", [], {}, True, float("nan"), float("inf")])
+@pytest.mark.parametrize("field", ["deadline_ms", "deadline"])
+def test_invalid_values_raise_value_error(field, value):
+    with pytest.raises(ValueError, match=field):
+        parse_deadline({field: value})
+
+
+def test_is_expired():
+    assert not is_expired(None)
+    assert not is_expired(10.0, now=9.9)
+    assert is_expired(10.0, now=10.0)
+
+
+def test_latest_deadline():
+    assert latest_deadline([3.0, 5.0, 4.0]) == 5.0
+    assert latest_deadline([3.0, None]) is None
+    assert latest_deadline([]) is None
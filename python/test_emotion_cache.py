@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+emotion_cache testleri - içerik/algısal hash eşleşmesi ve tespit moduna (scope) göre ayrım
+Çalıştırma: python -m pytest -q
+"""
+
+import numpy as np
+
+from emotion_cache import EmotionCache, content_key, hamming, perceptual_hash
+
+
+def gradient_image(noise=0, seed=0):
+    """Yatay gradyan - gürültü küçük kaldıkça dHash değişmez"""
+    img = np.tile(np.linspace(0, 255, 90), (80, 1))
+    if noise:
+        img = img + np.random.default_rng(seed).uniform(-noise, noise, img.shape)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+
+def test_content_key_is_byte_exact():
+    assert content_key(b"kare") == content_key(b"kare")
+    assert content_key(b"kare") != content_key(b"kare ")
+
+
+def test_perceptual_hash_tolerates_small_noise():
+    clean = perceptual_hash(gradient_image())
+    assert hamming(clean, perceptual_hash(gradient_image(noise=2))) <= 4
+    assert hamming(clean, perceptual_hash(gradient_image()[:, ::-1])) > 32
+    color = np.dstack([gradient_image()] * 3)
+    assert perceptual_hash(color) == clean
+
+
+def test_exact_lookup_is_scoped():
+    cache = EmotionCache()
+    cache.put("k", {"score": 70})
+    cache.put("k", {"score": 40}, scope="oturum-1")
+    assert cache.get("k") == {"score": 70}
+    assert cache.get("k", scope="oturum-1") == {"score": 40}
+    assert cache.get("k", scope="oturum-2") is None
+
+
+def test_near_lookup_within_distance_and_scope():
+    cache = EmotionCache(max_distance=2)
+    cache.put("k", {"score": 70}, phash=0b1111, scope="oturum-1")
+    assert cache.get_near(0b1100, scope="oturum-1") == {"score": 70}
+    assert cache.get_near(0b1000, scope="oturum-1") is None
+    assert cache.get_near(0b1111) is None
+
+
+def test_near_lookup_disabled_by_default():
+    cache = EmotionCache()
+    cache.put("k", {"score": 70}, phash=1)
+    assert cache.get_near(1) is None
+    assert cache.stats()["near"] is None
+
+
+def test_exact_distance_zero():
+    cache = EmotionCache(max_distance=0)
+    cache.put("k", {"score": 70}, phash=5)
+    assert cache.get_near(5) == {"score": 70}
+    assert cache.get_near(4) is None
+
+
+def test_stats_hit_rate():
+    cache = EmotionCache(max_distance=1)
+    cache.put("k", {"score": 70}, phash=1)
+    assert cache.get("k") is not None
+    assert cache.get("x") is None
+    assert cache.get_near(1) is not None
+    assert cache.stats()["hit_rate"] == 1.0
+    assert {sample[0] for sample in cache.collect_metrics()} >= {"dedup_cache_hits_total", "dedup_cache_size"}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+emotion_confidence testleri - toplu skorlama skaler sürümle birebir aynı (değer ve tip), oturum özetleri
+Çalıştırma: python -m pytest -q
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from emotion_confidence import (
+    EMOTION_LABELS,
+    calculate_contextual_confidence,
+    calculate_contextual_confidence_batch,
+    ewma,
+    rolling_mean,
+    score_sessions,
+)
+
+FRAMES = [
+    {"happy": 80, "neutral": 20},
+    {"happy": 100, "surprise": 150},
+    {"sad": 60, "fear": 30, "surprise": 40},
+    {"neutral": 100},
+    {"angry": 33.3, "happy": 33.3, "neutral": 33.4},
+    {"happy": 50, "sad": 25.5, "surprise": 10},
+    {},
+    {label: 0 for label in EMOTION_LABELS},
+]
+
+
+def random_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        values = rng.dirichlet(np.ones(len(EMOTION_LABELS)) * rng.choice([0.05, 0.3, 1, 5])) * 100
+        if rng.random() < 0.5:
+            frames.append({label: int(round(v)) for label, v in zip(EMOTION_LABELS, values)})
+        else:
+            frames.append({label: float(v) for label, v in zip(EMOTION_LABELS, values)})
+    return frames
+
+
+@pytest.mark.parametrize("frames", [FRAMES, random_frames(500)], ids=["elle", "rastgele"])
+def test_batch_matches_scalar_including_types(frames):
+    # json.dumps 50 ile 50.0'ı ayırır - tipler de aynı olmalı
+    batch = calculate_contextual_confidence_batch(frames)
+    assert len(batch) == len(frames)
+    for frame, result in zip(frames, batch):
+        assert json.dumps(result) == json.dumps(calculate_contextual_confidence(frame))
+
+
+def test_batch_accepts_array():
+    frames = [frame for frame in random_frames(50, seed=1) if isinstance(frame["happy"], float)]
+    array = np.array([[frame[label] for label in EMOTION_LABELS] for frame in frames])
+    assert calculate_contextual_confidence_batch(array) == [calculate_contextual_confidence(f) for f in frames]
+
+
+def test_empty_batch():
+    assert calculate_contextual_confidence_batch([]) == []
+
+
+def test_rolling_mean_uses_available_values_at_start():
+    np.testing.assert_allclose(rolling_mean([1, 2, 3, 4], 2), [1, 1.5, 2.5, 3.5])
+    with pytest.raises(ValueError):
+        rolling_mean([1], 0)
+
+
+def test_ewma():
+    np.testing.assert_allclose(ewma([1, 2, 3], 0.5), [1, 1.5, 2.25])
+    with pytest.raises(ValueError):
+        ewma([1], 0)
+
+
+def test_score_sessions_orders_mixed_timestamps():
+    frames = [
+        {"session_id": "a", "timestamp": "2024-01-01T00:00:02", "emotions": {"happy": 100}},
+        {"session_id": "a", "timestamp": 5, "emotions": {"sad": 100}},
+        {"session_id": "a", "emotions": {"neutral": 100}},
+        {"session_id": "a", "timestamp": "3", "emotions": {"fear": 100}},
+        {"session_id": "b", "question_id": 1, "timestamp": 1, "emotions": {"happy": 100}},
+    ]
+    result = score_sessions(frames)
+    expected = [calculate_contextual_confidence(frames[i]["emotions"])["score"] for i in (2, 3, 1, 0)]
+    assert result["a"]["scores"] == pytest.approx(expected)
+    assert result["b"]["frames"] == 1
+    assert result["b"]["questions"]["1"]["frames"] == 1
+    assert score_sessions([]) == {}
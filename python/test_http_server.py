@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+http_server testleri - geçersiz öğeler kuyruğa girmeden 400, kabul kuyruğu sınırları
+Çalıştırma: python -m pytest -q
+"""
+
+import json
+import asyncio
+
+import pytest
+
+from http_server import GradingServer
+
+VALID = {"question": "q", "student_answer": "a", "correct_answer": "b"}
+
+
+class FakeInferencer:
+    def __init__(self):
+        self.batches = []
+
+    def analyze_batch(self, requests):
+        self.batches.append(requests)
+        return [{"success": True} for _ in requests]
+
+
+def analyze(payload, queue_size=4):
+    """Sunucuyu soketsiz kur ve POST /analyze gövdesini doğrudan işle"""
+    inferencer = FakeInferencer()
+    server = GradingServer(inferencer, queue_size=queue_size, batch_size=4, batch_wait_ms=0)
+
+    async def run():
+        server.queue = asyncio.Queue(maxsize=server.queue_size)
+        server.ready = True
+        batcher = asyncio.ensure_future(server.batcher())
+        try:
+            return await server.route("POST", "/analyze", json.dumps(payload).encode())
+        finally:
+            batcher.cancel()
+
+    try:
+        status, body, _ = asyncio.run(run())
+    finally:
+        server.executor.shutdown()
+    return status, body, inferencer.batches
+
+
+@pytest.mark.parametrize("deadline", ["abc", True, float("nan")])
+def test_invalid_deadline_in_list_rejects_whole_request(deadline):
+    status, body, batches = analyze([VALID, {**VALID, "deadline_ms": deadline}])
+    assert status == 400
+    assert body["error"].startswith("2. öğe: deadline_ms")
+    assert batches == []
+
+
+def test_invalid_deadline_in_single_object():
+    status, body, batches = analyze({**VALID, "deadline": "yarın"})
+    assert status == 400
+    assert "deadline" in body["error"]
+    assert batches == []
+
+
+def test_valid_list_is_analyzed():
+    status, body, batches = analyze([{**VALID, "id": 1}, {**VALID, "deadline_ms": "5000"}])
+    assert status == 200
+    assert body == [{"id": 1, "success": True}, {"success": True}]
+    assert sum(len(batch) for batch in batches) == 2
+
+
+def test_list_larger_than_queue_is_413():
+    status, _, batches = analyze([VALID] * 5, queue_size=4)
+    assert status == 413
+    assert batches == []
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+lexical_grader testleri - işaretli/ayraçlı cevaplar ve yazım hatası toleransı
+Çalıştırma: python -m pytest -q
+"""
+
+from decimal import Decimal
+
+import pytest
+
+from lexical_grader import lexical_grade, max_typo_edits, number_values
+
+
+def label(student, correct, threshold=0.8):
+    decision = lexical_grade(student, correct, threshold)
+    return decision["label"] if decision else None
+
+
+@pytest.mark.parametrize("student, correct", [
+    ("Ankara", "ankara"),
+    ("ANKARA.", "Ankara"),
+    ("İstanbul", "istanbul"),
+    ("-5", "-5"),
+])
+def test_exact_match(student, correct):
+    assert label(student, correct) == "Tam Doğru"
+
+
+def test_sign_flip_is_wrong():
+    assert label("5", "-5") == "Yanlış"
+    assert label("-7", "7") == "Yanlış"
+
+
+def test_decimal_separators_with_same_value():
+    assert label("3,5", "3.5") == "Tam Doğru"
+    assert lexical_grade("3,5", "3.5")["method"] == "numeric"
+
+
+def test_ambiguous_thousands_separator_goes_to_models():
+    # "1.000" bin de olabilir 1,0 da - karar modellere bırakılır
+    assert lexical_grade("1000", "1.000") is None
+
+
+def test_different_numbers_are_wrong():
+    assert label("36", "35") == "Yanlış"
+    assert label("35", "3,5") == "Yanlış"
+
+
+def test_math_expressions_are_not_folded():
+    # Noktalamayı silen karşılaştırmalar işaretli cevaplara uygulanmaz
+    assert lexical_grade("x+1", "x-1") is None
+
+
+def test_typo_gets_partial_credit_not_full():
+    decision = lexical_grade("ankra", "ankara")
+    assert decision["label"] == "Çok Benzer"
+    assert decision["method"] == "edit_distance"
+
+
+def test_lowered_threshold_does_not_accept_different_words():
+    # Eşik 0'a indirilse de "slovakya" / "slovenya" (2 düzenleme, ~0.75 benzerlik) geçmez
+    assert label("slovakya", "slovenya", threshold=0.0) != "Çok Benzer"
+
+
+def test_transliteration():
+    assert lexical_grade("cin", "Çin")["method"] == "transliteration"
+
+
+def test_unrelated_short_answers_are_wrong():
+    assert label("istanbul", "ankara") == "Yanlış"
+
+
+def test_empty_answer():
+    assert label("", "ankara") == "Yanlış"
+    assert lexical_grade("ankara", "") is None
+
+
+def test_number_values():
+    assert number_values("-5") == {Decimal(-5)}
+    assert number_values("1.000") == {Decimal(1000), Decimal("1.000")}
+    assert number_values("1.234,5") == {Decimal("1234.5")}
+    assert number_values("1.2.3") is None
+    assert number_values("beş") is None
+
+
+def test_max_typo_edits():
+    assert max_typo_edits(6) == 1
+    assert max_typo_edits(12) == 2
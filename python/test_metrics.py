@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+metrics testleri - Prometheus dökümü, döküm anında namespace ve aşama zamanlayıcısı
+Çalıştırma: python -m pytest -q
+"""
+
+from metrics import MetricsRegistry, StageTimer, stage
+
+
+def test_counters_gauges_and_histograms_render():
+    registry = MetricsRegistry("test")
+    registry.inc("requests_total", 1, "İstekler", model="mbart")
+    registry.inc("requests_total", 2, "İstekler", model="mbart")
+    registry.set("queue_size", 4, "Kuyruk")
+    registry.observe("latency_seconds", 0.02, "Gecikme", buckets=(0.01, 0.1))
+    text = registry.render_prometheus()
+
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{model="mbart"} 3' in text
+    assert "test_queue_size 4" in text
+    assert 'test_latency_seconds_bucket{le="0.01"} 0' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "test_latency_seconds_count 1" in text
+
+
+def test_namespace_at_render_time_does_not_mutate_registry():
+    registry = MetricsRegistry("metamind")
+    registry.inc("requests_total")
+    assert "emotion_requests_total 1" in registry.render_prometheus("emotion")
+    assert registry.namespace == "metamind"
+    assert "metamind_requests_total 1" in registry.render_prometheus()
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry("test")
+    registry.inc("errors_total", error='say "merhaba"')
+    assert 'test_errors_total{error="say \\"merhaba\\""} 1' in registry.render_prometheus()
+
+
+def test_collectors_are_rendered_with_prefix():
+    registry = MetricsRegistry("test")
+    registry.register_collector(lambda: [("cache_size", "gauge", "Önbellek", 7, {"kind": "exact"})])
+    text = registry.render_prometheus("emotion")
+    assert "# TYPE emotion_cache_size gauge" in text
+    assert 'emotion_cache_size{kind="exact"} 7' in text
+
+
+def test_stage_records_histogram_and_active_timer():
+    registry = MetricsRegistry("test")
+    with StageTimer() as timer:
+        with stage("tokenize", registry):
+            pass
+        with stage("tokenize", registry):
+            pass
+    with stage("generate", registry):
+        pass
+
+    assert set(timer.as_dict()["stages_ms"]) == {"tokenize"}
+    histograms = registry.snapshot()["histograms"]
+    assert histograms['stage_duration_seconds{stage="tokenize"}']["count"] == 2
+    assert histograms['stage_duration_seconds{stage="generate"}']["count"] == 1
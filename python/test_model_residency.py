@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+model_residency testleri - lazy yükleme, boşta bırakma, preload ve başarısız yüklemenin yeniden denenmesi
+Çalıştırma: python -m pytest -q
+"""
+
+import time
+
+from model_residency import ModelResidency
+
+
+class FlakyLoader:
+    """İlk `failures` çağrıda hata veren yükleyici"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("geçici hata")
+        return f"model-{self.calls}"
+
+
+def test_lazy_load_on_first_acquire():
+    loader = FlakyLoader()
+    residency = ModelResidency({"m": loader})
+    assert residency.get("m") is None
+    with residency.acquire("m") as model:
+        assert model == "model-1"
+    with residency.acquire("m") as model:
+        assert model == "model-1"
+    assert loader.calls == 1
+
+
+def test_failed_load_is_retried_after_backoff():
+    loader = FlakyLoader(failures=1)
+    residency = ModelResidency({"m": loader}, retry_backoff=0.05)
+
+    with residency.acquire("m") as model:
+        assert model is None
+    # Bekleme süresi dolmadan tekrar denenmez ve model kullanılamaz sayılır
+    with residency.acquire("m") as model:
+        assert model is None
+    assert loader.calls == 1
+    assert not residency.available("m")
+
+    time.sleep(0.06)
+    assert residency.available("m")
+    with residency.acquire("m") as model:
+        assert model == "model-2"
+    assert residency.stats()["m"]["error"] is None
+
+
+def test_backoff_doubles_and_is_capped():
+    loader = FlakyLoader(failures=10)
+    residency = ModelResidency({"m": loader}, retry_backoff=1, max_retry_backoff=3)
+    backoffs = []
+    residency.on_event = lambda event: backoffs.append(event.get("retry_in_s"))
+    for _ in range(4):
+        residency.preload(["m"])
+    assert backoffs == [1, 2, 3, 3]
+
+
+def test_preload_retries_immediately():
+    loader = FlakyLoader(failures=1)
+    residency = ModelResidency({"m": loader}, retry_backoff=60)
+    assert residency.preload(["m"]) == {"m": "geçici hata"}
+    assert residency.preload(["m"]) == {"m": None}
+    assert residency.get("m") == "model-2"
+
+
+def test_idle_unload_skips_models_in_use():
+    residency = ModelResidency({"m": FlakyLoader()}, idle_timeout=10)
+    residency.preload(["m"])
+    with residency.acquire("m"):
+        assert residency.unload_idle(now=time.monotonic() + 60) == []
+    assert residency.unload_idle(now=time.monotonic() + 60) == ["m"]
+    assert residency.get("m") is None
+    residency.close()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+result_cache testleri - önbellek anahtarı işaret ve ayraçları korur, LRU/TTL davranışı
+Çalıştırma: python -m pytest -q
+"""
+
+import pytest
+
+import result_cache
+from result_cache import ResultCache, grading_key, normalize_answer, normalize_turkish
+
+
+@pytest.mark.parametrize("a, b", [
+    ("ANKARA", "ankara"),
+    ("İSTANBUL", "istanbul"),
+    ("IRMAK", "ırmak"),
+    ("  Ankara  ", "ankara"),
+    ("Ankara.", "ankara"),
+    ('"Ankara"', "ankara"),
+    ("çok   güzel", "çok güzel"),
+])
+def test_normalize_answer_equivalent_forms(a, b):
+    assert normalize_answer(a) == normalize_answer(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("5", "-5"),
+    ("1000", "1.000"),
+    ("3,5", "35"),
+    ("3.5", "3,5"),
+    ("x+1", "x-1"),
+])
+def test_normalize_answer_keeps_signs_and_separators(a, b):
+    assert normalize_answer(a) != normalize_answer(b)
+
+
+def test_normalize_turkish_drops_punctuation():
+    assert normalize_turkish("Ankara, Türkiye!") == "ankara türkiye"
+
+
+def test_grading_key_separates_signed_answers():
+    assert grading_key("3 - 8 = ?", "-5", "-5") != grading_key("3 - 8 = ?", "5", "-5")
+    assert grading_key("Başkent?", "ANKARA.", "Ankara") == grading_key("başkent?", "ankara", "ankara")
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a en son kullanılan olur
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiration(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    cache = ResultCache(ttl_seconds=10)
+    cache.put("k", "v")
+    now[0] += 5
+    assert cache.get("k") == "v"
+    now[0] += 6
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_entries=0)
+    cache.put("k", "v")
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_find_returns_most_recent_match():
+    cache = ResultCache()
+    cache.put(1, "bir")
+    cache.put(3, "üç")
+    assert cache.find(lambda key: key % 2 == 1) == "üç"
+    assert cache.find(lambda key: key > 10) is None
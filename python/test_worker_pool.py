@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+worker_pool testleri - yanıt sırası, sırası önemsiz batch'ler ve işçi hataları
+Çalıştırma: python -m pytest -q
+"""
+
+import os
+import time
+
+import pytest
+
+from worker_pool import WorkerPool, cpu_slices, fork_available
+
+pytestmark = pytest.mark.skipif(not fork_available(), reason="'fork' başlatma yöntemi yok")
+
+
+def handle(batch):
+    """batch: [(isim, bekleme), ...] - beklemeden sonra isimleri yanıt olarak döndür"""
+    for name, delay in batch:
+        if name == "hata":
+            raise ValueError("bozuk satır")
+        if name == "öl":
+            os._exit(1)
+        time.sleep(delay)
+    return [{"name": name} for name, _ in batch]
+
+
+def run_pool(batches, workers=2, can_reorder=None):
+    pool = WorkerPool(
+        handle,
+        workers,
+        error_handler=lambda batch, error: [{"name": name, "error": str(error)} for name, _ in batch],
+        can_reorder=can_reorder
+    )
+    pool.start()
+    emitted = []
+    try:
+        pool.run(iter(batches), emitted.append)
+    finally:
+        pool.close()
+    return emitted
+
+
+def test_responses_keep_batch_order():
+    # İlk batch yavaş; ikinci daha önce biter ama sırasını bekler
+    emitted = run_pool([[("a", 0.3)], [("b", 0)], [("c", 0)]])
+    assert [r["name"] for r in emitted] == ["a", "b", "c"]
+
+
+def test_reorderable_batches_are_written_when_finished():
+    emitted = run_pool(
+        [[("yavaş", 0.3)], [("hızlı", 0)]],
+        can_reorder=lambda responses: all(r["name"] == "hızlı" for r in responses)
+    )
+    assert [r["name"] for r in emitted] == ["hızlı", "yavaş"]
+
+
+def test_handler_error_uses_error_handler():
+    emitted = run_pool([[("x", 0)], [("hata", 0)], [("y", 0)]])
+    assert [r["name"] for r in emitted] == ["x", "hata", "y"]
+    assert emitted[1]["error"] == "bozuk satır"
+
+
+def test_dead_worker_batch_gets_error_responses():
+    emitted = run_pool([[("öl", 0)], [("y", 0)]])
+    assert [r["name"] for r in emitted] == ["öl", "y"]
+    assert "error" in emitted[0] and "error" not in emitted[1]
+
+
+def test_cpu_slices_are_disjoint_or_unpinned():
+    slices = cpu_slices(2, 1)
+    assert len(slices) == 2
+    if slices[0] is not None:
+        assert not slices[0] & slices[1]
+    assert cpu_slices(1, 10 ** 6) == [None]
@@ -7,13 +7,32 @@ Kişiselleştirilmiş feedback sistemi ile
 
 import sys
 import io
+import os
 import json
+import time
+import queue
+import argparse
+import threading
 import torch
 import logging
 import random
+import contextvars
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from transformers import MBartForConditionalGeneration, MBartTokenizer
 from transformers import MT5ForConditionalGeneration, MT5Tokenizer
+from transformers import LogitsProcessorList, StoppingCriteriaList
+from transformers.modeling_outputs import BaseModelOutput
+from result_cache import ResultCache, grading_key
+from lexical_grader import lexical_grade
+from answer_index import AnswerIndex, DEFAULT_QUESTION_BANK
+from metrics import REGISTRY, StageTimer, stage
+from deadlines import is_expired, latest_deadline, parse_deadline
+from stopping_criteria import DeadlineCriteria, LabelCompleteCriteria, SequenceLogProb
+from worker_pool import WorkerPool, cpu_slices, fork_available
+from model_residency import ModelResidency
+from model_backends import (BACKENDS, TORCH_DTYPES, load_onnx_model, load_tokenizer, load_torch_model,
+                            model_memory_mb, prepare_torch_model, process_rss_mb)
 
 # Windows için encoding ayarı
 if sys.platform == 'win32':
@@ -24,8 +43,36 @@ if sys.platform == 'win32':
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# stdout'a yazan tüm thread'ler (model yükleyicileri, ana döngü) bu kilidi kullanır
+_stdout_lock = threading.Lock()
+
+def emit(payload: dict):
+    """stdout'a tek JSON satırı yaz - eşzamanlı yazımlarda satırlar birbirine karışmaz"""
+    with stage("serialize"):
+        line = json.dumps(payload, ensure_ascii=False)
+    with _stdout_lock:
+        print(line, flush=True)
+
+# Token uzunluğu kovaları - aynı kovadaki prompt'lar birlikte pad'lenir
+LENGTH_BUCKETS = (16, 32, 64, 128, 256)
+
+def bucket_by_length(lengths: list, boundaries: tuple = LENGTH_BUCKETS) -> list:
+    """Uzunlukları kovalara ayır, her kova için (sıralı) indeks listesi döndür"""
+    buckets = {}
+    for i, length in enumerate(lengths):
+        bucket = next((b for b in boundaries if length <= b), boundaries[-1])
+        buckets.setdefault(bucket, []).append(i)
+    return [buckets[b] for b in sorted(buckets)]
+
 class UnifiedInference:
-    def __init__(self):
+    def __init__(self, concurrent: bool = False, intra_op_threads: int = None,
+                 cache_size: int = 1024, cache_ttl: float = 3600,
+                 lexical_fast_path: bool = True, similarity_threshold: float = 0.8,
+                 question_bank: str = None, inference_mode: str = "generate",
+                 consensus_mode: str = "both", cascade_first: str = "mbart", cascade_threshold: float = 0.6,
+                 backend: str = "torch", onnx_dir: str = None, offload_dir: str = None,
+                 model_dir: str = None, offline: bool = False, timings: bool = False,
+                 early_stop: bool = False, lazy_load: bool = False, idle_unload: float = 0):
         """Initialize unified inference system"""
         logger.info("🚀 Unified Inference başlatılıyor...")
         
@@ -33,48 +80,221 @@ class UnifiedInference:
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"🖥️  Cihaz: {self.device}")
         
-        # Model paths - Hugging Face'ten yükle
+        # Model paths - Hugging Face'ten yükle ya da yerel klasörden (<model_dir>/mbart, <model_dir>/mt5)
         self.mbart_path = "Ozget/MetaMind_Nlp_MBART_2"
         self.mt5_path = "Ozget/MetaMind_Nlp_MT5_2"
+        if model_dir:
+            self.mbart_path = os.path.join(model_dir, "mbart")
+            self.mt5_path = os.path.join(model_dir, "mt5")
+        
+        # Çevrimdışı mod - sadece yerel klasör / HF önbelleği kullanılır, ağa hiç çıkılmaz
+        self.offline = offline or os.environ.get("HF_HUB_OFFLINE", "").lower() in ("1", "true", "yes")
+        if self.offline:
+            logger.info("📴 Çevrimdışı mod: modeller sadece yerel dosyalardan yüklenecek")
         
         logger.info(f"📂 mBART model: {self.mbart_path}")
         logger.info(f"📂 MT5 model: {self.mt5_path}")
         
-        # Models
-        self.mbart_model = None
-        self.mbart_tokenizer = None
-        self.mt5_model = None
-        self.mt5_tokenizer = None
+        # Çıkarım backend'i - torch, bf16 (yarım bellek), int8 (dinamik kuantizasyon) ya da onnx (ONNX Runtime)
+        if backend not in BACKENDS:
+            raise ValueError(f"Geçersiz backend: {backend}")
+        if backend == "onnx" and not onnx_dir:
+            raise ValueError("onnx backend için onnx_dir gerekli (export_models.py çıktısı)")
+        if offload_dir and backend not in ("torch", "bf16"):
+            raise ValueError("Decoder offload sadece torch ve bf16 backend'lerinde kullanılabilir")
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.offload_dir = offload_dir
+        logger.info(f"⚙️  Backend: {self.backend}")
+        if self.offload_dir:
+            logger.info(f"💽 Decoder katmanları diske aktarılacak: {self.offload_dir}")
+        
+        # Model başına bellekteki ağırlık boyutu (MB) - yüklemeden sonra doldurulur
+        self.model_memory = {}
+        
+        # Models - (tokenizer, model) çiftleri residency yöneticisinde tutulur.
+        # lazy_load: ilk istekte yükle, idle_unload: bu kadar saniye kullanılmayan modeli bellekten at (0 = kapalı)
+        self.lazy_load = lazy_load
+        self.residency = ModelResidency(
+            {
+                "mbart": lambda: self._load_seq2seq("mbart", self.mbart_path, MBartForConditionalGeneration, MBartTokenizer),
+                "mt5": lambda: self._load_seq2seq("mt5", self.mt5_path, MT5ForConditionalGeneration, MT5Tokenizer),
+            },
+            idle_timeout=idle_unload,
+            on_event=self._on_residency_event,
+            release=torch.cuda.empty_cache if self.device == "cuda" else None
+        )
+        if self.lazy_load:
+            logger.info("💤 Lazy mod: modeller ilk istekte yüklenecek")
+        if idle_unload:
+            logger.info(f"⏱️  {idle_unload:g}s kullanılmayan modeller bellekten atılacak")
         
         # Label mapping
         self.label_map = ['Yanlış', 'Kısmen Doğru', 'Çok Benzer', 'Tam Doğru']
         
-    def load_models(self):
-        """Tüm modelleri yükle"""
-        try:
-            logger.info("📦 Modeller Hugging Face'ten yükleniyor...")
-            
-            # mBART yükle
+        # Eşzamanlı mod - mBART ve MT5 generate() çağrıları paralel çalışır.
+        # Çekirdekler iki model arasında paylaştırılır, böylece toplam intra-op thread sayısı CPU sayısını aşmaz.
+        self.concurrent = concurrent
+        self.intra_op_threads = intra_op_threads
+        if self.concurrent and self.intra_op_threads is None:
+            self.intra_op_threads = max(1, (os.cpu_count() or 2) // 2)
+        if self.intra_op_threads:
+            torch.set_num_threads(self.intra_op_threads)
+            logger.info(f"🧵 Intra-op thread sayısı: {self.intra_op_threads}")
+        self._executor = None
+        
+        # Sonuç önbelleği - normalize edilmiş (soru, cevap, doğru cevap) -> consensus
+        self.result_cache = ResultCache(cache_size, cache_ttl) if cache_size > 0 else None
+        
+        # Çıkarım modu - "generate": serbest üretim + parse_output, "score": etiket olasılıkları (tek forward pass)
+        if inference_mode not in ("generate", "score"):
+            raise ValueError(f"Geçersiz çıkarım modu: {inference_mode}")
+        self.inference_mode = inference_mode
+        logger.info(f"🧮 Çıkarım modu: {self.inference_mode}")
+        
+        # Consensus modu - "both": her cevap iki modelden geçer,
+        # "cascade": önce cascade_first çalışır, kararı net değilse ikinci modele aktarılır
+        if consensus_mode not in ("both", "cascade"):
+            raise ValueError(f"Geçersiz consensus modu: {consensus_mode}")
+        if cascade_first not in ("mbart", "mt5"):
+            raise ValueError(f"Geçersiz kademeli mod ilk modeli: {cascade_first}")
+        self.consensus_mode = consensus_mode
+        self.cascade_first = cascade_first
+        self.cascade_threshold = cascade_threshold
+        
+        # Sözcüksel ön değerlendirme - açık doğru/yanlış cevaplar modellere gitmez
+        self.lexical_fast_path = lexical_fast_path
+        self.similarity_threshold = similarity_threshold
+        
+        # Soru bankası indeksi - question_id ile gelen istekler için kabul edilen varyantlar
+        self.answer_index = None
+        if question_bank:
             try:
-                logger.info(f"📥 mBART yükleniyor: {self.mbart_path}")
-                self.mbart_tokenizer = MBartTokenizer.from_pretrained(self.mbart_path)
-                self.mbart_model = MBartForConditionalGeneration.from_pretrained(self.mbart_path)
-                self.mbart_model.to(self.device)
-                self.mbart_model.eval()
-                logger.info("✅ mBART hazır!")
+                self.answer_index = AnswerIndex(question_bank)
             except Exception as e:
-                logger.warning(f"⚠️ mBART yüklenemedi: {e}")
+                logger.warning(f"⚠️ Soru bankası yüklenemedi: {e}")
+        
+        # Aşama süreleri her yanıta eklensin mi (istek bazında "timings": true ile de açılır)
+        self.timings = timings
+        REGISTRY.register_collector(self._collect_metrics)
+        
+        # Erken durdurma - etiket ve geri bildirim cümlesi çıkınca generate() max_length'i beklemez
+        self.early_stop = early_stop
+        
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Eşzamanlı mod için iki thread'lik havuzu (ilk kullanımda) oluştur"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=2,
+                thread_name_prefix="model",
+                initializer=torch.set_num_threads,
+                initargs=(self.intra_op_threads,)
+            )
+        return self._executor
+    
+    def _emit_phase(self, name: str, phase: str, started: float):
+        """Yükleme aşaması tamamlandı bildirimi (tokenizer, weights, warmup)"""
+        emit({
+            "status": "model_loading",
+            "model": name,
+            "phase": phase,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        })
+    
+    def _warmup(self, model, tokenizer):
+        """Kısa bir prompt ile ilk çıkarımı yap - lazy init ve bellek ayırma maliyeti ilk istekte ödenmesin"""
+        prompt = "Soru: 2 + 2 kaçtır? Öğrenci Cevabı: 4 Hedef Cevap: 4"
+        if self.inference_mode == "score":
+            self._score_labels_batch(model, tokenizer, [prompt], name="warmup")
+        else:
+            self._generate_batch(model, tokenizer, [prompt], {"max_new_tokens": 2, "do_sample": False}, name="warmup")
+    
+    def _load_seq2seq(self, name: str, path: str, model_cls, tokenizer_cls) -> tuple:
+        """Tek bir modeli seçili backend ile yükle - (tokenizer, model) döner"""
+        started = time.perf_counter()
+        logger.info(f"📥 {name} yükleniyor: {path} ({self.backend})")
+        
+        if self.backend == "onnx":
+            # export_models.py çıktısı: <onnx_dir>/<name>/ altında ONNX dosyaları + tokenizer
+            model_dir = os.path.join(self.onnx_dir, name)
+            tokenizer = load_tokenizer(model_dir, tokenizer_cls, self.offline)
+            self._emit_phase(name, "tokenizer", started)
+            model = load_onnx_model(model_dir, self.device, self.offline)
+        else:
+            tokenizer = load_tokenizer(path, tokenizer_cls, self.offline)
+            self._emit_phase(name, "tokenizer", started)
+            model = load_torch_model(
+                path, model_cls, self.offline,
+                dtype=TORCH_DTYPES[self.backend],
+                offload_dir=os.path.join(self.offload_dir, name) if self.offload_dir else None
+            )
+            model = prepare_torch_model(model, self.backend, self.device)
+        self._emit_phase(name, "weights", started)
+        
+        self.model_memory[name] = model_memory_mb(model)
+        if self.model_memory[name] is not None:
+            logger.info(f"📏 {name} bellekte: {self.model_memory[name]} MB")
+        
+        self._warmup(model, tokenizer)
+        self._emit_phase(name, "warmup", started)
+        
+        logger.info(f"✅ {name} hazır! ({time.perf_counter() - started:.1f}s)")
+        return tokenizer, model
+    
+    def _on_residency_event(self, event: dict):
+        """Yükleme/boşaltma olaylarını stdout'a bildir; boşaltılan modelin bellek kaydını sil"""
+        if event["status"] == "model_unloaded":
+            self.model_memory.pop(event["model"], None)
+            event = {**event, "rss_mb": process_rss_mb()}
+        emit(event)
+    
+    def _loaded(self, name: str) -> tuple:
+        """Yüklü (tokenizer, model) çifti; yüklü değilse (None, None)"""
+        return self.residency.get(name) or (None, None)
+    
+    @property
+    def mbart_tokenizer(self):
+        return self._loaded("mbart")[0]
+    
+    @property
+    def mbart_model(self):
+        return self._loaded("mbart")[1]
+    
+    @property
+    def mt5_tokenizer(self):
+        return self._loaded("mt5")[0]
+    
+    @property
+    def mt5_model(self):
+        return self._loaded("mt5")[1]
+    
+    def load_models(self):
+        """
+        Tüm modelleri paralel yükle - tokenizer, indirme, ağırlık dosyalarının diskten okunması ve warmup iki model
+        için aynı anda ilerler. accelerate kuruluysa from_pretrained (boş model kurma + ağırlıkları yerine yazma)
+        süreç genelindeki yama nedeniyle modeller arasında sırayla çalışır (bkz. model_backends._empty_init_lock).
+        Lazy modda hiçbir şey yüklenmez, servis hemen hazır olur; modeller ilk istekte yüklenir.
+        """
+        if self.lazy_load:
+            emit({
+                "status": "models_loaded",
+                "success": True,
+                "lazy": True,
+                "mbart_loaded": False,
+                "mt5_loaded": False,
+                "rss_mb": process_rss_mb()
+            })
+            return
+        
+        try:
+            source = "yerel dosyalardan" if self.offline else "Hugging Face'ten"
+            logger.info(f"📦 Modeller {source} yükleniyor...")
+            started = time.perf_counter()
             
-            # MT5 yükle
-            try:
-                logger.info(f"📥 MT5 yükleniyor: {self.mt5_path}")
-                self.mt5_tokenizer = MT5Tokenizer.from_pretrained(self.mt5_path)
-                self.mt5_model = MT5ForConditionalGeneration.from_pretrained(self.mt5_path)
-                self.mt5_model.to(self.device)
-                self.mt5_model.eval()
-                logger.info("✅ MT5 hazır!")
-            except Exception as e:
-                logger.warning(f"⚠️ MT5 yüklenemedi: {e}")
+            # Yüklenemeyen model residency'de hatalı olarak işaretlenir, istekler onu atlar
+            names = list(self.residency.loaders)
+            with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="loader") as pool:
+                list(pool.map(lambda name: self.residency.preload([name], reason="startup"), names))
             
             # En az bir model yüklenmeli
             if not self.mbart_model and not self.mt5_model:
@@ -83,127 +303,302 @@ class UnifiedInference:
             logger.info("🎉 Tüm modeller yüklendi!")
             
             # Modellerin hazır olduğunu bildir
-            print(json.dumps({
+            emit({
                 "status": "models_loaded",
                 "success": True,
                 "mbart_loaded": self.mbart_model is not None,
-                "mt5_loaded": self.mt5_model is not None
-            }, ensure_ascii=False), flush=True)
+                "mt5_loaded": self.mt5_model is not None,
+                "load_ms": round((time.perf_counter() - started) * 1000, 1),
+                "memory_mb": self.model_memory,
+                "rss_mb": process_rss_mb()
+            })
             
         except Exception as e:
             logger.error(f"❌ Model yükleme hatası: {e}")
-            print(json.dumps({
+            emit({
                 "status": "models_failed",
                 "success": False,
                 "error": str(e)
-            }, ensure_ascii=False), flush=True)
+            })
             raise
     
-    def predict_with_mbart(self, question: str, student_answer: str, correct_answer: str) -> dict:
-        """mBART ile tahmin - Her seferinde UNIQUE çıktı"""
-        if not self.mbart_model:
-            return None
-        
-        try:
-            # mBART için farklı prompt varyasyonları
-            prompt_variants = [
-                f"Soru: {question} Öğrenci Cevabı: {student_answer} Hedef Cevap: {correct_answer}",
-                f"Quiz: {question}\nCevap: {student_answer}\nDoğru: {correct_answer}",
-                f"Değerlendirme: '{question}' sorusuna '{student_answer}' cevabı. Beklenen: '{correct_answer}'",
-                f"Analiz: Soru='{question}', Verilen='{student_answer}', Hedef='{correct_answer}'",
+    def preload(self, models: list = None) -> dict:
+        """
+        Planlı yoğunluk öncesi ipucu - modelleri şimdi yükle, boşta sürelerini sıfırla.
+        isim -> {"loaded", "error", "last_load_ms"} döner.
+        """
+        errors = self.residency.preload(models)
+        stats = self.residency.stats()
+        return {
+            name: {
+                "loaded": stats.get(name, {}).get("loaded", False),
+                "error": error,
+                "last_load_ms": stats.get(name, {}).get("last_load_ms")
+            }
+            for name, error in errors.items()
+        }
+    
+    def _build_mbart_prompt(self, question: str, student_answer: str, correct_answer: str) -> str:
+        """mBART için rastgele prompt varyasyonu seç"""
+        prompt_variants = [
+            f"Soru: {question} Öğrenci Cevabı: {student_answer} Hedef Cevap: {correct_answer}",
+            f"Quiz: {question}\nCevap: {student_answer}\nDoğru: {correct_answer}",
+            f"Değerlendirme: '{question}' sorusuna '{student_answer}' cevabı. Beklenen: '{correct_answer}'",
+            f"Analiz: Soru='{question}', Verilen='{student_answer}', Hedef='{correct_answer}'",
+        ]
+        return random.choice(prompt_variants)
+    
+    def _build_mt5_prompt(self, question: str, student_answer: str, correct_answer: str) -> str:
+        """MT5 için rastgele prompt varyasyonu seç"""
+        prompt_variants = [
+            f"Soru: {question}\nCevap: {student_answer}\nDoğru: {correct_answer}\nPuanla ve yorum yap:",
+            f"Öğrenci Değerlendirme:\nSoru: {question}\nVerilen Cevap: {student_answer}\nBeklenen: {correct_answer}",
+            f"Quiz Analizi:\n'{question}' sorusuna '{student_answer}' cevabı verildi. Doğrusu '{correct_answer}'. Değerlendir:",
+            f"Akademik Değerlendirme:\nSoru: {question}\nÖğrencinin Yorumu: {student_answer}\nStandart Cevap: {correct_answer}\nFeedback:",
+        ]
+        return random.choice(prompt_variants)
+    
+    def _generate_batch(self, model, tokenizer, input_texts: list, generation_kwargs: dict, name: str = "model",
+                        deadlines: list = None, score: bool = False) -> tuple:
+        """
+        Prompt'ları uzunluk kovalarına ayır ve her kovayı tek generate() çağrısıyla çöz.
+        Her kova sadece kendi en uzun prompt'una kadar pad'lenir (max_length=256'ya değil).
+        deadlines verilirse süresi dolan satırların çözümü kesilir; tamamı dolmuş kova hiç çalışmaz.
+        (çıktılar, ortalama token olasılıkları) döner; olasılıklar sadece score=True ise hesaplanır, yoksa None.
+        """
+        deadlines = deadlines or [None] * len(input_texts)
+        with stage(f"{name}.tokenize"):
+            lengths = [
+                len(ids) for ids in tokenizer(input_texts, max_length=256, truncation=True)['input_ids']
             ]
-            input_text = random.choice(prompt_variants)
+        predictions = [None] * len(input_texts)
+        sequence_probs = [None] * len(input_texts)
+        
+        for indices in bucket_by_length(lengths):
+            bucket_deadlines = [deadlines[i] for i in indices]
+            if all(is_expired(deadline) for deadline in bucket_deadlines):
+                for i in indices:
+                    predictions[i] = ""
+                continue
+            
+            criteria = StoppingCriteriaList()
+            if any(deadline is not None for deadline in bucket_deadlines):
+                criteria.append(DeadlineCriteria(bucket_deadlines))
+            if self.early_stop:
+                criteria.append(LabelCompleteCriteria(tokenizer, self.label_map))
             
-            inputs = self.mbart_tokenizer(
-                input_text,
-                max_length=256,
-                padding='max_length',
-                truncation=True,
-                return_tensors='pt'
-            ).to(self.device)
+            with stage(f"{name}.tokenize"):
+                inputs = tokenizer(
+                    [input_texts[i] for i in indices],
+                    max_length=256,
+                    padding='longest',
+                    truncation=True,
+                    return_tensors='pt'
+                ).to(self.device)
             
-            # UNIQUE generation parametreleri
-            with torch.no_grad():
-                outputs = self.mbart_model.generate(
+            recorder = SequenceLogProb(tokenizer.pad_token_id, tokenizer.eos_token_id) if score else None
+            with stage(f"{name}.generate"), torch.no_grad():
+                outputs = model.generate(
                     input_ids=inputs['input_ids'],
                     attention_mask=inputs['attention_mask'],
-                    max_length=256,
-                    do_sample=True,  # Sampling aktif - her seferinde farklı
-                    temperature=0.8,  # Yaratıcılık
-                    top_p=0.92,  # Nucleus sampling
-                    top_k=50,  # Top-K sampling
-                    repetition_penalty=1.2,  # Tekrarları azalt
-                    no_repeat_ngram_size=3  # 3-gram tekrarı engelle
+                    stopping_criteria=criteria,
+                    logits_processor=LogitsProcessorList([recorder] if recorder is not None else []),
+                    **generation_kwargs
                 )
             
-            prediction = self.mbart_tokenizer.decode(outputs[0], skip_special_tokens=True)
-            label, feedback = self.parse_output(prediction)
-            label_code = self.get_label_code(label)
-            
-            return {
-                "model": "mBART",
-                "raw_output": prediction,
-                "label": label,
-                "label_code": label_code,
-                "feedback": feedback,
-                "confidence": 85
-            }
-        except Exception as e:
-            logger.error(f"mBART prediction error: {e}")
-            return None
+            with stage(f"{name}.decode"):
+                decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            probs = recorder.finish(outputs) if recorder is not None else [None] * len(indices)
+            for i, prediction, prob in zip(indices, decoded, probs):
+                predictions[i] = prediction
+                sequence_probs[i] = prob
+        
+        return predictions, sequence_probs
     
-    def predict_with_mt5(self, question: str, student_answer: str, correct_answer: str) -> dict:
-        """MT5 ile tahmin - Her seferinde UNIQUE çıktı"""
-        if not self.mt5_model:
-            return None
+    def _score_labels_batch(self, model, tokenizer, input_texts: list, name: str = "model") -> list:
+        """
+        Etiket skorlama - dört aday etiket ("Etiket: <label>") decoder'a teacher forcing ile verilir.
+        Encoder her prompt için bir kez çalışır, dört aday tek forward pass'te skorlanır; otoregresif döngü yoktur.
+        Her prompt için {label: olasılık} döner.
+        """
+        candidates = [
+            tokenizer(f"Etiket: {label}", add_special_tokens=False)['input_ids'] for label in self.label_map
+        ]
         
-        try:
-            # MT5 için farklı prompt varyasyonları
-            prompt_variants = [
-                f"Soru: {question}\nCevap: {student_answer}\nDoğru: {correct_answer}\nPuanla ve yorum yap:",
-                f"Öğrenci Değerlendirme:\nSoru: {question}\nVerilen Cevap: {student_answer}\nBeklenen: {correct_answer}",
-                f"Quiz Analizi:\n'{question}' sorusuna '{student_answer}' cevabı verildi. Doğrusu '{correct_answer}'. Değerlendir:",
-                f"Akademik Değerlendirme:\nSoru: {question}\nÖğrencinin Yorumu: {student_answer}\nStandart Cevap: {correct_answer}\nFeedback:",
+        # generate() ile aynı decoder başlangıcı: decoder_start_token (+ varsa zorunlu BOS)
+        prefix = [model.config.decoder_start_token_id]
+        forced_bos = getattr(model.generation_config, 'forced_bos_token_id', None)
+        if forced_bos is not None:
+            prefix.append(forced_bos)
+        
+        # Decoder girdisi = dizinin son tokeni hariç, hedef = bir sağa kaydırılmış hali;
+        # sadece etiket tokenleri skora katılır
+        sequences = [prefix + candidate for candidate in candidates]
+        width = max(len(sequence) for sequence in sequences) - 1
+        pad_id = model.config.pad_token_id if model.config.pad_token_id is not None else 0
+        decoder_input_ids = torch.full((len(candidates), width), pad_id, dtype=torch.long)
+        target_ids = torch.zeros((len(candidates), width), dtype=torch.long)
+        target_mask = torch.zeros((len(candidates), width))
+        for c, sequence in enumerate(sequences):
+            length = len(sequence) - 1
+            decoder_input_ids[c, :length] = torch.tensor(sequence[:-1])
+            target_ids[c, :length] = torch.tensor(sequence[1:])
+            target_mask[c, len(prefix) - 1:length] = 1
+        
+        num_labels = len(candidates)
+        label_probs = [None] * len(input_texts)
+        with stage(f"{name}.tokenize"):
+            lengths = [
+                len(ids) for ids in tokenizer(input_texts, max_length=256, truncation=True)['input_ids']
             ]
-            input_text = random.choice(prompt_variants)
-            
-            inputs = self.mt5_tokenizer(
-                input_text,
-                max_length=256,
-                padding='max_length',
-                truncation=True,
-                return_tensors='pt'
-            ).to(self.device)
+        
+        for indices in bucket_by_length(lengths):
+            with stage(f"{name}.tokenize"):
+                inputs = tokenizer(
+                    [input_texts[i] for i in indices],
+                    max_length=256,
+                    padding='longest',
+                    truncation=True,
+                    return_tensors='pt'
+                ).to(self.device)
+            batch_size = len(indices)
             
-            # UNIQUE generation parametreleri - MT5 için biraz daha yaratıcı
-            with torch.no_grad():
-                outputs = self.mt5_model.generate(
+            with stage(f"{name}.score"), torch.no_grad():
+                encoder_outputs = model.get_encoder()(
                     input_ids=inputs['input_ids'],
-                    attention_mask=inputs['attention_mask'],
-                    max_length=256,
-                    do_sample=True,  # Sampling aktif
-                    temperature=0.85,  # MT5 için biraz daha yaratıcı
-                    top_p=0.9,  # Nucleus sampling
-                    top_k=40,  # Top-K sampling
-                    repetition_penalty=1.3,  # Tekrarları daha fazla azalt
-                    no_repeat_ngram_size=3  # 3-gram tekrarı engelle
+                    attention_mask=inputs['attention_mask']
                 )
+                # Her prompt dört aday etiketle eşleşir: (batch * etiket) satır
+                hidden = encoder_outputs.last_hidden_state.repeat_interleave(num_labels, dim=0)
+                outputs = model(
+                    encoder_outputs=BaseModelOutput(last_hidden_state=hidden),
+                    attention_mask=inputs['attention_mask'].repeat_interleave(num_labels, dim=0),
+                    decoder_input_ids=decoder_input_ids.repeat(batch_size, 1).to(self.device)
+                )
+                log_probs = torch.log_softmax(outputs.logits.float(), dim=-1)
+                token_log_probs = log_probs.gather(
+                    -1, target_ids.repeat(batch_size, 1).to(self.device).unsqueeze(-1)
+                ).squeeze(-1)
+                sequence_scores = (token_log_probs * target_mask.repeat(batch_size, 1).to(self.device)).sum(-1)
+                probs = torch.softmax(sequence_scores.view(batch_size, num_labels), dim=-1).cpu()
             
-            prediction = self.mt5_tokenizer.decode(outputs[0], skip_special_tokens=True)
-            label, feedback = self.parse_output(prediction)
-            label_code = self.get_label_code(label)
+            for i, row in zip(indices, probs.tolist()):
+                label_probs[i] = dict(zip(self.label_map, row))
+        
+        return label_probs
+    
+    def _build_score_result(self, model_name: str, label_probs: dict) -> dict:
+        """Etiket olasılıklarından sonuç sözlüğü oluştur - güven en olası etiketin olasılığıdır"""
+        label = max(label_probs, key=label_probs.get)
+        
+        return {
+            "model": model_name,
+            "raw_output": "",
+            "label": label,
+            "label_code": self.get_label_code(label),
+            "feedback": "",
+            "confidence": round(label_probs[label] * 100, 1),
+            "label_probs": {lbl: round(p, 4) for lbl, p in label_probs.items()}
+        }
+    
+    def _build_model_result(self, model_name: str, prediction: str, confidence: int, sequence_prob: float = None) -> dict:
+        """Ham model çıktısından sonuç sözlüğü oluştur - sequence_prob: üretimin ortalama token olasılığı (kademeli mod)"""
+        label, feedback = self.parse_output(prediction)
+        label_code = self.get_label_code(label)
+        
+        result = {
+            "model": model_name,
+            "raw_output": prediction,
+            "label": label,
+            "label_code": label_code,
+            "feedback": feedback,
+            "confidence": confidence
+        }
+        if sequence_prob is not None:
+            result["sequence_prob"] = round(sequence_prob, 4)
+        return result
+    
+    def predict_batch_with_mbart(self, items: list, deadlines: list = None) -> list:
+        """mBART ile toplu tahmin - (soru, öğrenci cevabı, doğru cevap) listesi için tek generate()"""
+        # Lazy modda model burada yüklenir; blok bitene kadar boşta kalma nedeniyle atılmaz
+        with self.residency.acquire("mbart") as loaded:
+            if loaded is None:
+                return [None] * len(items)
+            tokenizer, model = loaded
             
-            return {
-                "model": "MT5",
-                "raw_output": prediction,
-                "label": label,
-                "label_code": label_code,
-                "feedback": feedback,
-                "confidence": 82
-            }
-        except Exception as e:
-            logger.error(f"MT5 prediction error: {e}")
-            return None
+            try:
+                input_texts = [self._build_mbart_prompt(*item) for item in items]
+                
+                if self.inference_mode == "score":
+                    return [
+                        self._build_score_result("mBART", probs)
+                        for probs in self._score_labels_batch(model, tokenizer, input_texts, name="mbart")
+                    ]
+                
+                # UNIQUE generation parametreleri
+                predictions, sequence_probs = self._generate_batch(model, tokenizer, input_texts, {
+                    "max_length": 256,
+                    "do_sample": True,  # Sampling aktif - her seferinde farklı
+                    "temperature": 0.8,  # Yaratıcılık
+                    "top_p": 0.92,  # Nucleus sampling
+                    "top_k": 50,  # Top-K sampling
+                    "repetition_penalty": 1.2,  # Tekrarları azalt
+                    "no_repeat_ngram_size": 3  # 3-gram tekrarı engelle
+                }, name="mbart", deadlines=deadlines, score=self.consensus_mode == "cascade")
+                
+                with stage("mbart.parse"):
+                    return [
+                        self._build_model_result("mBART", prediction, 85, prob)
+                        for prediction, prob in zip(predictions, sequence_probs)
+                    ]
+            except Exception as e:
+                logger.error(f"mBART prediction error: {e}")
+                return [None] * len(items)
+    
+    def predict_batch_with_mt5(self, items: list, deadlines: list = None) -> list:
+        """MT5 ile toplu tahmin - (soru, öğrenci cevabı, doğru cevap) listesi için tek generate()"""
+        # Lazy modda model burada yüklenir; blok bitene kadar boşta kalma nedeniyle atılmaz
+        with self.residency.acquire("mt5") as loaded:
+            if loaded is None:
+                return [None] * len(items)
+            tokenizer, model = loaded
+            
+            try:
+                input_texts = [self._build_mt5_prompt(*item) for item in items]
+                
+                if self.inference_mode == "score":
+                    return [
+                        self._build_score_result("MT5", probs)
+                        for probs in self._score_labels_batch(model, tokenizer, input_texts, name="mt5")
+                    ]
+                
+                # UNIQUE generation parametreleri - MT5 için biraz daha yaratıcı
+                predictions, sequence_probs = self._generate_batch(model, tokenizer, input_texts, {
+                    "max_length": 256,
+                    "do_sample": True,  # Sampling aktif
+                    "temperature": 0.85,  # MT5 için biraz daha yaratıcı
+                    "top_p": 0.9,  # Nucleus sampling
+                    "top_k": 40,  # Top-K sampling
+                    "repetition_penalty": 1.3,  # Tekrarları daha fazla azalt
+                    "no_repeat_ngram_size": 3  # 3-gram tekrarı engelle
+                }, name="mt5", deadlines=deadlines, score=self.consensus_mode == "cascade")
+                
+                with stage("mt5.parse"):
+                    return [
+                        self._build_model_result("MT5", prediction, 82, prob)
+                        for prediction, prob in zip(predictions, sequence_probs)
+                    ]
+            except Exception as e:
+                logger.error(f"MT5 prediction error: {e}")
+                return [None] * len(items)
+    
+    def predict_with_mbart(self, question: str, student_answer: str, correct_answer: str) -> dict:
+        """mBART ile tahmin - Her seferinde UNIQUE çıktı"""
+        return self.predict_batch_with_mbart([(question, student_answer, correct_answer)])[0]
+    
+    def predict_with_mt5(self, question: str, student_answer: str, correct_answer: str) -> dict:
+        """MT5 ile tahmin - Her seferinde UNIQUE çıktı"""
+        return self.predict_batch_with_mt5([(question, student_answer, correct_answer)])[0]
     
     def get_label_code(self, label: str) -> int:
         """Label'ı sayısal koda çevir"""
@@ -328,6 +723,20 @@ class UnifiedInference:
                 "confidence": mbart_result['confidence'] / 100
             }
         
+        # Skor modunda gerçek etiket olasılıkları var - dağılımların ortalaması alınır
+        if mbart_result.get('label_probs') and mt5_result.get('label_probs'):
+            avg_probs = {
+                label: (mbart_result['label_probs'][label] + mt5_result['label_probs'][label]) / 2
+                for label in self.label_map
+            }
+            final_label = max(avg_probs, key=avg_probs.get)
+            return {
+                "final_label": final_label,
+                "final_feedback": mbart_result['feedback'] or mt5_result['feedback'],
+                "confidence": round(avg_probs[final_label], 4),
+                "label_probs": {label: round(p, 4) for label, p in avg_probs.items()}
+            }
+        
         # Her iki model de çalışıyorsa - konsensüs
         mbart_score = label_scores.get(mbart_result['label'], 0)
         mt5_score = label_scores.get(mt5_result['label'], 0)
@@ -354,104 +763,686 @@ class UnifiedInference:
             "confidence": confidence
         }
     
-    def analyze(self, question: str, student_answer: str, correct_answer: str, student_confidence: int = None, topic: str = None) -> dict:
-        """Ana analiz fonksiyonu"""
-        try:
-            logger.info(f"📝 Analiz başlıyor...")
-            logger.info(f"Soru: {question[:50]}...")
-            logger.info(f"Öğrenci: {student_answer[:50]}...")
-            
-            mbart_result = self.predict_with_mbart(question, student_answer, correct_answer)
-            mt5_result = self.predict_with_mt5(question, student_answer, correct_answer)
-            
+    def _build_analysis_result(self, request: dict, mbart_result: dict, mt5_result: dict,
+                               consensus: dict = None, cached: bool = False, path: str = "consensus") -> dict:
+        """İki modelin sonucundan tek bir istek için yanıt oluştur"""
+        student_answer = request.get('student_answer', '')
+        correct_answer = request.get('correct_answer', '')
+        
+        if consensus is None:
             consensus = self.get_consensus_result(mbart_result, mt5_result)
+        
+        # Özel feedback - konuyu ve güven skorunu içeren
+        personalized_feedback = self.create_personalized_feedback(
+            consensus['final_label'],
+            student_answer,
+            correct_answer,
+            request.get('student_confidence'),
+            request.get('topic'),
+            request.get('question', '')
+        )
+        
+        agent_result = {
+            "chosen_model": "mBART + MT5 Consensus",
+            "label": consensus['final_label'],
+            "feedback": personalized_feedback,
+            "confidence": consensus['confidence'],
+            "reasoning": f"mBART ve MT5 modellerinin ortak kararı. İki model birlikte '{consensus['final_label']}' sonucuna vardı."
+        }
+        
+        missing_result = {"label": "Analiz başarısız", "label_code": 0, "feedback": "Model yüklenmedi", "confidence": 0}
+        skipped_result = missing_result
+        if path.startswith("cascade:") and path != "cascade:escalated":
+            # Kademeli mod - ilk modelin kararı yeterince netti, ikinci model çalıştırılmadı
+            first_name = "mBART" if path == "cascade:mbart" else "MT5"
+            skipped_result = {"label": "Atlandı", "label_code": 0, "feedback": "Kademeli modda gerek duyulmadı", "confidence": 0}
+            agent_result.update({
+                "chosen_model": f"{first_name} (Cascade)",
+                "reasoning": f"{first_name} kararı yeterince net olduğu için ikinci model çalıştırılmadı: '{consensus['final_label']}'."
+            })
+        
+        return {
+            "success": True,
+            "models": {
+                "mbart": mbart_result if mbart_result else skipped_result,
+                "mt5": mt5_result if mt5_result else skipped_result,
+                "agent": agent_result
+            },
+            "consensus": consensus,
+            "label": consensus['final_label'],
+            "feedback": personalized_feedback,
+            "confidence": consensus['confidence'],
+            "cached": cached,
+            "path": path
+        }
+    
+    def _build_fast_path_result(self, request: dict, decision: dict, path: str = "lexical") -> dict:
+        """Sözcüksel ya da soru bankası kararından yanıt oluştur - modeller çalıştırılmaz"""
+        label = decision['label']
+        source = "Question Bank" if path == "answer_index" else "Lexical"
+        fast_result = {
+            "model": source,
+            "label": label,
+            "label_code": self.get_label_code(label),
+            "feedback": f"Sözcüksel ön değerlendirme ({decision['method']})",
+            "confidence": round(decision['confidence'] * 100),
+            "scores": decision['scores']
+        }
+        consensus = {
+            "final_label": label,
+            "final_feedback": fast_result['feedback'],
+            "confidence": decision['confidence']
+        }
+        
+        result = self._build_analysis_result(request, fast_result, fast_result, consensus)
+        if path == "answer_index":
+            reasoning = f"Cevap soru bankasındaki kabul edilen '{decision['scores']['matched']}' varyantıyla eşleşti."
+        else:
+            reasoning = f"Cevap sözcüksel olarak açık ({decision['method']}), modeller çalıştırılmadan '{label}' kararı verildi."
+        result['models']['agent'].update({
+            "chosen_model": f"{source} Fast Path",
+            "reasoning": reasoning
+        })
+        result['path'] = path
+        return result
+    
+    def _apply_question_bank(self, request: dict) -> tuple:
+        """
+        question_id varsa soru bankasından eksik alanları doldur.
+        (doldurulmuş istek, eşleşen kabul edilen varyant ya da None) döner.
+        """
+        if self.answer_index is None or request.get('question_id') is None:
+            return request, None
+        
+        bank_question = self.answer_index.get_question(request['question_id'])
+        if bank_question is None:
+            return request, None
+        
+        request = dict(request)
+        request['question'] = request.get('question') or bank_question['question']
+        request['correct_answer'] = request.get('correct_answer') or bank_question['correct_answer']
+        request['topic'] = request.get('topic') or bank_question['topic']
+        
+        return request, self.answer_index.lookup(request['question_id'], request.get('student_answer', ''))
+    
+    def _build_error_result(self, error: Exception) -> dict:
+        """Analiz hatası için yanıt oluştur"""
+        return {
+            "success": False,
+            "error": str(error),
+            "label": "Yanlış",
+            "feedback": "Analiz sırasında hata oluştu.",
+            "models": {
+                "mbart": {"label": "Hata", "label_code": 0, "feedback": str(error), "confidence": 0},
+                "mt5": {"label": "Hata", "label_code": 0, "feedback": str(error), "confidence": 0},
+                "agent": {"chosen_model": "None", "label": "Hata", "feedback": str(error), "confidence": 0, "reasoning": "Hata oluştu"}
+            }
+        }
+    
+    def _build_deadline_result(self) -> dict:
+        """Süresi dolmuş istek için yanıt - modeller çalıştırılmadı"""
+        return {
+            "success": False,
+            "error": "Deadline exceeded",
+            "deadline_exceeded": True
+        }
+    
+    def _is_confident(self, result: dict) -> bool:
+        """Kademeli mod için: tek modelin kararı ikinci modele gerek bırakmayacak kadar net mi?"""
+        if not result:
+            return False
+        
+        # Skor modunda gerçek olasılık var
+        if result.get('label_probs'):
+            return max(result['label_probs'].values()) >= self.cascade_threshold
+        
+        # Üretim modunda sabit "confidence" (85/82) değil, üretimin ortalama token olasılığı kullanılır;
+        # etiket de açıkça "Etiket: <label>" olarak yazılmış olmalı
+        output = result.get('raw_output', '')
+        if "Etiket:" not in output or result.get('sequence_prob') is None:
+            return False
+        label_part = output.split("Geri Bildirim:")[0].lower()
+        return result['label'].lower() in label_part and result['sequence_prob'] >= self.cascade_threshold
+    
+    def _run_cascade(self, items: list, deadlines: list) -> tuple:
+        """
+        Kademeli mod - önce birinci model çalışır; kararı net olan cevaplar için ikinci model çalıştırılmaz.
+        (mbart sonuçları, mt5 sonuçları, her öğe için izlenen yol) döner.
+        """
+        predictors = {"mbart": self.predict_batch_with_mbart, "mt5": self.predict_batch_with_mt5}
+        first = self.cascade_first
+        second = "mt5" if first == "mbart" else "mbart"
+        
+        first_results = predictors[first](items, deadlines)
+        second_results = [None] * len(items)
+        paths = [f"cascade:{first}"] * len(items)
+        
+        # Süresi dolan cevaplar ikinci modele aktarılmaz, ilk modelin kararıyla döner
+        escalate = [
+            i for i, result in enumerate(first_results)
+            if not self._is_confident(result) and not is_expired(deadlines[i])
+        ]
+        if escalate:
+            logger.info(f"🔀 Kademeli mod: {len(escalate)}/{len(items)} cevap {second} modeline aktarılıyor")
+            second_batch = predictors[second]([items[i] for i in escalate], [deadlines[i] for i in escalate])
+            for i, result in zip(escalate, second_batch):
+                second_results[i] = result
+                paths[i] = "cascade:escalated"
+        
+        if first == "mbart":
+            return first_results, second_results, paths
+        return second_results, first_results, paths
+    
+    def _run_models(self, items: list, deadlines: list = None) -> tuple:
+        """Modelleri aynı batch üzerinde çalıştır - (mbart sonuçları, mt5 sonuçları, yollar) döner"""
+        deadlines = deadlines or [None] * len(items)
+        # Yüklenemeyen model yoksa iki model de kullanılabilir (lazy modda henüz yüklenmemiş olabilirler)
+        both = self.residency.available("mbart") and self.residency.available("mt5")
+        if self.consensus_mode == "cascade" and both:
+            return self._run_cascade(items, deadlines)
+        
+        paths = ["consensus"] * len(items)
+        if self.concurrent and both:
+            # İki model paralel - gecikme iki decode süresinin toplamı değil, uzun olanı
+            # Aşama zamanlayıcısı executor thread'lerine context kopyasıyla taşınır
+            executor = self._get_executor()
+            mbart_future = executor.submit(contextvars.copy_context().run, self.predict_batch_with_mbart, items, deadlines)
+            mt5_future = executor.submit(contextvars.copy_context().run, self.predict_batch_with_mt5, items, deadlines)
+            return mbart_future.result(), mt5_future.result(), paths
+        
+        return self.predict_batch_with_mbart(items, deadlines), self.predict_batch_with_mt5(items, deadlines), paths
+    
+    def analyze_batch(self, requests: list, on_ready=None) -> list:
+        """
+        Toplu analiz - her model için tüm batch tek generate() ile çalışır, sonuçlar sırayla döner.
+        Aşama süreleri ölçülür; timings açıksa (istek ya da sunucu düzeyinde) yanıta eklenir.
+        Süreler batch geneline aittir, aynı batch'teki yanıtlar aynı değerleri taşır.
+        on_ready(i, result): verilirse modelsiz biten sonuçlar (soru bankası, sözcüksel karar, önbellek,
+        süresi dolan) modeller çalışmadan önce bildirilir; bunların süreleri o ana kadarki aşamaları taşır.
+        """
+        if not requests:
+            return []
+        
+        started = time.perf_counter()
+        finished = set()
+        
+        def finish(i, result):
+            REGISTRY.inc("requests_total", 1, "Değerlendirilen istekler", path=result.get('path', 'error'))
+            if not result.get('success'):
+                REGISTRY.inc("errors_total", 1, "Hata ile sonuçlanan istekler")
+            if self.timings or requests[i].get('timings'):
+                result['timings'] = {**timer.as_dict(), "batch_size": len(requests)}
+            finished.add(i)
+        
+        def ready(i, result):
+            finish(i, result)
+            on_ready(i, result)
+        
+        with StageTimer() as timer:
+            results = self._analyze_batch(requests, ready if on_ready is not None else None)
+        
+        REGISTRY.observe("batch_duration_seconds", time.perf_counter() - started, "analyze_batch süresi (saniye)")
+        for i, result in enumerate(results):
+            if i not in finished:
+                finish(i, result)
+        
+        return results
+    
+    def _analyze_batch(self, requests: list, on_ready=None) -> list:
+        results = [None] * len(requests)
+        
+        # Önbellek kontrolü - aynı normalize üçlü batch içinde de tek sefer çalışır
+        pending = {}  # önbellek anahtarı -> istek indeksleri
+        requests = list(requests)
+        for i, request in enumerate(requests):
+            # Kuyrukta beklerken süresi dolan istek hiç çalıştırılmaz - istemci artık beklemiyor
+            if is_expired(request.get('deadline')):
+                results[i] = self._build_deadline_result()
+                REGISTRY.inc("deadline_dropped_total", 1, "Çalıştırılmadan süresi dolan istekler")
+                continue
             
-            # Özel feedback - konuyu ve güven skorunu içeren
-            personalized_feedback = self.create_personalized_feedback(
-                consensus['final_label'],
-                student_answer,
-                correct_answer,
-                student_confidence,
-                topic,
-                question
-            )
+            # Soru bankası - kabul edilen varyantlar modelsiz, O(1) değerlendirilir
+            with stage("question_bank"):
+                request, matched = self._apply_question_bank(request)
+            requests[i] = request
+            if matched is not None:
+                results[i] = self._build_fast_path_result(request, {
+                    "label": "Tam Doğru",
+                    "confidence": 1.0,
+                    "method": "question_bank",
+                    "scores": {"matched": matched}
+                }, path="answer_index")
+                logger.info(f"⚡ Soru bankasından: '{matched}'")
+                continue
             
-            agent_result = {
-                "chosen_model": "mBART + MT5 Consensus",
-                "label": consensus['final_label'],
-                "feedback": personalized_feedback,
-                "confidence": consensus['confidence'],
-                "reasoning": f"mBART ve MT5 modellerinin ortak kararı. İki model birlikte '{consensus['final_label']}' sonucuna vardı."
-            }
+            # Sözcüksel ön değerlendirme - açık durumlar modelleri hiç çalıştırmaz
+            if self.lexical_fast_path:
+                with stage("lexical"):
+                    decision = lexical_grade(
+                        request.get('student_answer', ''),
+                        request.get('correct_answer', ''),
+                        self.similarity_threshold
+                    )
+                if decision:
+                    results[i] = self._build_fast_path_result(request, decision)
+                    logger.info(f"⚡ Sözcüksel karar ({decision['method']}): {decision['label']}")
+                    continue
             
-            result = {
-                "success": True,
-                "models": {
-                    "mbart": mbart_result if mbart_result else {"label": "Analiz başarısız", "label_code": 0, "feedback": "Model yüklenmedi", "confidence": 0},
-                    "mt5": mt5_result if mt5_result else {"label": "Analiz başarısız", "label_code": 0, "feedback": "Model yüklenmedi", "confidence": 0},
-                    "agent": agent_result
-                },
-                "consensus": consensus,
-                "label": consensus['final_label'],
-                "feedback": personalized_feedback,
-                "confidence": consensus['confidence']
-            }
+            with stage("cache_lookup"):
+                key = grading_key(
+                    request.get('question', ''),
+                    request.get('student_answer', ''),
+                    request.get('correct_answer', '')
+                )
+                cached = self.result_cache.get(key) if self.result_cache is not None else None
+            if cached is not None:
+                results[i] = self._build_analysis_result(
+                    request, cached['mbart'], cached['mt5'], cached['consensus'], cached=True, path=cached['path']
+                )
+                logger.info(f"⚡ Önbellekten: {cached['consensus']['final_label']}")
+            else:
+                pending.setdefault(key, []).append(i)
+        
+        if not pending:
+            return results
+        
+        # Modelleri bekleyen istekler varken hazır olanlar beklemesin
+        if on_ready is not None:
+            for i, result in enumerate(results):
+                if result is not None:
+                    on_ready(i, result)
+        
+        keys = list(pending)
+        try:
+            logger.info(f"📝 Toplu analiz başlıyor: {len(keys)} istek")
             
-            logger.info(f"✅ Analiz tamamlandı: {consensus['final_label']}")
-            return result
+            items = []
+            deadlines = []
+            for key in keys:
+                request = requests[pending[key][0]]
+                items.append((request.get('question', ''), request.get('student_answer', ''), request.get('correct_answer', '')))
+                # Aynı cevabı bekleyen isteklerin en geç süre sınırı
+                deadlines.append(latest_deadline([requests[i].get('deadline') for i in pending[key]]))
             
+            mbart_results, mt5_results, paths = self._run_models(items, deadlines)
         except Exception as e:
             logger.error(f"❌ Analiz hatası: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "label": "Yanlış",
-                "feedback": "Analiz sırasında hata oluştu.",
-                "models": {
-                    "mbart": {"label": "Hata", "label_code": 0, "feedback": str(e), "confidence": 0},
-                    "mt5": {"label": "Hata", "label_code": 0, "feedback": str(e), "confidence": 0},
-                    "agent": {"chosen_model": "None", "label": "Hata", "feedback": str(e), "confidence": 0, "reasoning": "Hata oluştu"}
-                }
-            }
+            for indices in pending.values():
+                for i in indices:
+                    results[i] = self._build_error_result(e)
+            return results
+        
+        for key, mbart_result, mt5_result, path, deadline in zip(keys, mbart_results, mt5_results, paths, deadlines):
+            with stage("consensus"):
+                consensus = self.get_consensus_result(mbart_result, mt5_result)
+            
+            # Sadece en az bir model çalıştıysa önbelleğe al - süre sınırıyla kesilen çıktılar alınmaz
+            expired = is_expired(deadline)
+            if expired:
+                REGISTRY.inc("deadline_truncated_total", 1, "Süre sınırı nedeniyle kesilen çözümler")
+            if self.result_cache is not None and (mbart_result or mt5_result) and not expired:
+                self.result_cache.put(key, {"mbart": mbart_result, "mt5": mt5_result, "consensus": consensus, "path": path})
+            
+            for i in pending[key]:
+                try:
+                    results[i] = self._build_analysis_result(requests[i], mbart_result, mt5_result, consensus, path=path)
+                    if expired:
+                        results[i]['deadline_exceeded'] = True
+                    logger.info(f"✅ Analiz tamamlandı: {results[i]['label']}")
+                except Exception as e:
+                    logger.error(f"❌ Analiz hatası: {e}")
+                    results[i] = self._build_error_result(e)
+        
+        return results
+    
+    def get_stats(self) -> dict:
+        """Çalışma zamanı istatistikleri"""
+        return {
+            "cache": self.result_cache.stats() if self.result_cache is not None else None,
+            "answer_index": self.answer_index.stats() if self.answer_index is not None else None,
+            "models": self.residency.stats(),
+            "metrics": REGISTRY.snapshot()
+        }
+    
+    def _collect_metrics(self) -> list:
+        """Prometheus dökümü için önbellek ve soru bankası sayaçları"""
+        samples = [("models_loaded", "gauge", "Yüklü modeller", int(model is not None), {"model": name})
+                   for name, model in (("mbart", self.mbart_model), ("mt5", self.mt5_model))]
+        samples += [("model_memory_megabytes", "gauge", "Modelin bellekteki ağırlık boyutu (MB)", memory, {"model": name})
+                    for name, memory in self.model_memory.items() if memory is not None]
+        rss = process_rss_mb()
+        if rss is not None:
+            samples.append(("resident_memory_megabytes", "gauge", "Sürecin RSS değeri (MB)", rss, {}))
+        if self.result_cache is not None:
+            cache = self.result_cache.stats()
+            samples += [
+                ("cache_hits_total", "counter", "Sonuç önbelleği isabetleri", cache["hits"], {}),
+                ("cache_misses_total", "counter", "Sonuç önbelleği ıskaları", cache["misses"], {}),
+                ("cache_evictions_total", "counter", "Önbellekten çıkarılan kayıtlar", cache["evictions"], {}),
+                ("cache_size", "gauge", "Önbellekteki kayıtlar", cache["size"], {}),
+            ]
+        if self.answer_index is not None:
+            index = self.answer_index.stats()
+            samples += [
+                ("answer_index_hits_total", "counter", "Soru bankası isabetleri", index["hits"], {}),
+                ("answer_index_misses_total", "counter", "Soru bankası ıskaları", index["misses"], {}),
+            ]
+        return samples
+    
+    def analyze(self, question: str, student_answer: str, correct_answer: str, student_confidence: int = None, topic: str = None) -> dict:
+        """Ana analiz fonksiyonu"""
+        logger.info(f"📝 Analiz başlıyor...")
+        logger.info(f"Soru: {question[:50]}...")
+        logger.info(f"Öğrenci: {student_answer[:50]}...")
+        
+        return self.analyze_batch([{
+            "question": question,
+            "student_answer": student_answer,
+            "correct_answer": correct_answer,
+            "student_confidence": student_confidence,
+            "topic": topic
+        }])[0]
 
-def main():
-    """Ana fonksiyon - stdin'den JSON al, stdout'a JSON yaz"""
+def read_batches(stream, max_batch_size: int, max_wait_ms: float):
+    """
+    Satırları mikro-batch'ler halinde topla.
+    İlk satır geldikten sonra en fazla max_batch_size satır ya da max_wait_ms süre beklenir.
+    (satırlar, satırların okunduğu monotonic zamanlar) döner - deadline_ms bütçeleri okunma anından sayılır.
+    """
+    lines = queue.Queue()
     
-    inferencer = UnifiedInference()
-    inferencer.load_models()
+    def reader():
+        for line in stream:
+            line = line.strip()
+            if line:
+                lines.put((line, time.monotonic()))
+        lines.put(None)  # Akış bitti
     
-    logger.info("🎧 İstekler bekleniyor (stdin)...")
+    threading.Thread(target=reader, daemon=True).start()
     
-    for line in sys.stdin:
+    finished = False
+    while not finished:
+        item = lines.get()
+        if item is None:
+            return
+        
+        batch = [item]
+        deadline = time.monotonic() + max_wait_ms / 1000
+        while len(batch) < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = lines.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                finished = True
+                break
+            batch.append(item)
+        
+        REGISTRY.set("queue_depth", lines.qsize(), "Batch'e alınmayı bekleyen satırlar")
+        REGISTRY.observe("batch_size", len(batch), "Batch başına satır", buckets=(1, 2, 4, 8, 16, 32, 64))
+        yield [line for line, _ in batch], [received_at for _, received_at in batch]
+
+def build_request(data: dict, received_at: float = None) -> dict:
+    """
+    JSON istek nesnesinden analyze_batch isteği oluştur.
+    Opsiyonel süre sınırı: "deadline_ms" (received_at'ten itibaren bütçe) ya da "deadline" (Unix zamanı, saniye).
+    """
+    return {
+        "question": data.get('question', ''),
+        "student_answer": data.get('student_answer', ''),
+        "correct_answer": data.get('correct_answer', ''),
+        "student_confidence": data.get('student_confidence', None),
+        "topic": data.get('topic', None),
+        "question_id": data.get('question_id', None),
+        "timings": bool(data.get('timings', False)),
+        "deadline": parse_deadline(data, received_at)
+    }
+
+def handle_batch(inferencer: UnifiedInference, lines: list, received_at: list = None, emit_ready=None) -> list:
+    """
+    Bir batch JSON satırını işle - yanıtlar gelen sırayla döner.
+    İstekteki opsiyonel "id" alanı yanıta aynen geri eklenir.
+    received_at: satırların okunma zamanları (time.monotonic), deadline_ms bütçeleri buradan sayılır.
+    emit_ready(response): verilirse ve batch'teki her satır id taşıyorsa modelsiz biten yanıtlar
+    (hatalı satır, soru bankası, sözcüksel karar, önbellek) modelleri beklemeden yazılır; bunların
+    listedeki yeri None olur. id'siz satır içeren batch'ler sırayı korur.
+    """
+    received_at = received_at or [None] * len(lines)
+    responses = [None] * len(lines)
+    request_ids = [None] * len(lines)
+    requests = []
+    positions = []
+    commands = []
+    
+    for i, line in enumerate(lines):
         try:
-            line = line.strip()
-            if not line:
+            with stage("parse_request"):
+                data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("İstek bir JSON nesnesi olmalı")
+            request_ids[i] = data.get('id')
+            if data.get('command') in ('stats', 'metrics', 'preload', 'unload'):
+                commands.append((i, data))  # Batch işlendikten sonra yanıtlanır
                 continue
-                
-            data = json.loads(line)
-            question = data.get('question', '')
-            student_answer = data.get('student_answer', '')
-            correct_answer = data.get('correct_answer', '')
-            student_confidence = data.get('student_confidence', None)  # Yeni
-            topic = data.get('topic', None)  # Yeni
-            
-            result = inferencer.analyze(question, student_answer, correct_answer, student_confidence, topic)
-            
-            print(json.dumps(result, ensure_ascii=False), flush=True)
-                
+            requests.append(build_request(data, received_at[i]))
+            positions.append(i)
         except json.JSONDecodeError as e:
             logger.error(f"JSON parse hatası: {e}")
-            print(json.dumps({
+            responses[i] = {
                 "success": False,
                 "error": f"Invalid JSON: {e}"
-            }), flush=True)
+            }
         except Exception as e:
             logger.error(f"İşlem hatası: {e}")
-            print(json.dumps({
+            responses[i] = {
                 "success": False,
                 "error": str(e)
-            }), flush=True)
+            }
+    
+    early = set()  # Erken yazılan yanıtların satır indeksleri
+    ready = None
+    if emit_ready is not None and all(request_id is not None for request_id in request_ids):
+        def ready(i, response):
+            emit_ready({"id": request_ids[i], **response})
+            early.add(i)
+        
+        # Hatalı satırlar hemen yanıtlanır
+        for i, response in enumerate(responses):
+            if response is not None:
+                ready(i, response)
+    
+    if requests:
+        try:
+            results = inferencer.analyze_batch(
+                requests, (lambda j, result: ready(positions[j], result)) if ready is not None else None
+            )
+        except Exception as e:
+            logger.error(f"İşlem hatası: {e}")
+            results = [{"success": False, "error": str(e)} for _ in requests]
+        for i, result in zip(positions, results):
+            responses[i] = result
+    
+    for i, data in commands:
+        command = data['command']
+        if command == 'metrics':
+            responses[i] = {"success": True, "metrics": REGISTRY.render_prometheus()}
+        elif command in ('preload', 'unload') and not isinstance(data.get('models') or [], list):
+            responses[i] = {"success": False, "error": "models bir liste olmalı"}
+        elif command == 'preload':
+            # Planlı yoğunluk öncesi ipucu - {"command": "preload", "models": ["mbart"]} (models opsiyonel)
+            responses[i] = {"success": True, "models": inferencer.preload(data.get('models'))}
+        elif command == 'unload':
+            responses[i] = {"success": True, "unloaded": inferencer.residency.unload(data.get('models'))}
+        else:
+            responses[i] = {"success": True, "stats": inferencer.get_stats()}
+    
+    for i, request_id in enumerate(request_ids):
+        if i in early:
+            responses[i] = None
+        elif request_id is not None:
+            responses[i] = {"id": request_id, **responses[i]}
+    
+    return responses
+
+def _batch_error(lines: list, error: Exception) -> list:
+    """İşçi batch'i tamamlayamadığında her satır için hata yanıtı (id'ler korunur)"""
+    responses = []
+    for line in lines:
+        response = {"success": False, "error": str(error)}
+        try:
+            data = json.loads(line)
+            if isinstance(data, dict) and data.get('id') is not None:
+                response = {"id": data['id'], **response}
+        except json.JSONDecodeError:
+            pass
+        responses.append(response)
+    return responses
+
+def _has_ids(responses: list) -> bool:
+    """Batch'teki her yanıt id taşıyorsa istemci eşleştirmeyi id ile yapar, sıra beklemeye gerek yok"""
+    return all('id' in response for response in responses)
+
+def _make_worker_setup(inferencer: UnifiedInference, threads: int, affinity: list):
+    """İşçi süreci başlangıcı - thread sayısını ve çekirdekleri sabitle, fork'la kopyalanan thread havuzunu bırak"""
+    def setup(index: int):
+        if affinity[index] is not None:
+            os.sched_setaffinity(0, affinity[index])
+        torch.set_num_threads(threads)
+        inferencer.intra_op_threads = max(1, threads // 2) if inferencer.concurrent else threads
+        inferencer._executor = None  # Thread'ler fork'tan sonra yaşamaz
+        logger.info(f"👷 İşçi {index} hazır (pid {os.getpid()}, {threads} thread, çekirdekler: {affinity[index] or 'serbest'})")
+    return setup
+
+def add_inference_arguments(parser: argparse.ArgumentParser):
+    """UnifiedInference ayarları - stdin döngüsü ve HTTP sunucusu aynı argümanları kullanır"""
+    parser.add_argument('--concurrent', action='store_true',
+                        help="mBART ve MT5'i paralel çalıştır")
+    parser.add_argument('--intra-op-threads', type=int, default=None,
+                        help="Model başına torch intra-op thread sayısı (varsayılan: eşzamanlı modda CPU/2)")
+    parser.add_argument('--cache-size', type=int, default=1024,
+                        help="Sonuç önbelleğindeki en fazla kayıt (0 = kapalı)")
+    parser.add_argument('--cache-ttl', type=float, default=3600,
+                        help="Önbellek kaydının geçerlilik süresi (saniye)")
+    parser.add_argument('--no-fast-path', action='store_true',
+                        help="Sözcüksel ön değerlendirmeyi kapat, her cevap modellere gitsin")
+    parser.add_argument('--similarity-threshold', type=float, default=0.8,
+                        help="Yazım hatası toleransı için benzerlik eşiği (0.0-1.0, 0.8 altı 0.8 sayılır)")
+    parser.add_argument('--question-bank', default=str(DEFAULT_QUESTION_BANK) if DEFAULT_QUESTION_BANK.exists() else None,
+                        help="Kabul edilen cevaplar için soru bankası (quizData.ts ya da JSON); değişince yeniden yüklenir")
+    parser.add_argument('--mode', choices=['generate', 'score'], default='generate',
+                        help="generate: serbest üretim, score: dört etiketin olasılığını tek forward pass'te hesapla")
+    parser.add_argument('--consensus', choices=['both', 'cascade'], default='both',
+                        help="both: her cevap iki modelden geçer, cascade: ikinci model sadece gerektiğinde çalışır")
+    parser.add_argument('--cascade-first', choices=['mbart', 'mt5'], default='mbart',
+                        help="Kademeli modda önce çalışacak model")
+    parser.add_argument('--cascade-threshold', type=float, default=0.6,
+                        help="Kademeli modda ilk modelin kararını kabul etmek için gereken güven (0.0-1.0): "
+                             "score modunda etiket olasılığı, generate modunda çıktının ortalama token olasılığı")
+    parser.add_argument('--backend', choices=list(BACKENDS), default='torch',
+                        help="torch: tam hassasiyet, bf16: bfloat16 ağırlıklar (yarım bellek), "
+                             "int8: dinamik INT8 kuantizasyon (CPU), onnx: ONNX Runtime")
+    parser.add_argument('--onnx-dir', default=None,
+                        help="onnx backend için export_models.py çıktı klasörü")
+    parser.add_argument('--offload-dir', default=None,
+                        help="Decoder katmanlarını bu klasöre aktar, çalışma anında diskten oku (torch/bf16, accelerate gerekir)")
+    parser.add_argument('--model-dir', default=os.environ.get('METAMIND_MODEL_DIR'),
+                        help="Yerel model klasörü (<klasör>/mbart, <klasör>/mt5), ör. "
+                             "huggingface-cli download Ozget/MetaMind_Nlp_MBART_2 --local-dir <klasör>/mbart")
+    parser.add_argument('--offline', action='store_true',
+                        help="Ağa çıkma, modelleri sadece yerel klasörden / HF önbelleğinden yükle (HF_HUB_OFFLINE=1 ile aynı)")
+    parser.add_argument('--timings', action='store_true',
+                        help="Her yanıta aşama sürelerini ekle (istek bazında \"timings\": true ile de açılır)")
+    parser.add_argument('--early-stop', action='store_true',
+                        help="Etiket ve geri bildirim cümlesi tamamlanınca çözmeyi durdur (generate modu)")
+    parser.add_argument('--lazy-load', action='store_true',
+                        help="Modelleri başlangıçta değil ilk istekte yükle ({\"command\": \"preload\"} ile önceden yüklenir)")
+    parser.add_argument('--idle-unload', type=float, default=0,
+                        help="Bu kadar saniye kullanılmayan modeli bellekten at, sonraki istekte yeniden yükle (0 = kapalı)")
+
+def create_inferencer(args) -> UnifiedInference:
+    """add_inference_arguments ile okunan argümanlardan UnifiedInference oluştur"""
+    return UnifiedInference(
+        concurrent=args.concurrent,
+        intra_op_threads=args.intra_op_threads,
+        cache_size=args.cache_size,
+        cache_ttl=args.cache_ttl,
+        lexical_fast_path=not args.no_fast_path,
+        similarity_threshold=args.similarity_threshold,
+        question_bank=args.question_bank,
+        inference_mode=args.mode,
+        consensus_mode=args.consensus,
+        cascade_first=args.cascade_first,
+        cascade_threshold=args.cascade_threshold,
+        backend=args.backend,
+        onnx_dir=args.onnx_dir,
+        offload_dir=args.offload_dir,
+        model_dir=args.model_dir,
+        offline=args.offline,
+        timings=args.timings,
+        early_stop=args.early_stop,
+        lazy_load=args.lazy_load,
+        idle_unload=args.idle_unload
+    )
+
+def main():
+    """Ana fonksiyon - stdin'den JSON al, stdout'a JSON yaz"""
+    parser = argparse.ArgumentParser(description="MetaMind unified inference (stdin/stdout JSON satırları)")
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help="Bir generate() çağrısında toplanacak en fazla istek (1 = batch yok)")
+    parser.add_argument('--batch-wait-ms', type=float, default=20,
+                        help="İlk istekten sonra batch'i doldurmak için beklenecek en uzun süre (ms)")
+    add_inference_arguments(parser)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Modeller yüklendikten sonra fork edilecek işçi süreci sayısı (ağırlıklar copy-on-write paylaşılır). "
+                             "id'li isteklerde tek süreçte sadece modelsiz biten yanıtlar öne geçer; "
+                             "farklı batch'lerin model sonuçlarının sırasız dönmesi için > 1 gerekir")
+    parser.add_argument('--worker-threads', type=int, default=None,
+                        help="İşçi başına torch thread sayısı (varsayılan: CPU / işçi sayısı)")
+    args = parser.parse_args()
+    
+    workers = args.workers
+    if workers > 1 and not fork_available():
+        logger.warning("⚠️ Bu platformda fork yok, tek süreçle devam ediliyor")
+        workers = 1
+    if workers > 1 and (args.lazy_load or args.idle_unload):
+        # İşçiler ağırlıkları fork'tan önce yüklenmiş modelden copy-on-write paylaşır
+        logger.warning("⚠️ --lazy-load / --idle-unload çok süreçli modda desteklenmiyor, kapatıldı")
+        args.lazy_load = False
+        args.idle_unload = 0
+    
+    inferencer = create_inferencer(args)
+    inferencer.load_models()
+    
+    pool = None
+    if workers > 1:
+        threads = args.worker_threads or max(1, (os.cpu_count() or workers) // workers)
+        pool = WorkerPool(
+            handler=lambda batch: handle_batch(inferencer, *batch),
+            workers=workers,
+            setup=_make_worker_setup(inferencer, threads, cpu_slices(workers, threads)),
+            error_handler=lambda batch, error: _batch_error(batch[0], error),
+            can_reorder=_has_ids
+        )
+        # Fork, stdin okuyucu thread'i başlamadan önce yapılmalı
+        pool.start()
+    
+    logger.info(f"🎧 İstekler bekleniyor (stdin) - batch: {args.batch_size}, bekleme: {args.batch_wait_ms}ms, işçi: {workers}")
+    
+    batches = read_batches(sys.stdin, max(1, args.batch_size), max(0.0, args.batch_wait_ms))
+    if pool is None:
+        for lines, received_at in batches:
+            for response in handle_batch(inferencer, lines, received_at, emit):
+                if response is not None:
+                    emit(response)
+        return
+    
+    try:
+        pool.run(batches, emit)
+    finally:
+        pool.close()
 
 if __name__ == "__main__":
     main()
-
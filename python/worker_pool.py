@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Çok süreçli işçi havuzu
+Denetleyici süreç modelleri bir kez yükler, ardından N işçi fork eder; ağırlıklar copy-on-write ile
+paylaşıldığı için bellek işçi sayısıyla katlanmaz. Satır batch'leri boşta olan işçiye pipe üzerinden
+gönderilir. Yanıtlar batch'lerin geliş sırasıyla yazılır; can_reorder(yanıtlar) True dönen batch'ler
+(ör. tüm istekleri id taşıyanlar) sıra beklemeden, bittiği anda yazılır.
+"""
+
+import os
+import gc
+import queue
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+
+logger = logging.getLogger(__name__)
+
+
+def fork_available() -> bool:
+    """Copy-on-write paylaşım için 'fork' başlatma yöntemi gerekir (Linux/macOS)"""
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def cpu_slices(workers: int, threads_per_worker: int) -> list:
+    """
+    Her işçiye ayrık bir çekirdek kümesi ayır.
+    Çekirdekler yetmiyorsa ya da platform affinity desteklemiyorsa işçiler sabitlenmez (None).
+    """
+    if not hasattr(os, "sched_getaffinity"):
+        return [None] * workers
+
+    cores = sorted(os.sched_getaffinity(0))
+    if workers * threads_per_worker > len(cores):
+        return [None] * workers
+    return [set(cores[i * threads_per_worker:(i + 1) * threads_per_worker]) for i in range(workers)]
+
+
+def _worker_loop(index: int, conn, handler, setup):
+    """İşçi süreci - (sıra, payload) al, handler(payload) sonucunu (sıra, sonuç) olarak geri gönder"""
+    if setup is not None:
+        setup(index)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+
+        seq, payload = message
+        try:
+            result = handler(payload)
+        except Exception as e:
+            logger.error(f"❌ İşçi {index} hatası: {e}")
+            result = e
+        conn.send((seq, result))
+
+    conn.close()
+
+
+class WorkerPool:
+    """
+    Fork tabanlı işçi havuzu.
+    handler(payload) -> yanıt listesi işçide çalışır; error_handler(payload, hata) -> yanıt listesi
+    işçi hata verdiğinde ya da öldüğünde denetleyicide çalışır.
+    can_reorder(yanıtlar) True dönerse batch sırasını beklemeden yazılır.
+    """
+
+    def __init__(self, handler, workers: int, setup=None, error_handler=None, can_reorder=None):
+        if not fork_available():
+            raise RuntimeError("İşçi havuzu 'fork' başlatma yöntemi gerektirir")
+
+        self.handler = handler
+        self.workers = workers
+        self.setup = setup
+        self.error_handler = error_handler or (lambda payload, error: [])
+        self.can_reorder = can_reorder or (lambda responses: False)
+
+        self._processes = []
+        self._connections = []
+        self._closing = False
+
+    def start(self):
+        """İşçileri fork et - denetleyicide başka thread çalışmadan önce çağrılmalı"""
+        context = multiprocessing.get_context("fork")
+
+        # Fork öncesi mevcut nesneleri GC'nin dışına al; işçilerde GC sayfalara yazıp kopyalatmasın
+        gc.collect()
+        gc.freeze()
+
+        for index in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_loop,
+                args=(index, child_conn, self.handler, self.setup),
+                name=f"worker-{index}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._processes.append(process)
+            self._connections.append(parent_conn)
+
+        logger.info(f"👷 {self.workers} işçi başlatıldı (pid: {[p.pid for p in self._processes]})")
+
+    def run(self, batches, emit):
+        """
+        Her batch'i boşta olan işçiye gönder; emit(yanıt) her yanıt için batch sırasıyla çağrılır.
+        batches tükenince tüm sonuçlar yazılana kadar bekler.
+        """
+        idle = queue.Queue()
+        for index in range(self.workers):
+            idle.put(index)
+
+        lock = threading.Condition()
+        in_flight = {}  # işçi -> (sıra, payload)
+        finished = {}  # sıra -> yanıt listesi
+        dead = set()
+        state = {"next": 0, "sent": 0, "alive": self.workers}
+
+        def finish(seq, responses):
+            # Sırası önemsiz batch hemen yazılır, sırada yeri boş kalır
+            if self.can_reorder(responses):
+                for response in responses:
+                    emit(response)
+                responses = []
+            finished[seq] = responses
+            flush()
+
+        def flush():
+            # Sıradaki batch tamamlandıkça yanıtları yaz
+            while state["next"] in finished:
+                for response in finished.pop(state["next"]):
+                    emit(response)
+                state["next"] += 1
+            lock.notify_all()
+
+        def collect():
+            connections = {conn: index for index, conn in enumerate(self._connections)}
+            while connections:
+                for conn in wait(list(connections)):
+                    index = connections[conn]
+                    try:
+                        seq, result = conn.recv()
+                    except (EOFError, OSError):
+                        # İşçi öldü - elindeki batch hata yanıtlarıyla kapatılır
+                        del connections[conn]
+                        if self._closing:
+                            continue
+                        with lock:
+                            dead.add(index)
+                            state["alive"] -= 1
+                            logger.error(f"❌ İşçi {index} beklenmedik şekilde sonlandı")
+                            if index in in_flight:
+                                seq, payload = in_flight.pop(index)
+                                finish(seq, self.error_handler(payload, RuntimeError("İşçi süreci sonlandı")))
+                        idle.put(None)  # Bekleyen dağıtıcıyı uyandır
+                        continue
+
+                    with lock:
+                        _, payload = in_flight.pop(index)
+                        if isinstance(result, Exception):
+                            result = self.error_handler(payload, result)
+                        finish(seq, result)
+                    idle.put(index)
+
+        collector = threading.Thread(target=collect, name="collector", daemon=True)
+        collector.start()
+
+        for payload in batches:
+            while True:
+                index = idle.get()
+                with lock:
+                    if state["alive"] == 0:
+                        raise RuntimeError("Tüm işçiler sonlandı")
+                    if index is None or index in dead:
+                        continue
+                    seq = state["sent"]
+                    state["sent"] += 1
+                    in_flight[index] = (seq, payload)
+                    break
+            try:
+                self._connections[index].send((seq, payload))
+            except (BrokenPipeError, OSError):
+                pass  # Toplayıcı EOF'u görüp batch'i hata yanıtlarıyla kapatır
+
+        with lock:
+            while state["next"] < state["sent"]:
+                lock.wait()
+
+    def close(self):
+        """İşçilere kapanma mesajı gönder ve bitmelerini bekle"""
+        self._closing = True
+        for conn in self._connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        logger.info("👋 İşçiler kapatıldı")
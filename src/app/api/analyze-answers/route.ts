@@ -9,6 +9,20 @@ export const dynamic = 'force-dynamic';
 // Hugging Face Spaces API URL
 const HF_API_URL = process.env.HF_API_URL || 'https://ozget-metamind-nlp-session.hf.space';
 
+// Opsiyonel: python/http_server.py adresi (ör. http://127.0.0.1:8765).
+// Tanımlıysa Gradio yerine doğrudan bu servis kullanılır; fetch bağlantıları keep-alive ile yeniden kullanır.
+const GRADER_URL = process.env.GRADER_URL;
+
+// Gradio bağlantısı bir kez kurulur, sonraki istekler aynı Client'ı kullanır
+let gradioClient: Promise<Client> | null = null;
+
+// /predict_batch için değerlendirme ayarları - app.py varsayılanlarıyla aynı
+const STRICT_MODE = true;
+const SIMILARITY_THRESHOLD = 0.7;
+
+// Grader'a gönderilen süre bütçesi - route zaman aşımından önce biter, süresi dolan istek modellere gitmez
+const GRADER_DEADLINE_MS = (maxDuration - 5) * 1000;
+
 /**
  * POST /api/analyze-answers
  * Hugging Face Spaces API'yi kullanarak quiz cevaplarını analiz et
@@ -18,6 +32,12 @@ export async function POST(req: NextRequest) {
     console.log('📥 Received analyze request');
     
     const body = await req.json();
+
+    // Toplu istek: { answers: [...] } - bir quiz oturumunun tüm cevapları tek çağrıda
+    if (Array.isArray(body.answers)) {
+      return await analyzeBatch(body.answers);
+    }
+
     const { question, studentAnswer, correctAnswer, student_confidence, topic } = body;
 
     console.log('📝 Request body:', { question, studentAnswer, correctAnswer, student_confidence, topic });
@@ -31,6 +51,10 @@ export async function POST(req: NextRequest) {
       );
     }
 
+    if (GRADER_URL) {
+      return await analyzeWithGrader({ question, studentAnswer, correctAnswer, student_confidence, topic });
+    }
+
     console.log('✅ Validation passed, calling Hugging Face API...');
 
     // Hugging Face Gradio API formatı
@@ -48,14 +72,7 @@ export async function POST(req: NextRequest) {
 
     try {
       // Gradio Client kullanarak API'yi çağır
-      const hfToken = process.env.HF_TOKEN;
-      // TypeScript expects the token to begin with "hf_"
-      if (hfToken && !hfToken.startsWith("hf_")) {
-        throw new Error("HF_TOKEN must start with 'hf_'");
-      }
-      const client = await Client.connect(HF_API_URL, {
-        hf_token: hfToken as `hf_${string}` | undefined
-      });
+      const client = await getGradioClient();
 
       // Gradio Client için direkt array gönder (data wrapper yok)
       const result = await client.predict("/predict", apiPayload.data);
@@ -74,33 +91,7 @@ export async function POST(req: NextRequest) {
         }
 
         // Unified format - eski Python response formatıyla uyumlu
-        const formattedResult = {
-          success: true,
-          label: label,
-          feedback: feedback,
-          confidence: confidence / 100, // 0-1 arasına normalize et
-          models: {
-            mbart: {
-              label: details.mBART || label,
-              label_code: getLabelCode(details.mBART || label),
-              feedback: feedback,
-              confidence: 85
-            },
-            mt5: {
-              label: details.MT5 || label,
-              label_code: getLabelCode(details.MT5 || label),
-              feedback: feedback,
-              confidence: 82
-            },
-            agent: {
-              chosen_model: "mBART + MT5 Consensus",
-              label: label,
-              feedback: feedback,
-              confidence: confidence / 100,
-              reasoning: `İki model birlikte '${label}' sonucuna vardı.`
-            }
-          }
-        };
+        const formattedResult = formatResult(label, feedback, details, confidence);
 
         console.log('✅ Analysis complete:', formattedResult);
         return NextResponse.json(formattedResult);
@@ -127,6 +118,165 @@ export async function POST(req: NextRequest) {
   }
 }
 
+/**
+ * Quiz oturumunun tüm cevaplarını tek çağrıda analiz et - sonuçlar aynı sırayla döner
+ * Gradio'da /predict_batch, yerel grader'da liste gövdeli /analyze kullanılır
+ */
+async function analyzeBatch(answers: any[]) {
+  const items = answers.map((answer) => ({
+    question: answer.question,
+    student_answer: answer.studentAnswer,
+    correct_answer: answer.correctAnswer,
+    student_confidence: answer.student_confidence || 50,
+    topic: answer.topic || null
+  }));
+  console.log(`📦 Batch analyze request: ${items.length} answers`);
+
+  try {
+    if (GRADER_URL) {
+      const response = await fetch(`${GRADER_URL}/analyze`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(items.map((item) => ({ ...item, deadline_ms: GRADER_DEADLINE_MS })))
+      });
+      const result = await response.json();
+      if (!response.ok) {
+        console.warn(`⚠️ Grader ${response.status}:`, result.error);
+        return NextResponse.json(
+          { success: false, error: result.error || 'Grader error' },
+          { status: response.status, headers: { 'Retry-After': response.headers.get('Retry-After') || '1' } }
+        );
+      }
+      return NextResponse.json({ success: true, results: result });
+    }
+
+    const client = await getGradioClient();
+    const result = await client.predict("/predict_batch", [
+      items.map(({ student_confidence, ...item }) => ({ ...item, confidence: student_confidence })),
+      STRICT_MODE,
+      SIMILARITY_THRESHOLD
+    ]);
+
+    // result.data = [[{ label, feedback, confidence, details }, ...]]
+    const outputs = Array.isArray(result.data) ? result.data[0] : null;
+    if (!Array.isArray(outputs)) {
+      throw new Error('Invalid response format from Hugging Face API');
+    }
+
+    const results = outputs.map((output: any) =>
+      output.label === '❌ Hata'
+        ? { success: false, error: output.feedback }
+        : formatResult(output.label, output.feedback, output.details || {}, output.confidence)
+    );
+    console.log(`✅ Batch analysis complete: ${results.length} answers`);
+    return NextResponse.json({ success: true, results });
+  } catch (batchError: any) {
+    console.error('❌ Batch analyze error:', batchError);
+    return NextResponse.json(
+      { success: false, error: `Batch analyze error: ${batchError.message || 'Unknown error'}` },
+      { status: 500 }
+    );
+  }
+}
+
+/**
+ * Paylaşılan Gradio Client - bağlantı hata verirse bir sonraki istekte yeniden kurulur
+ */
+function getGradioClient(): Promise<Client> {
+  if (!gradioClient) {
+    const hfToken = process.env.HF_TOKEN;
+    // TypeScript expects the token to begin with "hf_"
+    if (hfToken && !hfToken.startsWith("hf_")) {
+      throw new Error("HF_TOKEN must start with 'hf_'");
+    }
+    gradioClient = Client.connect(HF_API_URL, {
+      hf_token: hfToken as `hf_${string}` | undefined
+    }).catch((error) => {
+      gradioClient = null;
+      throw error;
+    });
+  }
+  return gradioClient;
+}
+
+/**
+ * Gradio sonucunu eski Python response formatına çevir
+ */
+function formatResult(label: string, feedback: string, details: any, confidence: number) {
+  return {
+    success: true,
+    label: label,
+    feedback: feedback,
+    confidence: confidence / 100, // 0-1 arasına normalize et
+    models: {
+      mbart: {
+        label: details.mBART || label,
+        label_code: getLabelCode(details.mBART || label),
+        feedback: feedback,
+        confidence: 85
+      },
+      mt5: {
+        label: details.MT5 || label,
+        label_code: getLabelCode(details.MT5 || label),
+        feedback: feedback,
+        confidence: 82
+      },
+      agent: {
+        chosen_model: "mBART + MT5 Consensus",
+        label: label,
+        feedback: feedback,
+        confidence: confidence / 100,
+        reasoning: `İki model birlikte '${label}' sonucuna vardı.`
+      }
+    }
+  };
+}
+
+/**
+ * Yerel HTTP grader servisine istek gönder - yanıt zaten eski Python response formatında
+ */
+async function analyzeWithGrader(body: {
+  question: string;
+  studentAnswer: string;
+  correctAnswer: string;
+  student_confidence?: number;
+  topic?: string;
+}) {
+  try {
+    const response = await fetch(`${GRADER_URL}/analyze`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        question: body.question,
+        student_answer: body.studentAnswer,
+        correct_answer: body.correctAnswer,
+        student_confidence: body.student_confidence || 50,
+        topic: body.topic || null,
+        deadline_ms: GRADER_DEADLINE_MS
+      })
+    });
+
+    const result = await response.json();
+    if (!response.ok) {
+      // 429: kuyruk dolu, 503: modeller yükleniyor, 504: süre bütçesi doldu - istemci tekrar deneyebilir
+      console.warn(`⚠️ Grader ${response.status}:`, result.error);
+      return NextResponse.json(
+        { success: false, error: result.error || 'Grader error' },
+        { status: response.status, headers: { 'Retry-After': response.headers.get('Retry-After') || '1' } }
+      );
+    }
+
+    console.log('✅ Grader response:', result.label);
+    return NextResponse.json(result);
+  } catch (graderError: any) {
+    console.error('❌ Grader error:', graderError);
+    return NextResponse.json(
+      { success: false, error: `Grader error: ${graderError.message || 'Unknown error'}` },
+      { status: 500 }
+    );
+  }
+}
+
 /**
  * GET /api/analyze-answers/health
  * Sağlık kontrolü
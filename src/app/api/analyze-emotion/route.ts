@@ -1,18 +1,30 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { spawn, ChildProcess } from 'child_process';
-import fs from 'fs';
 import path from 'path';
-import os from 'os';
 
 // GLOBAL: Python prosesini canlı tut
 let pythonProcess: ChildProcess | null = null;
 let isProcessReady = false;
 let processRestartCount = 0;
-let pendingRequests: Array<{
-  imagePath: string;
+let nextRequestId = 0;
+// Python'dan son satırın geldiği an - tek isteğin zaman aşımı ile prosesin kilitlenmesini ayırt etmek için
+let lastOutputAt = Date.now();
+// İstek zaman aşımı - Python tarafına deadline_ms olarak da gönderilir, süresi dolan istek analiz edilmez
+const REQUEST_TIMEOUT_MS = 30000;
+// İstek id'si -> bekleyen istek; Python yanıtları id ile eşleştirilir, sıra önemli değil
+// Python'a gönderilen istek: tek resim (image) ya da toplu (images - yüzler tek batch'te sınıflandırılır).
+// Resim baytları base64 olarak pipe'tan gider, Python bellekte çözer - geçici dosya yazılmaz
+// session_id verilirse aynı oturumun karelerinde son yüz kutusu yeniden kullanılır, yüz tespiti çoğunlukla atlanır
+type EmotionPayload = ({ image: string } | { images: string[] }) & { session_id?: string };
+
+// Tek bir isteğin zaman aşımı - proses başka isteklere yanıt veriyorsa yeniden başlatılmaz
+class PythonTimeoutError extends Error {}
+
+let pendingRequests = new Map<number, {
+  payload: EmotionPayload;
   resolve: (value: any) => void;
   reject: (reason: any) => void;
-}> = [];
+}>();
 
 /**
  * Python prosesini başlat ve canlı tut
@@ -33,39 +45,60 @@ function initPythonProcess() {
   const pythonArgs = (envPython && envPython.trim().length > 0)
     ? ['-u', scriptPath, '--server']
     : (isWindows ? ['-3', '-u', scriptPath, '--server'] : ['-u', scriptPath, '--server']);
+  // Opsiyonel: id'li istekleri paralel analiz et (EMOTION_THREADS=4)
+  const threads = process.env.EMOTION_THREADS;
+  if (threads && Number(threads) > 1) {
+    pythonArgs.push('--threads', threads);
+  }
+  // Opsiyonel: ders saatleri arasında belleği boşalt - model ilk istekte yüklenir (EMOTION_LAZY_LOAD=1),
+  // EMOTION_IDLE_UNLOAD_S saniye istek gelmezse bellekten atılır ve sonraki istekte yeniden yüklenir
+  if (process.env.EMOTION_LAZY_LOAD === '1') {
+    pythonArgs.push('--lazy-load');
+  }
+  const idleUnload = process.env.EMOTION_IDLE_UNLOAD_S;
+  if (idleUnload && Number(idleUnload) > 0) {
+    pythonArgs.push('--idle-unload', idleUnload);
+  }
+  // Opsiyonel: otomatik çekimin neredeyse aynı karelerini de önbellekten yanıtla (EMOTION_DEDUP_DISTANCE=4, dHash bit farkı)
+  const dedupDistance = process.env.EMOTION_DEDUP_DISTANCE;
+  if (dedupDistance && Number(dedupDistance) >= 0) {
+    pythonArgs.push('--dedup-distance', dedupDistance);
+  }
 
   pythonProcess = spawn(pythonCommand, pythonArgs, {
     stdio: ['pipe', 'pipe', 'pipe']
   });
 
-  let currentResponse = '';
+  let buffered = '';
 
   pythonProcess.stdout?.on('data', (data) => {
-    const output = data.toString();
-    
-    // Model yüklenme mesajı
-    if (output.includes('READY')) {
-      isProcessReady = true;
-      console.log('✅ Python process ready');
-      return;
-    }
+    lastOutputAt = Date.now();
+    // Her yanıt tek satır JSON; yarım kalan satır bir sonraki parçayla birleşir
+    buffered += data.toString();
+    const lines = buffered.split('\n');
+    buffered = lines.pop() ?? '';
 
-    // JSON response topla
-    currentResponse += output;
-
-    // Tam JSON geldi mi kontrol et
-    try {
-      const parsed = JSON.parse(currentResponse);
-      
-      // İlk bekleyen isteği çöz
-      const request = pendingRequests.shift();
-      if (request) {
-        request.resolve(parsed);
+    for (const line of lines) {
+      const trimmed = line.trim();
+      if (!trimmed) continue;
+
+      // Model yüklenme mesajı
+      if (trimmed === 'READY') {
+        isProcessReady = true;
+        console.log('✅ Python process ready');
+        continue;
+      }
+
+      try {
+        const { id, ...result } = JSON.parse(trimmed);
+        const request = pendingRequests.get(id);
+        if (request) {
+          pendingRequests.delete(id);
+          request.resolve(result);
+        }
+      } catch (e) {
+        console.error('Invalid Python response:', trimmed);
       }
-      
-      currentResponse = ''; // Sıfırla
-    } catch (e) {
-      // Henüz tam JSON değil, beklemeye devam
     }
   });
 
@@ -82,7 +115,7 @@ function initPythonProcess() {
     pendingRequests.forEach(req => {
       req.reject(new Error('Python process died'));
     });
-    pendingRequests = [];
+    pendingRequests.clear();
   });
 
   pythonProcess.on('error', (err) => {
@@ -95,38 +128,49 @@ function initPythonProcess() {
 /**
  * Python prosesine istek gönder
  */
-function sendToPythonProcess(imagePath: string): Promise<any> {
+function sendToPythonProcess(payload: EmotionPayload): Promise<any> {
   return new Promise((resolve, reject) => {
     // Proses yoksa başlat
     if (!pythonProcess) {
       initPythonProcess();
     }
 
+    const id = nextRequestId++;
+
+    // Timeout: 30 saniye
+    const timeout = setTimeout(() => {
+      clearInterval(checkReady);
+      pendingRequests.delete(id);
+      reject(new PythonTimeoutError('Python process timeout'));
+    }, REQUEST_TIMEOUT_MS);
+    const startedAt = Date.now();
+
     // Hazır olana kadar bekle
     const checkReady = setInterval(() => {
       if (isProcessReady) {
         clearInterval(checkReady);
         
-        // İsteği kuyruğa ekle
-        pendingRequests.push({ imagePath, resolve, reject });
+        // İsteği id ile kaydet
+        pendingRequests.set(id, {
+          payload,
+          resolve: (value) => { clearTimeout(timeout); resolve(value); },
+          reject: (reason) => { clearTimeout(timeout); reject(reason); }
+        });
         
-        // Resim yolunu gönder
-        pythonProcess?.stdin?.write(imagePath + '\n');
+        // İsteği id ile gönder; yanıtlar bittiği sırayla döner
+        // Kalan süre bütçe olarak gider; yanıt beklenmeyecekse Python resmi hiç işlemez
+        const deadline_ms = REQUEST_TIMEOUT_MS - (Date.now() - startedAt);
+        pythonProcess?.stdin?.write(JSON.stringify({ id, ...payload, deadline_ms }) + '\n');
       }
     }, 100);
-
-    // Timeout: 30 saniye
-    setTimeout(() => {
-      clearInterval(checkReady);
-      reject(new Error('Python process timeout'));
-    }, 30000);
   });
 }
 
 export async function POST(request: NextRequest) {
   try {
     const formData = await request.formData();
-    const file = formData.get('image') as File;
+    const files = formData.getAll('image') as File[];
+    const file = files[0];
     
     if (!file) {
       return NextResponse.json(
@@ -135,19 +179,17 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    const bytes = await file.arrayBuffer();
-    const buffer = Buffer.from(bytes);
-    
-    // Geçici dosya oluştur
-    const tempDir = os.tmpdir();
-    const tempFilePath = path.join(tempDir, `emotion_${Date.now()}.jpg`);
-    fs.writeFileSync(tempFilePath, buffer);
-    
+    // Quiz oturumu (save-photo ile aynı sessionId) - yoksa her kare baştan tespit edilir
+    const sessionId = formData.get('sessionId');
+    const session = typeof sessionId === 'string' && sessionId ? { session_id: sessionId } : {};
+
+    // Birden fazla kare (ör. otomatik çekimde soru başına birkaç kare) tek istekte analiz edilir
+    if (files.length > 1) {
+      return await analyzeFrames(files, session);
+    }
+
     // Persistent process kullan
-    const result = await sendToPythonProcess(tempFilePath);
-    
-    // Geçici dosyayı sil
-    fs.unlinkSync(tempFilePath);
+    const result = await sendToPythonProcess({ image: await toBase64(file), ...session });
     
     return NextResponse.json({
       success: true,
@@ -156,13 +198,9 @@ export async function POST(request: NextRequest) {
   } catch (error) {
     console.error('Error analyzing emotion:', error);
     
-    // Python process'i restart et
-    if (pythonProcess) {
-      console.log('🔄 Restarting Python process due to error...');
-      pythonProcess.kill();
-      pythonProcess = null;
-      isProcessReady = false;
-      processRestartCount++;
+    // Diğer istekler hâlâ yanıt alıyorsa proses çalışıyor demektir - sadece bu istek varsayılana düşer
+    if (error instanceof PythonTimeoutError) {
+      restartIfUnresponsive();
     }
     
     // Default confidence score döndür
@@ -175,6 +213,41 @@ export async function POST(request: NextRequest) {
   }
 }
 
+/**
+ * Proses hazır olduğu halde bir zaman aşımı süresi boyunca hiç yanıt vermediyse yeniden başlat.
+ * Ölen proses zaten 'close' ile temizlenir ve sonraki istekte yeniden başlatılır; yüklenmekte olan
+ * (henüz READY yazmamış) prosese dokunulmaz.
+ */
+function restartIfUnresponsive() {
+  if (!pythonProcess || !isProcessReady || Date.now() - lastOutputAt < REQUEST_TIMEOUT_MS) {
+    return;
+  }
+  console.log('🔄 Restarting unresponsive Python process...');
+  // 'close' bekleyen diğer istekleri reddeder - yanıt vermeyen prosesten zaten sonuç gelmeyecek
+  pythonProcess.kill();
+  pythonProcess = null;
+  isProcessReady = false;
+  processRestartCount++;
+}
+
+/**
+ * Birden fazla kareyi tek Python isteğiyle analiz et - sonuçlar kare sırasıyla döner
+ */
+async function analyzeFrames(files: File[], session: { session_id?: string }) {
+  const images = await Promise.all(files.map(toBase64));
+
+  // Yanıt: { results: [...] } ya da istek düzeyinde { error } (ör. süre sınırı)
+  const result = await sendToPythonProcess({ images, ...session });
+  return NextResponse.json({ success: true, ...result });
+}
+
+/**
+ * Yüklenen kareyi base64'e çevir
+ */
+async function toBase64(file: File): Promise<string> {
+  return Buffer.from(await file.arrayBuffer()).toString('base64');
+}
+
 // Graceful shutdown
 process.on('SIGTERM', () => {
   if (pythonProcess) {
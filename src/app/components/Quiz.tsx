@@ -185,6 +185,8 @@ export default function Quiz() {
       // Prepare form data for analysis (keep as FormData since analyze-emotion expects it)
       const analyzeFormData = new FormData();
       analyzeFormData.append('image', imageBlob, 'capture.jpg');
+      // Aynı oturumun karelerinde yüz tespiti tekrar yapılmasın diye
+      analyzeFormData.append('sessionId', sessionId);
 
       // Sequential calls: save first, then analyze
       const saveRes = await fetch('/api/save-photo', {
@@ -323,62 +325,52 @@ export default function Quiz() {
     setIsAnalyzing(true);
 
     try {
-      const analyzedAnswers = [];
-
-      for (let i = 0; i < answers.length; i++) {
-        const answer = answers[i];
+      // Tüm cevaplar tek istekte gönderilir - sunucu modelleri batch halinde çalıştırır
+      const batchAnswers = answers.map((answer, i) => {
         const question = quizQuestions[i];
-        const correctAnswerText = question.options[question.correctAnswer[0]];
-
-        console.log(`Analiz ediliyor ${i + 1}/${answers.length}:`, {
+        return {
           question: question.question,
           studentAnswer: answer.answerText,
-          correctAnswer: correctAnswerText,
-        });
+          correctAnswer: question.options[question.correctAnswer[0]],
+          student_confidence: answer.modelConfidencePercent || null,
+          topic: question.topic || null,
+        };
+      });
 
-        try {
-          // Model analizini çağır - PRODUCTION MODE
-          console.log(`🤖 Calling REAL MODEL endpoint for question ${i + 1}`);
-          const analysisRes = await fetch('/api/analyze-answers', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-              question: question.question,
-              studentAnswer: answer.answerText,
-              correctAnswer: correctAnswerText,
-              student_confidence: answer.modelConfidencePercent || null,
-              topic: question.topic || null,
-            }),
-          });
+      console.log(`🤖 Calling REAL MODEL endpoint for ${batchAnswers.length} answers`);
+      let results: any[] = [];
+      try {
+        const analysisRes = await fetch('/api/analyze-answers', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ answers: batchAnswers }),
+        });
 
-          if (analysisRes.ok) {
-            const analysisData = await analysisRes.json();
-            
-            console.log(`📊 API Response ${i + 1}:`, analysisData);
-            
-            if (analysisData.success && analysisData.models) {
-              analyzedAnswers.push({
-                ...answer,
-                modelAnalysis: analysisData.models,
-              });
-              console.log(`✅ Analiz tamamlandı ${i + 1}/${answers.length}`);
-            } else {
-              console.error('❌ Model analizi başarısız:', analysisData.error || 'Bilinmeyen hata');
-              console.error('Full response:', JSON.stringify(analysisData, null, 2));
-              analyzedAnswers.push(answer);
-            }
-          } else {
-            const errorText = await analysisRes.text();
-            console.error(`❌ API hatası (${analysisRes.status}):`, errorText);
-            analyzedAnswers.push(answer);
-          }
-        } catch (error) {
-          console.error('Analiz hatası:', error);
-          // Hata olsa bile cevabı ekle
-          analyzedAnswers.push(answer);
+        if (analysisRes.ok) {
+          const analysisData = await analysisRes.json();
+          console.log('📊 API Response:', analysisData);
+          results = analysisData.results || [];
+        } else {
+          const errorText = await analysisRes.text();
+          console.error(`❌ API hatası (${analysisRes.status}):`, errorText);
         }
+      } catch (error) {
+        console.error('Analiz hatası:', error);
       }
 
+      // Hata olsa bile cevap analiz olmadan eklenir
+      const analyzedAnswers = answers.map((answer, i) => {
+        const analysisData = results[i];
+        if (analysisData?.success && analysisData.models) {
+          console.log(`✅ Analiz tamamlandı ${i + 1}/${answers.length}`);
+          return { ...answer, modelAnalysis: analysisData.models };
+        }
+        if (analysisData) {
+          console.error('❌ Model analizi başarısız:', analysisData.error || 'Bilinmeyen hata');
+        }
+        return answer;
+      });
+
       // Analizli cevapları state'e kaydet
       setAnswers(analyzedAnswers);
       console.log('✅ Tüm model analizleri tamamlandı!');